@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+   Benchmark of PcapWriter flush policies, to a file and to a FIFO.
+
+   $ python3 benchmarks/pcap_writer.py -n 200000 -r 5
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from spinel.pcap import PcapCodec
+from spinel.pcap import PcapWriter
+from spinel.pcap import DLT_IEEE802_15_4_TAP
+from spinel.pcap import PCAP_LIVE_FLUSH_INTERVAL
+
+FRAME_SIZE = 60
+
+
+class FlushEveryFrame(object):
+    """ What sniffer.py did before PcapWriter. """
+
+    def __init__(self, output):
+        self.output = output
+
+    def write(self, record):
+        self.output.write(record)
+        self.output.flush()
+
+    def close(self):
+        self.output.close()
+
+
+WRITERS = (
+    ("per-frame", FlushEveryFrame),
+    ("immediate", lambda output: PcapWriter(output, flush_frames=1)),
+    ("live", lambda output: PcapWriter(
+        output, flush_interval=PCAP_LIVE_FLUSH_INTERVAL)),
+    ("buffered", PcapWriter),
+)
+
+
+def drain(path):
+    with open(path, 'rb', 0) as fifo:
+        while fifo.read(1 << 16):
+            pass
+
+
+def run(path, writer_factory, count, is_fifo):
+    if is_fifo:
+        reader = threading.Thread(target=drain, args=(path,))
+        reader.start()
+
+    PcapCodec.encode_header(DLT_IEEE802_15_4_TAP)
+    metadata = (-40, -100, 0, (11, 255, 0), (0,))
+    frame = bytes(FRAME_SIZE)
+
+    writer = writer_factory(open(path, 'wb'))
+    start = time.perf_counter()
+    for i in range(count):
+        writer.write(
+            PcapCodec.encode_frame(frame, i // 1000000, i % 1000000, True,
+                                   False, metadata))
+    writer.close()
+    elapsed = time.perf_counter() - start
+
+    if is_fifo:
+        reader.join()
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n',
+                        '--count',
+                        type=int,
+                        default=100000,
+                        help='frames per run')
+    parser.add_argument('-r',
+                        '--repeat',
+                        type=int,
+                        default=5,
+                        help='runs per writer')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        targets = [("file", os.path.join(tmpdir, 'capture.pcap'), False)]
+        if hasattr(os, 'mkfifo'):
+            fifo = os.path.join(tmpdir, 'capture.fifo')
+            os.mkfifo(fifo)
+            targets.append(("fifo", fifo, True))
+
+        print("%-6s %-10s %12s" % ("output", "writer", "frames/s"))
+        for (target, path, is_fifo) in targets:
+            rates = dict((name, 0) for (name, _) in WRITERS)
+            for _ in range(args.repeat):
+                for (name, writer_factory) in WRITERS:
+                    rate = run(path, writer_factory, args.count, is_fifo)
+                    rates[name] = max(rates[name], rate)
+            for (name, _) in WRITERS:
+                print("%-6s %-10s %12.0f" % (target, name, rates[name]))
+
+
+if __name__ == '__main__':
+    main()
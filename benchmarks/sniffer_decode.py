@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+   Benchmark of the sniffer.py decode and write hot loop.
+
+   $ python3 benchmarks/sniffer_decode.py -n 200000
+"""
+
+import os
+import sys
+import time
+import struct
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from spinel.codec import SpinelCodec
+from spinel.pcap import PcapCodec
+from spinel.pcap import PcapWriter
+from spinel.pcap import DLT_IEEE802_15_4_TAP
+from spinel.rawframe import RawFrame
+
+FRAME_SIZE = 60
+
+
+def stream_raw(i):
+    """ A PROP_STREAM_RAW value with the 19 bytes metadata. """
+    frame = bytes(FRAME_SIZE)
+    return (struct.pack('<H', len(frame)) + frame +
+            struct.pack('<bbHHBBQHB', -40, -100, 0, 10, 11, 255, i, 1, 0))
+
+
+def generic(writer, value):
+    """ What sniffer.py did before RawFrame. """
+    length = SpinelCodec.parse_S(value)
+    pkt = value[2:2 + length]
+    metadata = SpinelCodec.parse_fields(value[2 + length:], "ccSt(CCX)t(i)")
+    timestamp = metadata[3][2]
+    writer.write(
+        PcapCodec.encode_frame(pkt, int(timestamp / 1000000),
+                               timestamp % 1000000, True, False, metadata))
+
+
+def packed(writer, value):
+    raw = RawFrame.decode(value)
+    writer.write_packed(PcapCodec.raw_size(raw, True), PcapCodec.pack_raw, raw,
+                        raw.timestamp // 1000000, raw.timestamp % 1000000,
+                        True)
+
+
+def run(path, handle, values):
+    writer = PcapWriter(open(path, 'wb'))
+    writer.write(PcapCodec.encode_header(DLT_IEEE802_15_4_TAP))
+    start = time.perf_counter()
+    for value in values:
+        handle(writer, value)
+    writer.close()
+    elapsed = time.perf_counter() - start
+    with open(path, 'rb') as capture:
+        return (len(values) / elapsed, capture.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n',
+                        '--count',
+                        type=int,
+                        default=100000,
+                        help='frames per run')
+    args = parser.parse_args()
+
+    values = [stream_raw(i) for i in range(args.count)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'capture.pcap')
+        (generic_rate, generic_capture) = run(path, generic, values)
+        (packed_rate, packed_capture) = run(path, packed, values)
+
+    if packed_capture != generic_capture:
+        sys.stderr.write("ERROR: captures differ\n")
+        sys.exit(1)
+    print("%-8s %12s" % ("decoder", "frames/s"))
+    print("%-8s %12.0f" % ("generic", generic_rate))
+    print("%-8s %12.0f" % ("packed", packed_rate))
+    print("speedup  %11.1fx" % (packed_rate / generic_rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+   Benchmark of sniffer captures of long sub-GHz frames.
+
+   $ python3 benchmarks/subghz_capture.py -n 500 --size 560 --rates 50,300
+"""
+
+import os
+import sys
+import time
+import socket
+import struct
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from spinel.const import SPINEL
+from spinel.hdlc import Hdlc
+from spinel.pcap import PcapCodec
+from spinel.pcap import PcapWriter
+from spinel.pcap import DLT_IEEE802_15_4_TAP
+from spinel.sniffer import SnifferSession
+from spinel.sniffer import frame_write
+from spinel.stream import IStream
+
+CHANNEL = 1
+
+# Preamble, SFD and PHR octets of a SUN FSK PPDU, sent along each PSDU.
+PHY_OVERHEAD = 8
+
+# Seconds to wait for the last frames after the RCP sent them all.
+DRAIN_TIMEOUT = 5
+
+
+class SocketPairStream(IStream):
+    """ Host side of a socket pair, readable both ways WpanApi reads. """
+
+    def __init__(self, sock):
+        self.sock = sock
+
+    def write(self, data):
+        self.sock.sendall(data)
+
+    def read(self, size=1):
+        return self.sock.recv(size)[0]
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def read_available(self, size=4096):
+        return self.sock.recv(size)
+
+    def close(self):
+        self.sock.close()
+
+
+def stream_raw(hdlc, seq, size):
+    """ The HDLC frame of a PROP_STREAM_RAW value of a size bytes PSDU. """
+    frame = bytes([0x41, 0xd8, seq & 0xff]) + os.urandom(size - 3)
+    value = (struct.pack('<H', len(frame)) + frame +
+             struct.pack('<bbHHBBQHB', -60, -100, 0, 10, CHANNEL, 200,
+                         seq * 1000, 1, 0))
+    return hdlc.encode(
+        bytes([SPINEL.HEADER_ASYNC, SPINEL.RSP_PROP_VALUE_IS,
+               SPINEL.PROP_STREAM_RAW]) + value)
+
+
+def fake_rcp(sock, frames, airtime):
+    """
+    Answer property sets with their value, and send frames every airtime
+    seconds once the raw stream is enabled.
+    """
+    hdlc = Hdlc(None)
+    while True:
+        data = sock.recv(4096)
+        if not data:
+            return
+        for pkt in hdlc.feed(data):
+            if pkt[1] != SPINEL.CMD_PROP_VALUE_SET:
+                continue
+            sock.sendall(
+                hdlc.encode(bytes([pkt[0], SPINEL.RSP_PROP_VALUE_IS]) +
+                            pkt[2:]))
+            if pkt[2] == SPINEL.PROP_MAC_RAW_STREAM_ENABLED:
+                start = time.monotonic()
+                for (index, frame) in enumerate(frames):
+                    delay = start + index * airtime - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    sock.sendall(frame)
+
+
+def run(count, size, rate):
+    hdlc = Hdlc(None)
+    frames = [stream_raw(hdlc, seq, size) for seq in range(count)]
+    airtime = (size + PHY_OVERHEAD) * 8 / (rate * 1000.0) if rate else 0
+
+    (host, rcp) = socket.socketpair()
+    rcp_thread = threading.Thread(target=fake_rcp,
+                                  args=(rcp, frames, airtime))
+    rcp_thread.daemon = True
+    rcp_thread.start()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'capture.pcap')
+        session = SnifferSession(SocketPairStream(host), CHANNEL, reset=False)
+        if not session.start():
+            sys.stderr.write("ERROR: failed to initialize sniffer\n")
+            sys.exit(1)
+
+        writer = PcapWriter(open(path, 'wb'))
+        writer.write(PcapCodec.encode_header(DLT_IEEE802_15_4_TAP))
+        start = time.perf_counter()
+        for raw in session.frames(count, count * airtime + DRAIN_TIMEOUT):
+            frame_write(writer, PcapCodec, raw, rssi=True)
+        elapsed = time.perf_counter() - start
+        writer.close()
+        stats = session.stats()
+        session.close()
+        rcp.close()
+
+        with open(path, 'rb') as capture:
+            data = capture.read()
+
+    snaplen = struct.unpack("<L", data[16:20])[0]
+    (records, truncated, offset) = (0, 0, 24)
+    while offset < len(data):
+        (incl_len, orig_len) = struct.unpack("<LL", data[offset + 8:offset +
+                                                          16])
+        tlvs_length = struct.unpack("<H", data[offset + 18:offset + 20])[0]
+        if (incl_len != orig_len or incl_len > snaplen or
+                incl_len - tlvs_length != size):
+            truncated += 1
+        records += 1
+        offset += 16 + incl_len
+
+    return (stats, records, truncated, stats['frames'] / elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n',
+                        '--count',
+                        type=int,
+                        default=300,
+                        help='frames per run')
+    parser.add_argument('--size',
+                        type=int,
+                        default=560,
+                        help='PSDU size in bytes')
+    parser.add_argument('--rates',
+                        default='50,300,0',
+                        help='air rates in kbps, 0 for unpaced')
+    args = parser.parse_args()
+
+    print("%-8s %8s %8s %8s %8s %8s %10s" % ("kbps", "sent", "captured",
+                                             "dropped", "fcs", "short",
+                                             "frames/s"))
+    failed = False
+    for rate in [int(rate) for rate in args.rates.split(',')]:
+        (stats, records, truncated, frame_rate) = run(args.count, args.size,
+                                                      rate)
+        print("%-8s %8d %8d %8d %8d %8d %10.0f" %
+              (rate or "unpaced", args.count, records, stats['dropped'],
+               stats['fcs_errors'], truncated, frame_rate))
+        if (records != args.count or truncated or stats['dropped'] or
+                stats['fcs_errors']):
+            failed = True
+
+    if failed:
+        sys.stderr.write("ERROR: frames were lost or truncated\n")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+   Benchmark of WpanApi request latency, threaded versus not.
+
+   $ python3 benchmarks/wpanapi_latency.py -n 5000
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from spinel.const import SPINEL
+from spinel.codec import WpanApi
+from spinel.hdlc import Hdlc
+from spinel.metrics import LatencyHistogram
+from spinel.stream import IStream
+
+
+class SocketPairStream(IStream):
+    """ Host side of a socket pair, readable both ways WpanApi reads. """
+
+    def __init__(self, sock):
+        self.sock = sock
+
+    def write(self, data):
+        self.sock.sendall(data)
+
+    def read(self, size=1):
+        return self.sock.recv(size)[0]
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def read_available(self, size=4096):
+        return self.sock.recv(size)
+
+    def close(self):
+        self.sock.close()
+
+
+def fake_ncp(sock):
+    """ Answer CMD_PROP_VALUE_GET(prop) with PROP_VALUE_IS(prop) = 0. """
+    hdlc = Hdlc(None)
+    while True:
+        try:
+            data = sock.recv(4096)
+        except OSError:
+            return
+        if not data:
+            return
+        for pkt in hdlc.feed(data):
+            if pkt[1] == SPINEL.CMD_PROP_VALUE_GET:
+                response = bytes([pkt[0], SPINEL.RSP_PROP_VALUE_IS
+                                 ]) + pkt[2:] + b'\0'
+                sock.sendall(hdlc.encode(response))
+
+
+def run(threaded, count):
+    (host, ncp) = socket.socketpair()
+    ncp_thread = threading.Thread(target=fake_ncp, args=(ncp,))
+    ncp_thread.daemon = True
+    ncp_thread.start()
+
+    stream = SocketPairStream(host)
+    wpan_api = WpanApi(stream, 1, threaded=threaded)
+    histogram = LatencyHistogram()
+
+    start = time.perf_counter()
+    for _ in range(count):
+        request_start = time.perf_counter()
+        value = wpan_api.prop_get_value(SPINEL.PROP_NET_ROLE)
+        histogram.record((time.perf_counter() - request_start) * 1000000)
+        if value is None:
+            sys.stderr.write("request timed out\n")
+    elapsed = time.perf_counter() - start
+
+    wpan_api.__exit__(None, None, None)
+    ncp.shutdown(socket.SHUT_RDWR)
+    stream.close()
+    ncp.close()
+    return (histogram.snapshot(), count / elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n',
+                        '--count',
+                        type=int,
+                        default=2000,
+                        help='requests per mode')
+    args = parser.parse_args()
+
+    print("%-10s %8s %8s %8s %8s %8s %10s" %
+          ("mode", "mean", "p50", "p90", "p99", "max", "req/s"))
+    for (name, threaded) in (("threaded", True), ("unthreaded", False)):
+        (stats, rate) = run(threaded, args.count)
+        print("%-10s %8d %8d %8d %8d %8d %10.0f" %
+              (name, stats['mean'], stats['p50'], stats['p90'], stats['p99'],
+               stats['max'], rate))
+    print("latencies in usec")
+
+
+if __name__ == '__main__':
+    main()
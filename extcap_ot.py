@@ -19,22 +19,45 @@ import os
 import sys
 import tempfile
 import argparse
-import subprocess
-import threading
 import logging
+import threading
+import time
 import re
 
 from spinel.stream import StreamOpen
 from spinel.const import SPINEL
 from spinel.codec import WpanApi
+from spinel.hub import WpanHub
+from spinel.rtt import RttEstimator
+from spinel.filter import CaptureFilter
+from spinel.pcap import PcapCodec
+from spinel.pcap import PcapWriter
+from spinel.pcap import PCAP_LIVE_FLUSH_INTERVAL
+from spinel.pcap import DLT_IEEE802_15_4_TAP
+from spinel.pcap import DLT_IEEE802_15_4_WITHFCS
+from spinel.phy import channel_str
+from spinel.phy import CHANNEL_MIN
+from spinel.phy import CHANNEL_MAX
+from spinel.sniffer import SnifferSession
+from spinel.sniffer import check_fifo
+from spinel.sniffer import clocks_create
+from spinel.sniffer import frame_write
 from serial.tools.list_ports import comports
 from enum import Enum
+from contextlib import ExitStack
 
 # Nodeid is required to execute ot-ncp-ftd for its sim radio socket port.
 # This is maximum that works for MacOS.
 DEFAULT_NODEID = 34
 COMMON_BAUDRATE = [460800, 115200, 9600]
 
+# Seconds to wait for PROP_CAPS from all ports probed at one baudrate,
+# doubled for each of PROBE_RETRIES retransmissions up to PROBE_TIMEOUT_MAX.
+PROBE_TIMEOUT = 0.1
+PROBE_TIMEOUT_MIN = 0.01
+PROBE_TIMEOUT_MAX = 0.4
+PROBE_RETRIES = 2
+
 
 class Config(Enum):
     CHANNEL = 0
@@ -59,7 +82,8 @@ def extcap_config(interface, option, extcap_version):
     args = []
     values = []
     args.append(
-        (Config.CHANNEL.value, '--channel', 'Channel', 'IEEE 802.15.4 channel',
+        (Config.CHANNEL.value, '--channel', 'Channel',
+         'IEEE 802.15.4 channel, 0-10 for sub-GHz radios',
          'selector', '{required=true}{default=1}'))
 
     match = re.match(r'^(\d+)(\.\d+)*$', extcap_version)
@@ -72,8 +96,9 @@ def extcap_config(interface, option, extcap_version):
         print('arg {number=%d}{call=%s}{display=%s}{tooltip=%s}{type=%s}%s' %
               arg)
 
-    values = values + [(Config.CHANNEL.value, '%d' % i, '%d' % i,
-                        'true' if i == 1 else 'false') for i in range(1, 26)]
+    values = values + [(Config.CHANNEL.value, '%d' % i, channel_str(i),
+                        'true' if i == 1 else 'false')
+                       for i in range(CHANNEL_MIN, CHANNEL_MAX + 1)]
 
     for value in values:
         print('value {arg=%d}{value=%s}{display=%s}{default=%s}' % value)
@@ -87,94 +112,162 @@ def extcap_dlts(interface):
     print('dlt {number=283}{name=IEEE802_15_4_TAP}{display=IEEE 802.15.4 TAP}')
 
 
-def serialopen(interface, log_file):
+def serialprobe(interfaces, hub):
     """
-    Open serial to indentify OpenThread sniffer
-    :param interface: string, eg: '/dev/ttyUSB0 - Zolertia Firefly platform', '/dev/ttyACM1 - nRF52840 OpenThread Device'
+    Probe serial ports to indentify OpenThread sniffers.
+
+    Every baudrate is tried on all ports at once, with responses read by the
+    single hub thread. Ports that stay silent are asked again after an RTO
+    measured from the replies of the others at that baudrate, backed off
+    exponentially so slow links are not missed.
+    :param interfaces: list of strings, eg: ['/dev/ttyUSB0', '/dev/ttyACM1']
+    :return: dict mapping each identified interface to its baudrate
     """
-    sys.stdout = log_file
-    sys.stderr = log_file
-    interface = str(interface).split()[0]
-    baudrate = None
+    found = {}
 
     for speed in COMMON_BAUDRATE:
-        with _StreamCloser(StreamOpen('u', interface, False, baudrate=speed)) as stream, \
-                WpanApi(stream, nodeid=DEFAULT_NODEID, timeout=0.1) as wpan_api:
+        with ExitStack() as stack:
+            probes = []
+            for interface in interfaces:
+                if interface in found:
+                    continue
+                try:
+                    stream = stack.enter_context(
+                        _StreamCloser(
+                            StreamOpen('u', interface, False, baudrate=speed)))
+                except Exception:
+                    continue
+                wpan_api = stack.enter_context(
+                    WpanApi(stream,
+                            nodeid=DEFAULT_NODEID,
+                            timeout=PROBE_TIMEOUT,
+                            hub=hub))
+                wpan_api.queue_wait_prepare(None)
+                probes.append((interface, wpan_api))
+
+            rtt = RttEstimator(PROBE_TIMEOUT,
+                               minimum=PROBE_TIMEOUT_MIN,
+                               maximum=PROBE_TIMEOUT_MAX)
+            for attempt in range(PROBE_RETRIES + 1):
+                for (_, wpan_api) in probes:
+                    # confirm OpenThread Sniffer
+                    wpan_api.prop_change_async(SPINEL.CMD_PROP_VALUE_GET,
+                                               SPINEL.PROP_CAPS, None, None)
+
+                sent = time.monotonic()
+                deadline = sent + rtt.rto()
+                silent = []
+                for (interface, wpan_api) in probes:
+                    # result should not be None for both NCP and RCP
+                    result = wpan_api.queue_wait_for_prop(
+                        SPINEL.PROP_CAPS,
+                        timeout=max(deadline - time.monotonic(),
+                                    PROBE_TIMEOUT_MIN))
+                    if result is not None:
+                        found[interface] = speed
+                        # Karn: a reply to a probe sent again is ambiguous.
+                        # Replies are read in turn, so later ones are
+                        # overestimated, which only lengthens the RTO.
+                        if attempt == 0:
+                            rtt.sample(time.monotonic() - sent)
+                    else:
+                        silent.append((interface, wpan_api))
+
+                probes = silent
+                if not probes:
+                    break
+                rtt.timed_out()
+
+    return found
+
+
+def extcap_interfaces():
+    """List available interfaces to capture from"""
+
+    log_file = open(
+        os.path.join(tempfile.gettempdir(), 'extcap_ot_interfaces.log'), 'w')
+    print(
+        'extcap {version=1.0.0}{display=OpenThread Sniffer}{help=https://github.com/openthread/pyspinel}'
+    )
 
-            # result should not be None for both NCP and RCP
-            result = wpan_api.prop_get_value(
-                SPINEL.PROP_CAPS)  # confirm OpenThread Sniffer
+    sys.stdout = log_file
+    sys.stderr = log_file
+    interfaces = [str(interface).split()[0] for interface in comports()]
 
-            # check whether or not is OpenThread Sniffer
-            if result is not None:
-                baudrate = speed
-                break
+    with WpanHub() as hub:
+        found = serialprobe(interfaces, hub)
 
-    if baudrate is not None:
+    for interface in interfaces:
+        if interface not in found:
+            continue
         if sys.platform == 'win32':
             # Wireshark only shows the value of key `display`('OpenThread Sniffer').
             # Here intentionally appends interface in the end (e.g. 'OpenThread Sniffer: COM0').
             print('interface {value=%s:%s}{display=OpenThread Sniffer %s}' %
-                  (interface, baudrate, interface),
+                  (interface, found[interface], interface),
                   file=sys.__stdout__,
                   flush=True)
         else:
             # On Linux or MacOS, wireshark will show the concatenation of the content of `display`
             # and `interface` by default (e.g. 'OpenThread Sniffer: /dev/ttyACM0').
             print('interface {value=%s:%s}{display=OpenThread Sniffer}' %
-                  (interface, baudrate),
+                  (interface, found[interface]),
                   file=sys.__stdout__,
                   flush=True)
 
 
-def extcap_interfaces():
-    """List available interfaces to capture from"""
-
-    log_file = open(
-        os.path.join(tempfile.gettempdir(), 'extcap_ot_interfaces.log'), 'w')
-    print(
-        'extcap {version=1.0.0}{display=OpenThread Sniffer}{help=https://github.com/openthread/pyspinel}'
-    )
-
-    threads = []
-    for interface in comports():
-        th = threading.Thread(target=serialopen, args=(interface, log_file))
-        threads.append(th)
-        th.start()
-    for th in threads:
-        th.join()
-
-
-def extcap_capture(interface, fifo, control_in, control_out, channel, tap):
+def extcap_capture(interface,
+                   fifo,
+                   control_in,
+                   control_out,
+                   channel,
+                   tap,
+                   capture_filter=None):
     """Start the sniffer to capture packets"""
     # baudrate = detect_baudrate(interface)
     interface_port = str(interface).split(':')[0]
-    interface_baudrate = str(interface).split(':')[1]
-
-    with _StreamCloser(StreamOpen('u', interface_port, False, baudrate=int(interface_baudrate))) as stream, \
-            WpanApi(stream, nodeid=DEFAULT_NODEID) as wpan_api:
-        wpan_api.prop_set_value(SPINEL.PROP_PHY_ENABLED, 1)
-
-    if sys.platform == 'win32':
-        python_path = subprocess.Popen(
-            'py -3 -c "import sys; print(sys.executable)"',
-            stdout=subprocess.PIPE,
-            shell=True,
-        ).stdout.readline().decode().strip()
-        sniffer_py = os.path.join(os.path.dirname(python_path), 'Scripts',
-                                  'sniffer.py')
-        cmd = ['python', sniffer_py]
-    else:
-        cmd = ['sniffer.py']
-    cmd += [
-        '-c', channel, '-u', interface_port, '--crc', '--rssi', '-b',
-        interface_baudrate, '-o',
-        str(fifo), '--is-fifo', '--use-host-timestamp'
-    ]
-    if tap:
-        cmd.append('--tap')
+    interface_baudrate = int(str(interface).split(':')[1])
+
+    if capture_filter:
+        capture_filter = CaptureFilter(capture_filter)
+
+    # The NCP is opened once, and frames written straight to the fifo.
+    stream = StreamOpen('u', interface_port, False, baudrate=interface_baudrate)
+    (clock,) = clocks_create()
+    with SnifferSession(stream,
+                        int(channel),
+                        DEFAULT_NODEID,
+                        capture_filter=capture_filter,
+                        clock=clock,
+                        baudrate=interface_baudrate) as session:
+        if not session.start():
+            raise RuntimeError("failed to initialize sniffer on %s" %
+                               interface_port)
+
+        output = open(fifo, 'wb')
+        fifo_thread = threading.Thread(target=check_fifo, args=(output,))
+        fifo_thread.daemon = True
+        fifo_thread.start()
+        pcap = PcapCodec()
+        writer = PcapWriter(output, flush_interval=PCAP_LIVE_FLUSH_INTERVAL)
+        writer.write(
+            pcap.encode_header(
+                DLT_IEEE802_15_4_TAP if tap else DLT_IEEE802_15_4_WITHFCS))
+        try:
+            for raw in session.frames():
+                frame_write(writer, pcap, raw, rssi=True, crc=True)
+        finally:
+            writer.close()
 
-    subprocess.Popen(cmd).wait()
+
+def extcap_validate_filter(capture_filter):
+    """ Print why a capture filter is invalid, nothing if it is valid. """
+    try:
+        CaptureFilter(capture_filter)
+    except ValueError as ex:
+        print(ex, file=sys.__stdout__, flush=True)
+        return False
+    return True
 
 
 def extcap_close_fifo(fifo):
@@ -223,7 +316,7 @@ if __name__ == '__main__':
 
     # Interface Arguments
     parser.add_argument('--channel',
-                        help='IEEE 802.15.4 capture channel [1-26]')
+                        help='IEEE 802.15.4 capture channel [0-26]')
     parser.add_argument(
         '--tap',
         help='IEEE 802.15.4 TAP (only for Wireshark3.0 and later)',
@@ -267,13 +360,16 @@ if __name__ == '__main__':
         extcap_config(args.extcap_interface, '', extcap_version)
     elif args.extcap_dlts:
         extcap_dlts(args.extcap_interface)
+    elif args.extcap_capture_filter is not None and not args.capture:
+        if not extcap_validate_filter(args.extcap_capture_filter):
+            sys.exit(1)
     elif args.capture:
         if args.fifo is None:
             parser.exit('The fifo must be provided to capture')
         try:
             extcap_capture(args.extcap_interface, args.fifo,
                            args.extcap_control_in, args.extcap_control_out,
-                           args.channel, args.tap)
+                           args.channel, args.tap, args.extcap_capture_filter)
         except KeyboardInterrupt:
             pass
         except Exception as e:
@@ -28,26 +28,46 @@
 import sys
 import optparse
 import time
-import os
 import threading
-from datetime import datetime
+import functools
 
 import spinel.util as util
 import spinel.config as CONFIG
 from spinel.const import SPINEL
-from spinel.codec import WpanApi
+from spinel.hub import WpanHub
+from spinel.merge import FrameMerger
+from spinel.compress import CompressedOutput
+from spinel.compress import COMPRESS_METHODS
+from spinel.filter import CaptureFilter
+from spinel.capstats import CaptureStats
+from spinel.capstats import StatsReporter
+from spinel.sniffer import SnifferSession
+from spinel.sniffer import CaptureLimit
+from spinel.sniffer import check_fifo
+from spinel.sniffer import clocks_create
+from spinel.sniffer import frame_write
+from spinel.sniffer import DEFAULT_CHANNEL
+from spinel.sniffer import DEFAULT_QUEUE_DEPTH
+from spinel.sniffer import DEFAULT_QUEUE_POLICY
+from spinel.survey import ChannelSurvey
+from spinel.survey import channels_parse
+from spinel.survey import survey_lines
+from spinel.survey import SURVEY_DWELL
+from spinel.rotate import CaptureRotator
 from spinel.stream import StreamOpen
 from spinel.pcap import PcapCodec
-
-if sys.platform == 'win32':
-    import ctypes
-    import msvcrt
+from spinel.pcap import PcapWriter
+from spinel.pcap import PCAP_FLUSH_FRAMES
+from spinel.pcap import PCAP_FLUSH_INTERVAL
+from spinel.pcap import PCAP_LIVE_FLUSH_INTERVAL
+from spinel.pcapng import PcapngCodec
+from spinel.boundedqueue import QUEUE_POLICY_NAMES
 
 # Nodeid is required to execute ot-ncp-ftd for its sim radio socket port.
 # This is maximum that works for MacOS.
 DEFAULT_NODEID = 34  # same as WELLKNOWN_NODE_ID
-DEFAULT_CHANNEL = 11
 DEFAULT_BAUDRATE = 115200
+DEFAULT_FORMAT = 'pcap'
 
 DLT_IEEE802_15_4_WITHFCS = 195
 DLT_IEEE802_15_4_TAP = 283
@@ -111,6 +131,24 @@ def parse_args():
                           type="int",
                           default=DEFAULT_CHANNEL)
 
+    opt_parser.add_option("--source",
+                          action="append",
+                          dest="sources",
+                          type="string",
+                          metavar="DEVICE:CHANNEL")
+
+    opt_parser.add_option('--survey',
+                          action='store',
+                          dest='survey',
+                          type='string',
+                          metavar='CHANNELS')
+
+    opt_parser.add_option('--dwell-ms',
+                          action='store',
+                          dest='dwell_ms',
+                          type='int',
+                          default=int(SURVEY_DWELL * 1000))
+
     opt_parser.add_option('--crc',
                           action='store_true',
                           dest='crc',
@@ -131,6 +169,34 @@ def parse_args():
                           dest='tap',
                           default=False)
 
+    opt_parser.add_option('--format',
+                          action='store',
+                          dest='format',
+                          type='choice',
+                          choices=['pcap', 'pcapng'],
+                          default=DEFAULT_FORMAT)
+
+    opt_parser.add_option('--compress',
+                          action='store',
+                          dest='compress',
+                          type='choice',
+                          choices=list(COMPRESS_METHODS))
+
+    opt_parser.add_option('--stats',
+                          action='store',
+                          dest='stats',
+                          type='int')
+
+    opt_parser.add_option('--stats-socket',
+                          action='store',
+                          dest='stats_socket',
+                          type='string')
+
+    opt_parser.add_option('--filter',
+                          action='store',
+                          dest='filter',
+                          type='string')
+
     opt_parser.add_option('--is-fifo',
                           action='store_true',
                           dest='is_fifo',
@@ -141,67 +207,266 @@ def parse_args():
                           dest='use_host_timestamp',
                           default=False)
 
-    return opt_parser.parse_args(args)
-
-
-def sniffer_init(wpan_api, options):
-    """" Send spinel commands to initialize sniffer node. """
-    wpan_api.queue_register(SPINEL.HEADER_DEFAULT)
-    wpan_api.queue_register(SPINEL.HEADER_ASYNC)
-
-    sys.stderr.write("Initializing sniffer...\n")
-
-    if not options.no_reset:
-        wpan_api.cmd_send(SPINEL.CMD_RESET)
-        time.sleep(1)
-
-    wpan_api.prop_set_value(SPINEL.PROP_PHY_ENABLED, 1)
-
-    result = wpan_api.prop_set_value(SPINEL.PROP_MAC_FILTER_MODE,
-                                     SPINEL.MAC_FILTER_MODE_MONITOR)
-    if result is None:
-        return False
-
-    result = wpan_api.prop_set_value(SPINEL.PROP_PHY_CHAN, options.channel)
-    if result is None:
-        return False
+    opt_parser.add_option('--correlate-timestamp',
+                          action='store_true',
+                          dest='correlate_timestamp',
+                          default=False)
 
-    result = wpan_api.prop_set_value(SPINEL.PROP_MAC_RAW_STREAM_ENABLED, 1)
-    if result is None:
-        return False
+    opt_parser.add_option('--queue-depth',
+                          action='store',
+                          dest='queue_depth',
+                          type='int',
+                          default=DEFAULT_QUEUE_DEPTH)
+
+    opt_parser.add_option('--queue-policy',
+                          action='store',
+                          dest='queue_policy',
+                          type='choice',
+                          choices=list(QUEUE_POLICY_NAMES),
+                          default=DEFAULT_QUEUE_POLICY)
+
+    opt_parser.add_option('--flush-frames',
+                          action='store',
+                          dest='flush_frames',
+                          type='int')
+
+    opt_parser.add_option('--flush-ms',
+                          action='store',
+                          dest='flush_ms',
+                          type='int')
+
+    opt_parser.add_option('--rotate-mb',
+                          action='store',
+                          dest='rotate_mb',
+                          type='int')
+
+    opt_parser.add_option('--rotate-seconds',
+                          action='store',
+                          dest='rotate_seconds',
+                          type='int')
+
+    opt_parser.add_option('--rotate-files',
+                          action='store',
+                          dest='rotate_files',
+                          type='int')
+
+    opt_parser.add_option('--stop-frames',
+                          action='store',
+                          dest='stop_frames',
+                          type='int')
+
+    opt_parser.add_option('--stop-seconds',
+                          action='store',
+                          dest='stop_seconds',
+                          type='int')
 
-    return True
+    return opt_parser.parse_args(args)
 
 
-FIFO_CHECK_INTERVAL = 0.1
+def sniffer_report(session, name=None):
+    """ Warn about frames dropped and NCP resets during the capture. """
+    prefix = "WARNING: " if name is None else "WARNING: %s: " % name
+
+    stats = session.stats()
+    if stats['dropped']:
+        sys.stderr.write(
+            prefix + "dropped %d frames on queue overflow (high-water %d)\n" %
+            (stats['dropped'], stats['high_water']))
+
+    if stats['resets']:
+        sys.stderr.write(prefix + "NCP reset %d times, %d restores failed, "
+                         "max downtime %d usec\n" %
+                         (stats['resets'], stats['restore_failures'],
+                          stats['downtime']))
+
+
+def clock_report(clock, name=None):
+    """ Report the offset and drift of the NCP clock from the host's. """
+    if clock is None or not clock.samples:
+        return
+    stats = clock.stats()
+    sys.stderr.write(
+        "%sclock: offset %d usec, drift %.2f ppm, spread %.0f usec, "
+        "%d samples, %d outliers, %d resyncs\n" %
+        ("" if name is None else name + ": ", stats['offset'], stats['drift'],
+         stats['spread'], stats['samples'], stats['outliers'],
+         stats['resets']))
+
+
+def filter_report(options):
+    """ Report how many frames the capture filter dropped. """
+    if options.filter:
+        sys.stderr.write("filter: %d frames passed, %d dropped\n" %
+                         (options.filter.passed, options.filter.dropped))
+
+
+def compress_report(outputs):
+    """ Report the compression ratio and throughput of the outputs. """
+    if not outputs:
+        return
+    stats = [output.stats() for output in outputs]
+    bytes_in = sum(output['bytes_in'] for output in stats)
+    bytes_out = sum(output['bytes_out'] for output in stats)
+    sys.stderr.write(
+        "compress: %s, %d bytes to %d (%.1f%%), %.1f KB/s, "
+        "queue high-water %d, %d stalls\n" %
+        (stats[0]['method'], bytes_in, bytes_out,
+         100.0 * bytes_out / bytes_in if bytes_in else 0,
+         sum(output['rate'] for output in stats) / len(stats) / 1000,
+         max(output['high_water'] for output in stats),
+         sum(output['stalls'] for output in stats)))
+
+
+def source_parse(source):
+    """ Split a --source DEVICE:CHANNEL argument. """
+    (device, _, channel) = source.rpartition(':')
+    if not device:
+        raise ValueError("missing device in --source %s" % source)
+    return (device, int(channel))
+
+
+def stats_register(capture_stats, sessions, options):
+    """ Report the frames dropped before reaching capture_stats. """
+    capture_stats.counter_register(
+        'queue', lambda: sum(session.stats()['dropped']
+                             for session in sessions))
+    capture_stats.counter_register(
+        'fcs', lambda: sum(session.stats()['fcs_errors']
+                           for session in sessions))
+    if options.filter:
+        capture_stats.counter_register('filter',
+                                       lambda: options.filter.dropped)
+
+
+def session_create(stream, options, channel=None, clock=None, hub=None):
+    """ Return the SnifferSession of a stream configured by options. """
+    uart = options.uart or options.sources
+    return SnifferSession(stream,
+                          options.channel if channel is None else channel,
+                          options.nodeid,
+                          reset=not options.no_reset,
+                          capture_filter=options.filter,
+                          clock=clock,
+                          host_timestamp=options.use_host_timestamp,
+                          baudrate=options.baudrate if uart else None,
+                          queue_depth=options.queue_depth,
+                          queue_policy=options.queue_policy,
+                          hub=hub)
+
+
+def sniff(session, pcap, writer, options, capture_stats=None,
+          channel_survey=None):
+    """
+    Write the frames captured by a single NCP. writer may be None for a
+    survey that only reports channel activity.
+    """
+    if capture_stats is not None:
+        stats_register(capture_stats, [session], options)
+    try:
+        for raw in session.frames(options.stop_frames, options.stop_seconds):
+            if capture_stats is not None:
+                capture_stats.record(raw.frame, raw.metadata)
+            if channel_survey is not None:
+                channel_survey.record(raw.frame, raw.metadata)
+            if writer is not None:
+                frame_write(writer, pcap, raw, options.rssi, options.crc,
+                            options.hex)
+    except KeyboardInterrupt:
+        pass
 
+    sniffer_report(session)
+    clock_report(session.clock)
+    filter_report(options)
+
+
+def sniff_sources(sources, pcap, writer, options, capture_stats=None):
+    """
+    Write the frames captured by an NCP per (device, channel) source,
+    merged in timestamp order, with one pcapng interface per source.
+    """
+    merger = FrameMerger(len(sources),
+                         depth=options.queue_depth,
+                         policy=QUEUE_POLICY_NAMES[options.queue_policy])
+    clocks = [None] * len(sources)
+    if options.correlate_timestamp:
+        clocks = clocks_create(len(sources))
+
+    def frame_received(index, session, _prop, value, tid):
+        if tid != SPINEL.HEADER_ASYNC:
+            return False
+        rx_time = time.monotonic()
+        if options.filter and not options.filter.match_stream_raw(value):
+            return True
+        raw = session.decode(value, rx_time)
+        session.captured += 1
+        if capture_stats is not None:
+            capture_stats.record(raw.frame, raw.metadata)
+        merger.put(index, raw.sec * 1000000 + raw.usec, raw, len(raw.frame))
+        return True
+
+    sessions = []
+    if capture_stats is not None:
+        stats_register(capture_stats, sessions, options)
+        capture_stats.counter_register('merge', lambda: merger.dropped)
+    with WpanHub() as hub:
+        for (index, (device, channel)) in enumerate(sources):
+            stream = StreamOpen('u', device, False, options.baudrate,
+                                options.rtscts)
+            if stream is None:
+                exit()
+            session = session_create(stream, options, channel, clocks[index],
+                                     hub)
+            # Frames are decoded on the hub thread, straight into the merger.
+            session.wpan_api.callback_register(
+                SPINEL.PROP_STREAM_RAW,
+                functools.partial(frame_received, index, session))
+            sys.stderr.write("Initializing sniffer on %s...\n" % device)
+            if not session.start():
+                sys.stderr.write("ERROR: failed to initialize sniffer on %s\n" %
+                                 device)
+                exit()
+            sessions.append(session)
+        sys.stderr.write("SUCCESS: sniffer initialized\nSniffing...\n")
 
-def check_fifo(fifo):
-    if sys.platform == 'win32':
-        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
-        handle = msvcrt.get_osfhandle(fifo.fileno())
-        data = b''
-        p_data = ctypes.c_char_p(data)
-        written = ctypes.c_ulong(0)
-        while True:
-            time.sleep(FIFO_CHECK_INTERVAL)
-            if not kernel32.WriteFile(handle, p_data, 0, ctypes.byref(written),
-                                      None):
-                error = ctypes.get_last_error()
-                if error in (
-                        0xe8,  # ERROR_NO_DATA
-                        0xe9,  # ERROR_PIPE_NOT_CONNECTED
-                ):
-                    os._exit(0)
-                else:
-                    raise ctypes.WinError(error)
-    else:
-        while True:
-            time.sleep(FIFO_CHECK_INTERVAL)
-            try:
-                os.stat(fifo.name)
-            except OSError:
-                os._exit(0)
+        limit = CaptureLimit(options.stop_frames, options.stop_seconds)
+        try:
+            while not limit.done():
+                released = merger.get(limit.remaining())
+                if released is None:
+                    continue
+                (index, _, raw) = released
+                frame_write(writer, pcap, raw, options.rssi, options.crc,
+                            options.hex, sources[index][0])
+                limit.count += 1
+        except KeyboardInterrupt:
+            pass
+
+        merger.close()
+        released = merger.get()
+        while released is not None and not (limit.frames and
+                                            limit.count >= limit.frames):
+            (index, _, raw) = released
+            frame_write(writer, pcap, raw, options.rssi, options.crc,
+                        options.hex, sources[index][0])
+            limit.count += 1
+            released = merger.get()
+
+    stats = merger.stats()
+    for ((device, channel), session,
+         source_stats) in zip(sources, sessions, stats['sources']):
+        name = "%s ch %d" % (device, channel)
+        sys.stderr.write("%s: %d frames, %d bytes, %.1f frames/s\n" %
+                         (name, source_stats['frames'], source_stats['bytes'],
+                          source_stats['rate']))
+        sniffer_report(session, name)
+        clock_report(session.clock, name)
+        session.close()
+    sys.stderr.write(
+        "merge: %d reordered, %d late, %d released early, %d dropped, "
+        "high-water %d, max hold %d usec\n" %
+        (stats['reordered'], stats['late'], stats['forced'], stats['dropped'],
+         stats['high_water'], stats['hold']['max'] or 0))
+    filter_report(options)
 
 
 def main():
@@ -211,149 +476,205 @@ def main():
     if options.debug:
         CONFIG.debug_set_level(options.debug)
 
-    if options.use_host_timestamp:
-        print('WARNING: Using host timestamp, may be inaccurate',
-              file=sys.stderr)
-
-    # Set default stream to pipe
-    stream_type = 'p'
-    stream_descriptor = "../../examples/apps/ncp/ot-ncp-ftd " + options.nodeid
-
-    if options.uart:
-        stream_type = 'u'
-        stream_descriptor = options.uart
-    elif options.socket:
-        stream_type = 's'
-        stream_descriptor = options.socket
-    elif options.pipe:
-        stream_type = 'p'
-        stream_descriptor = options.pipe
-        if options.nodeid:
-            stream_descriptor += " " + str(options.nodeid)
-    else:
-        if len(remaining_args) > 0:
-            stream_descriptor = " ".join(remaining_args)
-
-    stream = StreamOpen(stream_type, stream_descriptor, False, options.baudrate,
-                        options.rtscts)
-    if stream is None:
+    sources = None
+    if options.sources:
+        try:
+            sources = [source_parse(source) for source in options.sources]
+        except ValueError as ex:
+            sys.stderr.write("ERROR: %s\n" % ex)
+            exit()
+        # Interfaces of the merged capture are told apart by pcapng.
+        options.format = 'pcapng'
+
+    survey_channels = None
+    if options.survey:
+        if sources:
+            sys.stderr.write("ERROR: --survey uses a single NCP\n")
+            exit()
+        try:
+            survey_channels = channels_parse(options.survey)
+        except ValueError as ex:
+            sys.stderr.write("ERROR: %s\n" % ex)
+            exit()
+        # Frames are annotated with their channel by pcapng interfaces.
+        options.format = 'pcapng'
+
+    if options.tap and options.format == 'pcapng':
+        sys.stderr.write("ERROR: --tap metadata is already carried by pcapng\n")
         exit()
-    wpan_api = WpanApi(stream, options.nodeid)
-    result = sniffer_init(wpan_api, options)
-    if not result:
-        sys.stderr.write("ERROR: failed to initialize sniffer\n")
+
+    if options.filter:
+        try:
+            # Frames are matched before their metadata is even parsed.
+            options.filter = CaptureFilter(options.filter)
+        except ValueError as ex:
+            sys.stderr.write("ERROR: %s\n" % ex)
+            exit()
+
+    rotate = options.rotate_mb or options.rotate_seconds
+    if rotate and not options.output:
+        sys.stderr.write("ERROR: rotating captures requires --output\n")
         exit()
-    else:
-        sys.stderr.write("SUCCESS: sniffer initialized\nSniffing...\n")
 
-    pcap = PcapCodec()
-    hdr = pcap.encode_header(
-        DLT_IEEE802_15_4_TAP if options.tap else DLT_IEEE802_15_4_WITHFCS)
+    if options.compress and options.is_fifo:
+        sys.stderr.write("ERROR: Wireshark fifos cannot be compressed\n")
+        exit()
 
-    if options.hex:
-        hdr = util.hexify_str(hdr) + "\n"
+    if options.use_host_timestamp and options.correlate_timestamp:
+        sys.stderr.write("ERROR: --use-host-timestamp and "
+                         "--correlate-timestamp are exclusive\n")
+        exit()
 
-    if options.output:
+    if options.use_host_timestamp:
+        print('WARNING: Using host timestamp, may be inaccurate',
+              file=sys.stderr)
+    elif sources and len(sources) > 1 and not options.correlate_timestamp:
+        # NCP uptimes of different dongles cannot be ordered against each
+        # other, the merge needs them on the host clock.
+        sys.stderr.write("Correlating timestamps of %d sources\n" %
+                         len(sources))
+        options.correlate_timestamp = True
+
+    session = None
+    if sources is None:
+        # Set default stream to pipe
+        stream_type = 'p'
+        stream_descriptor = ("../../examples/apps/ncp/ot-ncp-ftd " +
+                             options.nodeid)
+
+        if options.uart:
+            stream_type = 'u'
+            stream_descriptor = options.uart
+        elif options.socket:
+            stream_type = 's'
+            stream_descriptor = options.socket
+        elif options.pipe:
+            stream_type = 'p'
+            stream_descriptor = options.pipe
+            if options.nodeid:
+                stream_descriptor += " " + str(options.nodeid)
+        else:
+            if len(remaining_args) > 0:
+                stream_descriptor = " ".join(remaining_args)
+
+        stream = StreamOpen(stream_type, stream_descriptor, False,
+                            options.baudrate, options.rtscts)
+        if stream is None:
+            exit()
+        clock = None
+        if options.correlate_timestamp:
+            (clock,) = clocks_create()
+        session = session_create(stream, options, clock=clock)
+        sys.stderr.write("Initializing sniffer...\n")
+        if not session.start():
+            sys.stderr.write("ERROR: failed to initialize sniffer\n")
+            exit()
+        else:
+            sys.stderr.write("SUCCESS: sniffer initialized\nSniffing...\n")
+
+    if options.format == 'pcapng':
+        # Radio metadata goes in TAP TLVs, so the FCS is left intact.
+        pcap = PcapngCodec(device=options.uart, channel=options.channel)
+    else:
+        pcap = PcapCodec()
+
+    def file_header():
+        """ Header of a capture file, restarting pcapng interfaces. """
+        if options.format == 'pcapng':
+            hdr = pcap.encode_header()
+        else:
+            hdr = pcap.encode_header(DLT_IEEE802_15_4_TAP if options.
+                                     tap else DLT_IEEE802_15_4_WITHFCS)
+        if options.hex:
+            hdr = (util.hexify_str(hdr) + "\n").encode()
+        return hdr
+
+    # Live captures read by Wireshark get frames within a few milliseconds.
+    flush_frames = options.flush_frames
+    if flush_frames is None:
+        flush_frames = PCAP_FLUSH_FRAMES
+    flush_interval = PCAP_FLUSH_INTERVAL
+    if options.is_fifo or not options.output:
+        flush_interval = PCAP_LIVE_FLUSH_INTERVAL
+    if options.flush_ms is not None:
+        flush_interval = options.flush_ms / 1000.0
+
+    compressed = []
+
+    def output_wrap(output):
+        """ Compress output on its own thread if requested. """
+        if options.compress:
+            output = CompressedOutput(output, options.compress)
+            compressed.append(output)
+        return output
+
+    if rotate:
+        channels = [channel for _, channel in sources or []]
+        channels = channels or [options.channel]
+        label = "ch" + "-".join(str(channel) for channel in channels)
+        if survey_channels:
+            label = "survey"
+        writer = CaptureRotator(
+            options.output,
+            label,
+            file_header,
+            max_bytes=(options.rotate_mb or 0) * 1024 * 1024,
+            max_seconds=options.rotate_seconds,
+            keep=options.rotate_files,
+            opener=lambda path: output_wrap(open(path, 'wb')),
+            flush_frames=flush_frames,
+            flush_interval=flush_interval)
+        output = None
+    elif options.output:
         output = open(options.output, 'wb')
+    elif survey_channels:
+        # Only the channel activity summary is written.
+        (output, writer) = (None, None)
     elif hasattr(sys.stdout, 'buffer'):
         output = sys.stdout.buffer
     else:
         output = sys.stdout
 
-    output.write(hdr)
-    output.flush()
+    if output is not None:
+        writer = PcapWriter(output_wrap(output), flush_frames, flush_interval)
+        writer.write(file_header())
 
-    if options.is_fifo:
+    if options.is_fifo and output is not None:
+        # Rotated files and survey summaries have no fifo reader to watch.
         threading.Thread(target=check_fifo, args=(output,)).start()
 
-    epoch = datetime(1970, 1, 1)
-    timebase = datetime.utcnow() - epoch
-    timebase_sec = timebase.days * 24 * 60 * 60 + timebase.seconds
-    timebase_usec = timebase.microseconds
-
-    try:
-        tid = SPINEL.HEADER_ASYNC
-        prop_id = SPINEL.PROP_STREAM_RAW
-        while True:
-            result = wpan_api.queue_wait_for_prop(prop_id, tid)
-            if result and result.prop == prop_id:
-                length = wpan_api.parse_S(result.value)
-                pkt = result.value[2:2 + length]
-
-                # metadata format (totally 19 bytes or 26 bytes):
-                # 0. RSSI(int8)
-                # 1. Noise Floor(int8)
-                # 2. Flags(uint16)
-                # 3. PHY-specific data struct contains:
-                #     3.0 Channel(uint8)
-                #     3.1 LQI(uint8)
-                #     3.2 Timestamp in microseconds(uint64)
-                # 4. Vendor data struct contains:
-                #     4.0 Receive error(uint8)
-                # 5. (optional) MAC data struct contains:
-                #     5.0 ACK key ID(uint8)
-                #     5.1 ACK frame counter(uint32)
-                if len(result.value) in [2 + length + 19, 2 + length + 26]:
-                    metadata = wpan_api.parse_fields(
-                        result.value[2 + length:2 + length + 19],
-                        "ccSt(CCX)t(i)")
-
-                    timestamp = metadata[3][2]
-                    timestamp_sec = timestamp / 1000000
-                    timestamp_usec = timestamp % 1000000
-
-                # (deprecated) metadata format (totally 17 bytes):
-                # 0. RSSI(int8)
-                # 1. Noise Floor(int8)
-                # 2. Flags(uint16)
-                # 3. PHY-specific data struct contains:
-                #     3.0 Channel(uint8)
-                #     3.1 LQI(uint8)
-                #     3.2 Timestamp Msec(uint32)
-                #     3.3 Timestamp Usec(uint16)
-                # 4. Vendor data struct contains:
-                #     4.0 Receive error(uint8)
-                elif len(result.value) == 2 + length + 17:
-                    metadata = wpan_api.parse_fields(
-                        result.value[2 + length:2 + length + 17],
-                        "ccSt(CCLS)t(i)")
-
-                    timestamp_usec = timebase_usec + metadata[3][
-                        2] * 1000 + metadata[3][3]
-                    timestamp_sec = timebase_sec + timestamp_usec / 1000000
-                    timestamp_usec = timestamp_usec % 1000000
-
-                # Some old version NCP doesn't contain timestamp information in metadata
-                else:
-                    timestamp = datetime.utcnow() - epoch
-                    timestamp_sec = timestamp.days * 24 * 60 * 60 + timestamp.seconds
-                    timestamp_usec = timestamp.microseconds
-
-                    if options.rssi:
-                        sys.stderr.write(
-                            "WARNING: failed to display RSSI, please update the NCP version\n"
-                        )
-
-                if options.use_host_timestamp:
-                    timestamp = round(time.time() * 1000000)
-                    timestamp_sec = timestamp // 1000000
-                    timestamp_usec = timestamp % 1000000
-
-                pkt = pcap.encode_frame(pkt, int(timestamp_sec), timestamp_usec,
-                                        options.rssi, options.crc, metadata)
-
-                if options.hex:
-                    pkt = util.hexify_str(pkt) + "\n"
-                output.write(pkt)
-                output.flush()
-
-    except KeyboardInterrupt:
-        pass
+    capture_stats = None
+    reporter = None
+    if options.stats or options.stats_socket:
+        capture_stats = CaptureStats()
+        try:
+            reporter = StatsReporter(capture_stats, options.stats,
+                                     options.stats_socket)
+        except (OSError, ValueError) as ex:
+            sys.stderr.write("ERROR: stats socket: %s\n" % ex)
+            exit()
+
+    channel_survey = None
+    if survey_channels:
+        channel_survey = ChannelSurvey(session.wpan_api, survey_channels,
+                                       options.dwell_ms / 1000.0)
+        channel_survey.start()
+
+    if sources is None:
+        sniff(session, pcap, writer, options, capture_stats, channel_survey)
+        if channel_survey is not None:
+            channel_survey.stop()
+            print("\n".join(survey_lines(channel_survey.summary())))
+        session.close()
+    else:
+        sniff_sources(sources, pcap, writer, options, capture_stats)
 
-    if wpan_api:
-        wpan_api.stream.close()
+    if reporter is not None:
+        reporter.close()
 
-    output.close()
+    if writer is not None:
+        writer.close()
+    compress_report(compressed)
 
 
 if __name__ == "__main__":
@@ -44,6 +44,8 @@ from spinel.const import SPINEL
 from spinel.const import kThread
 from spinel.codec import WpanApi
 from spinel.codec import SpinelCodec
+from spinel.cache import CACHE_POLICY_STATIC
+from spinel.cache import CACHE_POLICY_NOTIFY
 from spinel.stream import StreamOpen
 from spinel.tun import TunInterface
 import spinel.config as CONFIG
@@ -62,6 +64,21 @@ import spinel.common as common
 
 DEFAULT_BAUDRATE = 115200
 
+# Properties that rarely change and are safe to serve from the WpanApi cache.
+CLI_CACHE_POLICIES = {
+    SPINEL.PROP_CAPS: CACHE_POLICY_STATIC,
+    SPINEL.PROP_NCP_VERSION: CACHE_POLICY_STATIC,
+    SPINEL.PROP_HWADDR: CACHE_POLICY_STATIC,
+    SPINEL.PROP_IPV6_LL_ADDR: CACHE_POLICY_NOTIFY,
+    SPINEL.PROP_IPV6_ML_ADDR: CACHE_POLICY_NOTIFY,
+}
+
+# Unsolicited notifications kept for commands waiting on NCP events.
+CLI_ASYNC_QUEUE_DEPTH = 64
+
+# Upper bound on the time an active scan may take.
+SCAN_TIMEOUT = 5
+
 
 class IcmpV6Factory(object):
 
@@ -145,8 +162,13 @@ class SpinelCliCmd(Cmd, SpinelCodec):
         self.nodeid = nodeid
         self.tun_if = None
 
-        self.wpan_api = WpanApi(stream, nodeid, vendor_module=vendor_module)
+        self.wpan_api = WpanApi(stream,
+                                nodeid,
+                                vendor_module=vendor_module,
+                                cache_policies=CLI_CACHE_POLICIES)
         self.wpan_api.queue_register(SPINEL.HEADER_DEFAULT)
+        self.wpan_api.queue_register(SPINEL.HEADER_ASYNC,
+                                     maxsize=CLI_ASYNC_QUEUE_DEPTH)
         self.wpan_api.callback_register(SPINEL.PROP_STREAM_NET,
                                         self.wpan_callback)
 
@@ -192,6 +214,8 @@ class SpinelCliCmd(Cmd, SpinelCodec):
         'history',
         'debug',
         'debug-mem',
+        'cache',
+        'perf',
         'v',
         'h',
         'q',
@@ -317,6 +341,10 @@ class SpinelCliCmd(Cmd, SpinelCodec):
         """ Blocking helper to return value for given propery identifier. """
         return self.wpan_api.prop_get_value(prop_id)
 
+    def prop_get_many(self, prop_ids):
+        """ Blocking helper to return a dict of values for given properties. """
+        return self.wpan_api.prop_get_many(prop_ids)
+
     def prop_set_value(self, prop_id, value, py_format='B'):
         """ Blocking helper to set value for given propery identifier. """
         return self.wpan_api.prop_set_value(prop_id, value, py_format)
@@ -521,6 +549,113 @@ class SpinelCliCmd(Cmd, SpinelCodec):
         print()
         print(heap_stats.heap().byrcs)
 
+    def do_cache(self, line):
+        """
+        cache
+
+            Show property cache statistics.
+
+            > cache
+            hits: 12
+            misses: 3
+            invalidations: 1
+            flushes: 0
+            entries: 3
+            Done
+
+        cache flush
+
+            Drop all cached property values.
+
+            > cache flush
+            Done
+        """
+        stats = self.wpan_api.cache_stats()
+        if stats is None:
+            print("Error")
+            return
+
+        if line == "flush":
+            self.wpan_api.cache.flush()
+        elif line:
+            print("Error")
+            return
+        else:
+            for name in ('hits', 'misses', 'invalidations', 'flushes',
+                         'entries'):
+                print("%s: %d" % (name, stats[name]))
+        print("Done")
+
+    def do_perf(self, line):
+        """
+        perf
+
+            Show round-trip latency percentiles (in usec) per command and
+            property, and counters of timeouts, late and unmatched responses.
+
+            > perf
+            GET NET_ROLE: count 12 p50 1535 p90 2047 p99 2559 p99.9 2559 max 2611 timeouts 0
+            GET: count 12 p50 1535 p90 2047 p99 2559 p99.9 2559 max 2611 timeouts 0
+            timeouts: 0
+            late: 0
+            unmatched: 0
+            resets: 0
+            restore_failures: 0
+            rtt: srtt 1610 rttvar 302 rto 20000
+            tx control hol: count 14 p50 0 p90 0 p99 3 p99.9 3 max 3
+            Done
+
+        perf reset
+
+            Clear all latency histograms and counters.
+
+            > perf reset
+            Done
+        """
+        if line == "reset":
+            self.wpan_api.metrics_reset()
+            print("Done")
+            return
+        elif line:
+            print("Error")
+            return
+
+        def stats_str(stats):
+            text = "count %d" % stats['count']
+            for name in ('p50', 'p90', 'p99', 'p99.9', 'max'):
+                if stats[name] is not None:
+                    text += " %s %d" % (name, stats[name])
+            if 'timeouts' in stats:
+                text += " timeouts %d" % stats['timeouts']
+            return text
+
+        metrics = self.wpan_api.metrics()
+        for (cmd, prop), stats in sorted(metrics['requests'].items()):
+            print("%s %s: %s" % (cmd, prop, stats_str(stats)))
+        for cmd, stats in sorted(metrics['commands'].items()):
+            print("%s: %s" % (cmd, stats_str(stats)))
+        for name in ('timeouts', 'late', 'unmatched', 'resets',
+                     'restore_failures'):
+            print("%s: %d" % (name, metrics[name]))
+        if metrics['downtime']['count']:
+            print("downtime: %s" % stats_str(metrics['downtime']))
+        rtt = metrics['rtt']
+        if rtt['samples']:
+            print("rtt: srtt %d rttvar %d rto %d" %
+                  (rtt['srtt'], rtt['rttvar'], rtt['rto']))
+        for name in ('control', 'bulk'):
+            stats = metrics['tx'][name]
+            if stats['count']:
+                print("tx %s hol: %s" % (name, stats_str(stats)))
+        pacing = metrics.get('pacing')
+        if pacing:
+            print("pacing: window %.1f inflight %d sent %d ok %d nomem %d "
+                  "busy %d lost %d decreases %d" %
+                  (pacing['window'], pacing['inflight'], pacing['sent'],
+                   pacing['ok'], pacing['nomem'], pacing['busy'],
+                   pacing['lost'], pacing['decreases']))
+        print("Done")
+
     def do_bufferinfo(self, line):
         """
         \033[1mbufferinfo\033[0m
@@ -831,14 +966,13 @@ class SpinelCliCmd(Cmd, SpinelCodec):
         if params[0] == "mac":
 
             if len(params) == 1:
-                histogram = None
-                result = self.prop_get_value(SPINEL.PROP_CNTR_ALL_MAC_COUNTERS)
-                caps_list = self.prop_get_value(SPINEL.PROP_CAPS)
+                prop_ids = [SPINEL.PROP_CNTR_ALL_MAC_COUNTERS]
+                if self.wpan_api.has_cap(SPINEL.CAP_MAC_RETRY_HISTOGRAM):
+                    prop_ids.append(SPINEL.PROP_CNTR_MAC_RETRY_HISTOGRAM)
 
-                for caps in caps_list[0]:
-                    if SPINEL.CAP_MAC_RETRY_HISTOGRAM == caps[0][0]:
-                        histogram = self.prop_get_value(
-                            SPINEL.PROP_CNTR_MAC_RETRY_HISTOGRAM)
+                values = self.prop_get_many(prop_ids)
+                result = values[SPINEL.PROP_CNTR_ALL_MAC_COUNTERS]
+                histogram = values.get(SPINEL.PROP_CNTR_MAC_RETRY_HISTOGRAM)
 
                 if result != None:
                     counters_tx = result[0][0]
@@ -1244,13 +1378,18 @@ class SpinelCliCmd(Cmd, SpinelCodec):
             Leader Router ID: 47
             Done
         """
-        partition_id = self.prop_get_value(SPINEL.PROP_NET_PARTITION_ID)
-        weighting = self.prop_get_value(SPINEL.PROP_THREAD_LEADER_WEIGHT)
-        data_version = self.prop_get_value(
-            SPINEL.PROP_THREAD_NETWORK_DATA_VERSION)
-        stable_version = self.prop_get_value(
-            SPINEL.PROP_THREAD_STABLE_NETWORK_DATA_VERSION)
-        leader_id = self.prop_get_value(SPINEL.PROP_THREAD_LEADER_RID)
+        values = self.prop_get_many([
+            SPINEL.PROP_NET_PARTITION_ID,
+            SPINEL.PROP_THREAD_LEADER_WEIGHT,
+            SPINEL.PROP_THREAD_NETWORK_DATA_VERSION,
+            SPINEL.PROP_THREAD_STABLE_NETWORK_DATA_VERSION,
+            SPINEL.PROP_THREAD_LEADER_RID,
+        ])
+        partition_id = values[SPINEL.PROP_NET_PARTITION_ID]
+        weighting = values[SPINEL.PROP_THREAD_LEADER_WEIGHT]
+        data_version = values[SPINEL.PROP_THREAD_NETWORK_DATA_VERSION]
+        stable_version = values[SPINEL.PROP_THREAD_STABLE_NETWORK_DATA_VERSION]
+        leader_id = values[SPINEL.PROP_THREAD_LEADER_RID]
 
         if partition_id   is None or \
            weighting      is None or \
@@ -1835,10 +1974,18 @@ class SpinelCliCmd(Cmd, SpinelCodec):
         Done
         """
         # Initial mock-up of scan
+        self.wpan_api.queue_wait_prepare(None, SPINEL.HEADER_ASYNC)
         self.handle_property("15", SPINEL.PROP_MAC_SCAN_MASK)
         self.handle_property("4", SPINEL.PROP_MAC_SCAN_PERIOD, 'H')
         self.handle_property("1", SPINEL.PROP_MAC_SCAN_STATE)
-        time.sleep(5)
+        # The NCP reports SCAN_STATE_IDLE on HEADER_ASYNC once done.
+        deadline = time.monotonic() + SCAN_TIMEOUT
+        while time.monotonic() < deadline:
+            item = self.wpan_api.queue_wait_for_prop(
+                SPINEL.PROP_MAC_SCAN_STATE, SPINEL.HEADER_ASYNC,
+                deadline - time.monotonic())
+            if item is None or item.value == SPINEL.SCAN_STATE_IDLE:
+                break
         self.handle_property("", SPINEL.PROP_MAC_SCAN_BEACON, 'U')
 
     def complete_thread(self, text, _line, _begidx, _endidx):
@@ -2421,6 +2568,11 @@ def parse_args():
                           action="store",
                           dest="vendor_path",
                           type="string")
+    opt_parser.add_option("--pacing",
+                          action="store_true",
+                          dest="pacing",
+                          default=False,
+                          help="pace IPv6 packets to the NCP buffer space")
 
     return opt_parser.parse_args(args)
 
@@ -2474,6 +2626,9 @@ def main():
                              nodeid=options.nodeid,
                              vendor_module=vendor_module)
 
+    if options.pacing:
+        shell.wpan_api.pacing_enable()
+
     try:
         shell.cmdloop()
     except KeyboardInterrupt:
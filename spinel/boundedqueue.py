@@ -0,0 +1,159 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing the bounded per-TID property queue of WpanApi.
+"""
+
+import queue
+from collections import defaultdict
+
+# What put() does when the queue, or the property, is at its limit.
+QUEUE_POLICY_DROP_OLDEST = 0  # Discard the oldest item to make room.
+QUEUE_POLICY_DROP_NEWEST = 1  # Discard the item being added.
+QUEUE_POLICY_BLOCK = 2  # Block the reader thread until there is room.
+
+QUEUE_POLICY_NAMES = {
+    'drop-oldest': QUEUE_POLICY_DROP_OLDEST,
+    'drop-newest': QUEUE_POLICY_DROP_NEWEST,
+    'block': QUEUE_POLICY_BLOCK,
+}
+
+
+class BoundedQueue(queue.Queue):
+    """ A queue.Queue of PropertyItems with drop policies and overflow counters. """
+
+    def __init__(self,
+                 maxsize=0,
+                 policy=QUEUE_POLICY_DROP_OLDEST,
+                 prop_limits=None):
+        self.policy = policy
+        self.prop_limits = dict(prop_limits or {})
+        self.high_water = 0
+        self.dropped = 0
+        self.dropped_props = defaultdict(int)
+        queue.Queue.__init__(self, maxsize)
+
+    def configure(self, maxsize=0, policy=QUEUE_POLICY_DROP_OLDEST,
+                  prop_limits=None):
+        """ Change the limits of the queue, keeping queued items. """
+        with self.mutex:
+            self.maxsize = maxsize
+            self.policy = policy
+            self.prop_limits = dict(prop_limits or {})
+            self.not_full.notify_all()
+
+    # Keep per-property counts on the low level accessors, which are also
+    # used directly by WpanApi.queue_wait_for_prop() to reorder items.
+
+    def _init(self, maxsize):
+        queue.Queue._init(self, maxsize)
+        self.prop_count = defaultdict(int)
+
+    def _put(self, item):
+        queue.Queue._put(self, item)
+        self.prop_count[item.prop] += 1
+        if len(self.queue) > self.high_water:
+            self.high_water = len(self.queue)
+
+    def _get(self):
+        item = queue.Queue._get(self)
+        self.prop_count[item.prop] -= 1
+        return item
+
+    def _count_drop(self, prop):
+        self.dropped += 1
+        self.dropped_props[prop] += 1
+
+    def _drop_oldest(self, prop=None):
+        """ Remove the oldest item, or the oldest item of prop if given. """
+        if prop is None:
+            item = self._get()
+        else:
+            item = next(item for item in self.queue if item.prop == prop)
+            self.queue.remove(item)
+            self.prop_count[prop] -= 1
+        self.unfinished_tasks -= 1
+        self._count_drop(item.prop)
+
+    def _wait_for_room(self, has_room, block, timeout):
+        """ Wait on not_full until has_room() for QUEUE_POLICY_BLOCK. """
+        if has_room():
+            return
+        if not block or not self.not_full.wait_for(has_room, timeout):
+            raise queue.Full
+
+    def put(self, item, block=True, timeout=None):
+        with self.not_full:
+            prop = item.prop
+            prop_limit = self.prop_limits.get(prop, 0)
+            if prop_limit > 0:
+                if self.policy == QUEUE_POLICY_BLOCK:
+                    self._wait_for_room(
+                        lambda: self.prop_count[prop] < prop_limit, block,
+                        timeout)
+                elif self.prop_count[prop] >= prop_limit:
+                    if self.policy == QUEUE_POLICY_DROP_NEWEST:
+                        self._count_drop(prop)
+                        return
+                    self._drop_oldest(prop)
+
+            if self.maxsize > 0:
+                if self.policy == QUEUE_POLICY_BLOCK:
+                    self._wait_for_room(lambda: self._qsize() < self.maxsize,
+                                        block, timeout)
+                elif self._qsize() >= self.maxsize:
+                    if self.policy == QUEUE_POLICY_DROP_NEWEST:
+                        self._count_drop(prop)
+                        return
+                    self._drop_oldest()
+
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def get_until(self, deadline):
+        """
+        Remove and return the next item, or None once deadline has expired.
+
+        deadline is a spinel.timer.Deadline.
+        """
+        with self.not_empty:
+            while not self._qsize():
+                if deadline.expired:
+                    return None
+                self.not_empty.wait(deadline.remaining())
+            item = self._get()
+            self.not_full.notify()
+            return item
+
+    def clear(self):
+        """ Discard all queued items. """
+        with self.mutex:
+            self.queue.clear()
+            self.prop_count.clear()
+            self.not_full.notify_all()
+
+    def stats(self):
+        """ Return a snapshot of the depth and overflow counters. """
+        with self.mutex:
+            return {
+                'depth': len(self.queue),
+                'maxsize': self.maxsize,
+                'high_water': self.high_water,
+                'dropped': self.dropped,
+                'dropped_props': dict(self.dropped_props),
+            }
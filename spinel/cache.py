@@ -0,0 +1,124 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing a property value cache for WpanApi.
+"""
+
+import threading
+import time
+
+# Only properties given a policy are cached.
+CACHE_POLICY_STATIC = 0  # Valid until the NCP resets, e.g. PROP_CAPS.
+CACHE_POLICY_TTL = 1  # Valid for a fixed number of seconds.
+CACHE_POLICY_NOTIFY = 2  # Valid until changed on HEADER_ASYNC.
+
+CACHE_TTL_DEFAULT = 1.0
+
+
+class PropertyCache(object):
+    """ Per-property value cache with hit / miss accounting. """
+
+    def __init__(self, policies=None):
+        self._policies = {}  # Map prop_id to (policy, ttl).
+        self._entries = {}  # Map prop_id to (value, expiry).
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.flushes = 0
+
+        if policies:
+            self.policy_update(policies)
+
+    def policy_update(self, policies):
+        """
+        Set policies from a dict mapping prop_id to a CACHE_POLICY_* value
+        or to a (CACHE_POLICY_TTL, seconds) tuple.
+        """
+        for prop_id, policy in policies.items():
+            if isinstance(policy, tuple):
+                self.policy_set(prop_id, *policy)
+            else:
+                self.policy_set(prop_id, policy)
+
+    def policy_set(self, prop_id, policy, ttl=CACHE_TTL_DEFAULT):
+        """ Enable caching of the given property with the given policy. """
+        with self._lock:
+            self._policies[prop_id] = (policy, ttl)
+            self._entries.pop(prop_id, None)
+
+    def policy_clear(self, prop_id):
+        """ Disable caching of the given property. """
+        with self._lock:
+            self._policies.pop(prop_id, None)
+            self._entries.pop(prop_id, None)
+
+    def is_cacheable(self, prop_id):
+        return prop_id in self._policies
+
+    def get(self, prop_id):
+        """ Return the cached value for prop_id, or None on a miss. """
+        if prop_id not in self._policies:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(prop_id)
+            if entry is not None:
+                (value, expiry) = entry
+                if expiry is None or time.monotonic() < expiry:
+                    self.hits += 1
+                    return value
+                del self._entries[prop_id]
+            self.misses += 1
+            return None
+
+    def update(self, prop_id, value):
+        """ Store a freshly received value if prop_id is cacheable. """
+        if value is None or prop_id not in self._policies:
+            return
+
+        with self._lock:
+            (policy, ttl) = self._policies[prop_id]
+            if policy == CACHE_POLICY_TTL:
+                expiry = time.monotonic() + ttl
+            else:
+                expiry = None
+            self._entries[prop_id] = (value, expiry)
+
+    def invalidate(self, prop_id):
+        """ Drop the cached value for prop_id, if any. """
+        with self._lock:
+            if self._entries.pop(prop_id, None) is not None:
+                self.invalidations += 1
+
+    def flush(self):
+        """ Drop all cached values, e.g. after an NCP reset. """
+        with self._lock:
+            self._entries.clear()
+            self.flushes += 1
+
+    def stats(self):
+        """ Return a snapshot of the cache counters. """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'flushes': self.flushes,
+                'entries': len(self._entries),
+            }
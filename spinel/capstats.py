@@ -0,0 +1,312 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing live statistics of a sniffer capture.
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+
+import spinel.config as CONFIG
+from spinel.filter import SRC_ADDR
+from spinel.filter import mhr_layout
+
+# Source addresses counted by the space-saving algorithm.
+TALKER_SLOTS = 64
+
+# Top talkers reported.
+TALKER_TOP = 5
+
+
+class SpaceSaving(object):
+    """
+    Approximate counts of the most frequent keys of a stream.
+
+    Keys are kept with their count in at most slots counters. An unknown
+    key replaces one with the smallest count, inheriting it, so counts are
+    overestimated by at most their error. Counters are grouped in buckets
+    by count, which makes every update O(1).
+    """
+
+    def __init__(self, slots=TALKER_SLOTS):
+        self.slots = slots
+        self.counts = {}  # Map key to count.
+        self.errors = {}  # Map key to overestimation of its count.
+        self._buckets = {}  # Map count to the set of keys with that count.
+        self._min = 0
+
+    def add(self, key):
+        count = self.counts.get(key)
+        if count is not None:
+            bucket = self._buckets[count]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[count]
+        elif len(self.counts) < self.slots:
+            count = 0
+            self.errors[key] = 0
+        else:
+            bucket = self._buckets[self._min]
+            evicted = bucket.pop()
+            if not bucket:
+                del self._buckets[self._min]
+            count = self.counts.pop(evicted)
+            del self.errors[evicted]
+            self.errors[key] = count
+
+        count += 1
+        self.counts[key] = count
+        if count in self._buckets:
+            self._buckets[count].add(key)
+        else:
+            self._buckets[count] = {key}
+        if count == 1 or self._min not in self._buckets:
+            self._min = count
+
+    def top(self, count):
+        """ Return the [(key, count, error)] of the most frequent keys. """
+        keys = sorted(self.counts, key=self.counts.get, reverse=True)
+        return [(key, self.counts[key], self.errors[key])
+                for key in keys[:count]]
+
+
+def address_str(address):
+    """ Format a little endian MAC address the way Wireshark shows it. """
+    if len(address) == 2:
+        return "0x%04x" % int.from_bytes(address, 'little')
+    return ":".join("%02x" % octet for octet in reversed(address))
+
+
+def histogram_stats(histogram, offset):
+    """ Return the min, median and max of a histogram of value + offset. """
+    total = sum(histogram)
+    if not total:
+        return {'min': None, 'p50': None, 'max': None}
+    indexes = [index for (index, count) in enumerate(histogram) if count]
+    seen = 0
+    for index in indexes:
+        seen += histogram[index]
+        if seen * 2 >= total:
+            break
+    return {
+        'min': indexes[0] - offset,
+        'p50': index - offset,
+        'max': indexes[-1] - offset,
+    }
+
+
+class CaptureStats(object):
+    """ Frame, error, radio and talker counters of a capture. """
+
+    def __init__(self, talkers=TALKER_SLOTS):
+        self.frames = 0
+        self.bytes = 0
+        self.rx_errors = 0  # Frames the NCP flagged with a receive error.
+        self.rssi = [0] * 256  # Indexed by RSSI + 128.
+        self.lqi = [0] * 256
+        self.talkers = SpaceSaving(talkers)
+        self.skew = None  # Host minus NCP timestamp of the first frame.
+        self.skew_min = None
+        self.skew_max = None
+        self.skew_last = None
+        self.start = time.monotonic()
+
+        self._lock = threading.Lock()
+        self._counters = []
+
+    def counter_register(self, name, counter):
+        """ Report counter(), such as frames dropped elsewhere, as name. """
+        self._counters.append((name, counter))
+
+    def record(self, frame, metadata=None):
+        """ Account for a raw frame and its PROP_STREAM_RAW metadata. """
+        host_usec = int(time.time() * 1000000)
+        with self._lock:
+            self.frames += 1
+            self.bytes += len(frame)
+
+            if len(frame) >= 3:
+                fcf = frame[0] | frame[1] << 8
+                (offset, size) = mhr_layout(fcf)[SRC_ADDR]
+                if size and offset + size <= len(frame):
+                    self.talkers.add(bytes(frame[offset:offset + size]))
+
+            if metadata is None:
+                return
+            self.rssi[metadata[0] + 128] += 1
+            phy = metadata[3]
+            self.lqi[phy[1]] += 1
+            if metadata[4][0][0]:
+                self.rx_errors += 1
+
+            if len(phy) == 3:
+                ncp_usec = phy[2]
+            else:
+                ncp_usec = phy[2] * 1000 + phy[3]
+            skew = host_usec - ncp_usec
+            if self.skew is None:
+                self.skew = self.skew_min = self.skew_max = skew
+            # Only changes of the skew matter, the NCP clock starts at boot.
+            self.skew_min = min(self.skew_min, skew)
+            self.skew_max = max(self.skew_max, skew)
+            self.skew_last = skew
+
+    def snapshot(self):
+        """ Return the counters, with averages since the capture started. """
+        with self._lock:
+            elapsed = time.monotonic() - self.start
+            result = {
+                'elapsed': elapsed,
+                'frames': self.frames,
+                'bytes': self.bytes,
+                'frame_rate': self.frames / elapsed if elapsed else 0,
+                'byte_rate': self.bytes / elapsed if elapsed else 0,
+                'rx_errors': self.rx_errors,
+                'rssi': histogram_stats(self.rssi, 128),
+                'lqi': histogram_stats(self.lqi, 0),
+                'talkers': [(address_str(address), count)
+                            for (address, count,
+                                 _) in self.talkers.top(TALKER_TOP)],
+                'skew': {
+                    'drift': None,
+                    'spread': None,
+                },
+            }
+            if self.skew is not None:
+                result['skew'] = {
+                    'drift': self.skew_last - self.skew,
+                    'spread': self.skew_max - self.skew_min,
+                }
+        result['dropped'] = dict(
+            (name, counter()) for (name, counter) in self._counters)
+        return result
+
+
+def stats_line(snapshot, frame_rate, byte_rate):
+    """ Format a snapshot as one line, with the given current rates. """
+    line = "stats: %.0f frames/s, %.0f B/s, %d frames" % (
+        frame_rate, byte_rate, snapshot['frames'])
+    dropped = ", ".join("%s %d" % item
+                        for item in sorted(snapshot['dropped'].items()))
+    line += ", dropped: %s, rx errors %d" % (dropped or "none",
+                                             snapshot['rx_errors'])
+    rssi = snapshot['rssi']
+    if rssi['p50'] is not None:
+        line += ", rssi %d/%d/%d, lqi %d" % (rssi['min'], rssi['p50'],
+                                            rssi['max'], snapshot['lqi']['p50'])
+    if snapshot['skew']['drift'] is not None:
+        line += ", skew drift %d usec" % snapshot['skew']['drift']
+    if snapshot['talkers']:
+        line += ", top: " + " ".join(
+            "%s(%d)" % talker for talker in snapshot['talkers'])
+    return line
+
+
+class StatsReporter(object):
+    """
+    Periodic report of CaptureStats on stderr, and JSON snapshots served
+    on a Unix socket: each connection gets the current one, e.g.
+    socat - UNIX-CONNECT:<path>.
+    """
+
+    def __init__(self,
+                 stats,
+                 interval=None,
+                 path=None,
+                 output=None):
+        self.stats = stats
+        self.output = output or sys.stderr
+        self.path = path
+        self._stop = threading.Event()
+        self._server = None
+        self._last = (stats.start, 0, 0)
+
+        if path is not None:
+            if not hasattr(socket, 'AF_UNIX'):
+                raise ValueError("Unix sockets are not supported here")
+            if os.path.exists(path):
+                os.remove(path)
+            self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._server.bind(path)
+            self._server.listen(4)
+            thread = threading.Thread(target=self._serve,
+                                      name="StatsReporter")
+            thread.daemon = True
+            thread.start()
+
+        if interval:
+            # Writing to a stalled stderr must not hold up the shared timer.
+            thread = threading.Thread(target=self._report_run,
+                                      args=(interval,),
+                                      name="StatsReport")
+            thread.daemon = True
+            thread.start()
+
+    def report(self):
+        """ Write a line with the rates since the previous report. """
+        snapshot = self.stats.snapshot()
+        now = time.monotonic()
+        (last, frames, size) = self._last
+        elapsed = now - last
+        self._last = (now, snapshot['frames'], snapshot['bytes'])
+        if elapsed <= 0:
+            return
+        self.output.write(
+            stats_line(snapshot, (snapshot['frames'] - frames) / elapsed,
+                       (snapshot['bytes'] - size) / elapsed) + "\n")
+        self.output.flush()
+
+    def _report_run(self, interval):
+        """ Periodic report thread. """
+        while not self._stop.wait(interval):
+            try:
+                self.report()
+            except (OSError, ValueError):
+                CONFIG.LOGGER.error(traceback.format_exc())
+
+    def _serve(self):
+        """ Socket server thread. """
+        while True:
+            try:
+                (conn, _) = self._server.accept()
+            except OSError:
+                return
+            try:
+                with conn:
+                    conn.sendall(
+                        json.dumps(self.stats.snapshot()).encode() + b"\n")
+            except OSError:
+                CONFIG.LOGGER.error(traceback.format_exc())
+
+    def close(self):
+        self._stop.set()
+        if self._server is not None:
+            try:
+                # Wakes up the server thread blocked in accept().
+                self._server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._server.close()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
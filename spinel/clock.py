@@ -0,0 +1,149 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing the correlation of NCP timestamps with the host clock.
+"""
+
+import threading
+
+# Weight kept by past samples for each new one, about 1000 samples memory.
+CLOCK_FORGET = 0.999
+
+# Samples before outliers are rejected.
+CLOCK_MIN_SAMPLES = 8
+
+# Residuals above CLOCK_OUTLIER spreads are rejected.
+CLOCK_OUTLIER = 4.0
+CLOCK_SPREAD_MIN = 20.0  # Microseconds.
+CLOCK_SPREAD_GAIN = 1.0 / 16
+
+# Relative drift allowed between the clocks, in parts per million.
+CLOCK_DRIFT_MAX = 500
+
+# An NCP timestamp going back or a sample arriving this early (usec), or
+# this many samples rejected in a row, restarts the fit.
+CLOCK_RESYNC = 1000000
+CLOCK_RESYNC_COUNT = 16
+
+
+class ClockCorrelator(object):
+    """ Linear fit of the host clock as a function of an NCP clock. """
+
+    def __init__(self, epoch=0, forget=CLOCK_FORGET):
+        """
+        epoch: wall clock time, in usec, at host time 0. Fitting against
+               time.monotonic() keeps the fit immune to wall clock steps.
+        """
+        self.epoch = epoch
+        self.forget = forget
+        self.resets = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._origin = None  # (NCP, host) usec of the first sample.
+        self._weight = 0.0
+        self._mean_x = 0.0  # Weighted means, relative to the origin.
+        self._mean_y = 0.0
+        self._cxx = 0.0  # Weighted (co)variances, times the weight.
+        self._cxy = 0.0
+        self.slope = 1.0
+        self.spread = CLOCK_SPREAD_MIN  # Mean absolute residual, usec.
+        self.samples = 0
+        self.outliers = 0
+        self._rejected = 0
+        self._last_x = 0
+
+    def _predict(self, x):
+        return self._mean_y + self.slope * (x - self._mean_x)
+
+    def observe(self, ncp_usec, host_usec):
+        """
+        Add a sample, return False if it was rejected as an outlier.
+        host_usec should already exclude known delays, such as the time
+        taken to transfer the frame over the UART.
+        """
+        with self._lock:
+            if self._origin is not None:
+                x = ncp_usec - self._origin[0]
+                residual = host_usec - self._origin[1] - self._predict(x)
+                if x < self._last_x - CLOCK_RESYNC or residual < -CLOCK_RESYNC:
+                    self.resets += 1
+                    self._reset()
+                elif self.samples >= CLOCK_MIN_SAMPLES:
+                    if residual > CLOCK_OUTLIER * self.spread:
+                        self.outliers += 1
+                        self._rejected += 1
+                        if self._rejected < CLOCK_RESYNC_COUNT:
+                            return False
+                        # The clocks jumped apart, start over.
+                        self.resets += 1
+                        self._reset()
+                    else:
+                        self._rejected = 0
+                        self.spread += CLOCK_SPREAD_GAIN * (
+                            max(abs(residual), CLOCK_SPREAD_MIN) - self.spread)
+
+            if self._origin is None:
+                self._origin = (ncp_usec, host_usec)
+            self._add(ncp_usec - self._origin[0], host_usec - self._origin[1])
+            return True
+
+    def _add(self, x, y):
+        """ Weighted incremental update of means and covariances (West). """
+        self._weight = self._weight * self.forget + 1
+        dx = x - self._mean_x
+        self._mean_x += dx / self._weight
+        self._mean_y += (y - self._mean_y) / self._weight
+        self._cxx = self._cxx * self.forget + dx * (x - self._mean_x)
+        self._cxy = self._cxy * self.forget + dx * (y - self._mean_y)
+        self.samples += 1
+        self._last_x = x
+
+        if self._cxx > 0:
+            limit = CLOCK_DRIFT_MAX * 1e-6
+            self.slope = min(max(self._cxy / self._cxx, 1 - limit), 1 + limit)
+
+    def to_host(self, ncp_usec):
+        """ Return the host time, in usec, of an NCP timestamp. """
+        with self._lock:
+            if self._origin is None:
+                return None
+            return self._origin[1] + self._predict(ncp_usec -
+                                                   self._origin[0])
+
+    def to_wall(self, ncp_usec):
+        """ Return the wall clock time, in usec, of an NCP timestamp. """
+        host = self.to_host(ncp_usec)
+        return None if host is None else self.epoch + host
+
+    def stats(self):
+        """ Return the offset, drift and spread of the fit. """
+        with self._lock:
+            offset = None
+            if self._origin is not None:
+                x = self._mean_x
+                offset = int(self._origin[1] + self._predict(x) -
+                             self._origin[0] - x)
+            return {
+                'offset': offset,
+                'drift': (self.slope - 1) * 1e6,
+                'spread': self.spread,
+                'samples': self.samples,
+                'outliers': self.outliers,
+                'resets': self.resets,
+            }
@@ -26,11 +26,13 @@ import threading
 import traceback
 import queue
 import importlib
+import select
 
 from struct import pack
 from struct import unpack
-from collections import namedtuple
 from collections import defaultdict
+from collections import deque
+from collections import OrderedDict
 
 import ipaddress
 
@@ -40,12 +42,39 @@ from spinel.const import kThread
 from spinel.const import SPINEL
 from spinel.const import SPINEL_LAST_STATUS_MAP
 from spinel.hdlc import Hdlc
+from spinel.cache import PropertyCache
+from spinel.boundedqueue import BoundedQueue
+from spinel.metrics import RequestMetrics
+from spinel.timer import Deadline
+from spinel.timer import TIMER_SERVICE
+from spinel.prefix import PrefixTracker
+from spinel.rtt import RttEstimator
+from spinel.rtt import RETRIES_DEFAULT
+from spinel.txsched import TxScheduler
+from spinel.txsched import TX_CONTROL
+from spinel.txsched import TX_BULK
+from spinel.pacing import SendPacer
+from spinel.pacing import PACING_SAMPLE_TID
+from spinel.pacing import PACING_TID
+from spinel.pacing import PACING_INTERVAL
 
 FEATURE_USE_HDLC = 1
 FEATURE_USE_SLACC = 1
 
 TIMEOUT_PROP = 2
 
+# Transaction id used to restore the configuration journal after a reset,
+# so that it does not race with requests on HEADER_DEFAULT.
+JOURNAL_TID = SPINEL.HEADER_EVENT_HANDLER
+
+# Transaction ids taken by the retransmissions of a request, one per
+# attempt, so that the reply to one attempt is never taken for another's.
+RETRY_TIDS = frozenset(SPINEL.HEADER_ASYNC | tid for tid in range(8, 16))
+
+# Initial size of the reusable ip_send() frame buffers, enough for an
+# HDLC escaped IPv6 packet of the minimum MTU.
+IP_FRAME_SIZE = 2 * (1280 + 16)
+
 #=========================================
 #   SpinelCodec
 #=========================================
@@ -402,6 +431,42 @@ class SpinelCodec(object):
             packed += self.encode_field(code, field)
         return packed
 
+    def encode_prop(self, prop_id, value=None, py_format=None):
+        """ Encode a property identifier optionally followed by a value. """
+        pay = self.encode_i(prop_id)
+        if py_format != None:
+            pay += pack(py_format, value)
+        return pay
+
+    def encode_multi_get(self, prop_ids):
+        """ Encode the A(i) payload of CMD_PROP_VALUE_MULTI_GET. """
+        return b''.join(self.encode_i(prop_id) for prop_id in prop_ids)
+
+    def encode_multi_set(self, items):
+        """
+        Encode the A(t(iD)) payload of CMD_PROP_VALUE_MULTI_SET.
+
+        items: sequence of (prop_id, value, py_format) tuples.
+        """
+        pay = bytes()
+        for (prop_id, value, py_format) in items:
+            entry = self.encode_prop(prop_id, value, py_format)
+            pay += self.encode_S(len(entry)) + entry
+        return pay
+
+    @classmethod
+    def parse_values_are(cls, payload):
+        """
+        Split the A(t(iD)) payload of RSP_PROP_VALUES_ARE into a list of
+        property payloads, each formatted like a PROP_VALUE_IS payload.
+        """
+        entries = []
+        while len(payload) >= 2:
+            entry_len = cls.parse_S(payload)
+            entries.append(payload[2:2 + entry_len])
+            payload = payload[2 + entry_len:]
+        return entries
+
     def encode_packet(self,
                       command_id,
                       payload=bytes(),
@@ -598,53 +663,10 @@ class SpinelPropertyHandler(SpinelCodec):
     def THREAD_STABLE_NETWORK_DATA_VERSION(self, _wpan_api, payload):
         return self.parse_C(payload)
 
-    def __init__(self):
-        self.autoAddresses = set()
-
-        self.wpan_api = None
-        self.__queue_prefix = queue.Queue()
-        self.prefix_thread = threading.Thread(target=self.__run_prefix_handler)
-        self.prefix_thread.setDaemon(True)
-        self.prefix_thread.start()
-
-    def handle_prefix_change(self, payload):
-        """ Automatically ipaddr add / remove addresses for each new prefix. """
-        # As done by cli.cpp Interpreter::HandleNetifStateChanged
-
-        # First parse payload and extract slaac prefix information.
-        pay = payload
-        Prefix = namedtuple("Prefix", "prefix prefixlen stable flags is_local")
-        prefixes = []
-        slaacPrefixSet = set()
-        while len(pay) >= 22:
-            (_structlen) = unpack('<H', pay[:2])
-            struct_len = _structlen[0]
-            pay = pay[2:]
-            prefix = Prefix(*unpack('16sBBBB', pay[:20]))
-            if prefix.flags & kThread.PrefixSlaacFlag:
-                net6 = ipaddress.IPv6Network(prefix.prefix)
-                net6 = net6.supernet(new_prefix=prefix.prefixlen)
-                slaacPrefixSet.add(net6)
-                prefixes.append(prefix)
-            pay = pay[struct_len:]
-
-        if CONFIG.DEBUG_LOG_PROP:
-            print("\n========= PREFIX ============")
-            print("ipaddrs: " + str(self.autoAddresses))
-            print("slaac prefix set: " + str(slaacPrefixSet))
-            print("==============================\n")
-
-    def __run_prefix_handler(self):
-        while 1:
-            (wpan_api, payload) = self.__queue_prefix.get(True)
-            self.wpan_api = wpan_api
-            self.handle_prefix_change(payload)
-            self.__queue_prefix.task_done()
-
     def THREAD_ON_MESH_NETS(self, wpan_api, payload):
-        if FEATURE_USE_SLACC:
-            # Kick prefix handler thread to allow serial rx thread to work.
-            self.__queue_prefix.put_nowait((wpan_api, payload))
+        if FEATURE_USE_SLACC and wpan_api:
+            # Parsed later on the timer thread, coalescing bursts of updates.
+            wpan_api.prefix_tracker.update(payload)
 
         return self.parse_D(payload)
 
@@ -778,10 +800,15 @@ class SpinelCommandHandler(SpinelCodec):
             # Skip any VALUE_INSERTED(CHILD_TABLE) or VALUE_REMOVED(CHILD_TABLE)
             if prop_id == SPINEL.PROP_THREAD_CHILD_TABLE:
                 if name in ["INSERTED", "REMOVED"]:
+                    if wpan_api:
+                        wpan_api.prop_notify(name, prop_id, None, tid)
                     return
 
             prop_value = handler(wpan_api, payload[prop_len:])
 
+            if wpan_api:
+                wpan_api.prop_notify(name, prop_id, prop_value, tid)
+
             if CONFIG.DEBUG_LOG_PROP:
 
                 # Generic output
@@ -824,6 +851,10 @@ class SpinelCommandHandler(SpinelCodec):
     def PROP_VALUE_REMOVED(self, wpan_api, payload, tid):
         self.handle_prop(wpan_api, "REMOVED", payload, tid)
 
+    def PROP_VALUES_ARE(self, wpan_api, payload, tid):
+        for entry in self.parse_values_are(payload):
+            self.handle_prop(wpan_api, "IS", entry, tid)
+
 
 WPAN_CMD_HANDLER = SpinelCommandHandler()
 
@@ -831,6 +862,16 @@ SPINEL_COMMAND_DISPATCH = {
     SPINEL.RSP_PROP_VALUE_IS: WPAN_CMD_HANDLER.PROP_VALUE_IS,
     SPINEL.RSP_PROP_VALUE_INSERTED: WPAN_CMD_HANDLER.PROP_VALUE_INSERTED,
     SPINEL.RSP_PROP_VALUE_REMOVED: WPAN_CMD_HANDLER.PROP_VALUE_REMOVED,
+    SPINEL.RSP_PROP_VALUES_ARE: WPAN_CMD_HANDLER.PROP_VALUES_ARE,
+}
+
+SPINEL_PROP_CMD_NAMES = {
+    SPINEL.CMD_PROP_VALUE_GET: "GET",
+    SPINEL.CMD_PROP_VALUE_SET: "SET",
+    SPINEL.CMD_PROP_VALUE_INSERT: "INSERT",
+    SPINEL.CMD_PROP_VALUE_REMOVE: "REMOVE",
+    SPINEL.CMD_PROP_VALUE_MULTI_GET: "MULTI_GET",
+    SPINEL.CMD_PROP_VALUE_MULTI_SET: "MULTI_SET",
 }
 
 WPAN_PROP_HANDLER = SpinelPropertyHandler()
@@ -1041,16 +1082,40 @@ class WpanApi(SpinelCodec):
                  nodeid,
                  use_hdlc=FEATURE_USE_HDLC,
                  timeout=TIMEOUT_PROP,
-                 vendor_module=None):
+                 vendor_module=None,
+                 cache_policies=None,
+                 hub=None,
+                 timer=None,
+                 threaded=True,
+                 retries=RETRIES_DEFAULT):
         self.stream = stream
         self.nodeid = nodeid
+        self.hub = None
 
+        # timeout bounds the total wait of a request. Each attempt waits for
+        # an RTO derived from the measured RTT, then GET / SET are sent again
+        # up to retries more times, while waiting for any of the replies.
         self.timeout = timeout
+        self.retries = retries
+        self.rtt = RttEstimator(timeout)
+        self.__retry_tids = deque(sorted(RETRY_TIDS))  # Free attempt tids.
+        self.__attempts = {}  # Map attempt tid to (tid, prop_id).
+        self.__attempts_lock = threading.Lock()
+        # Debounced prefix updates and surveys share one timer thread,
+        # request deadlines are only waited for by their callers.
+        self.timer = timer or TIMER_SERVICE
+        self.prefix_tracker = PrefixTracker(self.timer)
 
         self.use_hdlc = use_hdlc
         if self.use_hdlc:
             self.hdlc = Hdlc(self.stream)
 
+        # Property commands are written ahead of queued ip_send() frames.
+        self.tx = TxScheduler(self.stream_tx)
+        # Frame buffers of ip_send() go back here once written.
+        self.__ip_frames = []
+        self.__ip_headers = {}  # Map tid to Spinel header of STREAM_NET sets.
+
         if vendor_module:
             # Hook vendor properties
             try:
@@ -1063,12 +1128,46 @@ class WpanApi(SpinelCodec):
         self.rx_pkt = []
         self.callback = defaultdict(list)  # Map prop_id to list of callbacks.
 
+        # Property cache is opt-in, see cache_enable().
+        self.cache = None
+        self.caps = None  # Set of NCP capabilities, fetched on demand.
+
+        # Configuration journal is opt-in, see journal_enable().
+        self.journal = None
+        self.journal_props = None
+        self.__reset_expected = False
+        self.__replay_pending = None
+
+        # Pacing of ip_send() is opt-in, see pacing_enable().
+        self.pacer = None
+        self.__pacing_stop = None
+
+        self.__metrics = RequestMetrics(timeout)
+        if cache_policies:
+            self.cache_enable(cache_policies)
+
         # Fire up threads
         self._reader_alive = True
         self.tid_filter = set()
-        self.__queue_prop = defaultdict(queue.Queue)  # Map tid to Queue.
+        self.__queue_prop = defaultdict(BoundedQueue)  # Map tid to Queue.
         self.queue_register()
-        self.__start_reader()
+
+        # Without threads, blocking calls pump the stream, see poll().
+        # A WpanHub services the stream from its own I/O thread when the
+        # stream can be polled, otherwise fall back to a reader thread.
+        self.threaded = threaded
+        self.__fileno = None
+        if not threaded:
+            self.__fileno = self.__stream_fileno()
+            if self.__fileno is None:
+                raise ValueError("threaded=False needs a stream with a "
+                                 "fileno() to poll")
+        if self.__fileno is None:
+            self.threaded = True
+            if hub is not None and hub.register(self):
+                self.hub = hub
+            else:
+                self.__start_reader()
 
     def __del__(self):
         self._reader_alive = False
@@ -1078,6 +1177,10 @@ class WpanApi(SpinelCodec):
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self._reader_alive = False
+        self.pacing_disable()
+        if self.hub is not None:
+            self.hub.unregister(self)
+            self.hub = None
 
     def __start_reader(self):
         """Start reader thread"""
@@ -1087,7 +1190,12 @@ class WpanApi(SpinelCodec):
         self.receiver_thread.setDaemon(True)
         self.receiver_thread.start()
 
-    def transact(self, command_id, payload=bytes(), tid=SPINEL.HEADER_DEFAULT):
+    def transact(self,
+                 command_id,
+                 payload=bytes(),
+                 tid=SPINEL.HEADER_DEFAULT,
+                 priority=TX_CONTROL,
+                 flow=None):
         pkt = self.encode_packet(command_id, payload, tid)
         if CONFIG.DEBUG_LOG_SERIAL:
             msg = "TX Pay: (%i) %s " % (len(pkt),
@@ -1096,7 +1204,7 @@ class WpanApi(SpinelCodec):
 
         if self.use_hdlc:
             pkt = self.hdlc.encode(pkt)
-        self.stream_tx(pkt)
+        self.tx.submit(pkt, priority, flow)
 
     def parse_rx(self, pkt):
         if not pkt:
@@ -1159,6 +1267,53 @@ class WpanApi(SpinelCodec):
                 # Ignore the error since we are exiting
                 pass
 
+    def __stream_fileno(self):
+        try:
+            return self.stream.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    def poll(self, timeout=0):
+        """
+        Read and parse what the stream delivers within timeout seconds.
+
+        Only used with threaded=False, where blocking calls poll until their
+        response arrives and notifications received along the way stay
+        queued for queue_get(). Returns False at end of stream.
+        """
+        if not self._reader_alive:
+            return False
+
+        (ready, _, _) = select.select([self.__fileno], [], [], timeout)
+        if ready and not self.stream_feed():
+            self._reader_alive = False
+
+        # Restore after a reset once the packet that reported it is parsed.
+        start = self.__replay_pending
+        if start is not None:
+            self.__replay_pending = None
+            self.__journal_replay(start)
+
+        return self._reader_alive
+
+    def stream_feed(self):
+        """
+        Read what is available on the stream and parse complete packets.
+        Called by WpanHub when the stream is readable. Returns False at end
+        of stream.
+        """
+        data = self.stream.read_available()
+        if not data:
+            return False
+
+        if self.use_hdlc:
+            for pkt in self.hdlc.feed(data):
+                self.parse_rx(pkt)
+        else:
+            # Assume stream will always deliver whole packets.
+            self.parse_rx(data)
+        return True
+
     class PropertyItem(object):
         """ Queue item for NCP response to property commands. """
 
@@ -1166,18 +1321,209 @@ class WpanApi(SpinelCodec):
             self.prop = prop
             self.value = value
             self.tid = tid
+            self.time = time.monotonic()  # Seconds, when it was received.
 
     def callback_register(self, prop, cb):
         self.callback[prop].append(cb)
 
-    def queue_register(self, tid=SPINEL.HEADER_DEFAULT):
+    def queue_register(self,
+                       tid=SPINEL.HEADER_DEFAULT,
+                       maxsize=None,
+                       policy=None,
+                       prop_limits=None):
+        """
+        Queue notifications received on tid for later retrieval.
+
+        maxsize:     maximum depth of the queue, 0 for unbounded.
+        policy:      spinel.boundedqueue QUEUE_POLICY_* applied on overflow.
+        prop_limits: dict mapping prop_id to a maximum depth for that property.
+
+        Limits are left unchanged when none of them are given.
+        """
         self.tid_filter.add(tid)
-        return self.__queue_prop[tid]
+        prop_queue = self.__queue_prop[tid]
+        if maxsize is not None or policy is not None or prop_limits:
+            prop_queue.configure(
+                maxsize or 0,
+                prop_queue.policy if policy is None else policy, prop_limits)
+        return prop_queue
+
+    def queue_stats(self):
+        """ Return depth and overflow counters for each registered tid. """
+        return {tid: self.__queue_prop[tid].stats() for tid in self.tid_filter}
+
+    def cache_enable(self, policies=None):
+        """
+        Enable the property cache.
+
+        policies: dict mapping prop_id to a spinel.cache CACHE_POLICY_* value
+                  or to a (CACHE_POLICY_TTL, seconds) tuple.
+        """
+        if self.cache is None:
+            self.cache = PropertyCache()
+        if policies:
+            self.cache.policy_update(policies)
+        return self.cache
+
+    def cache_disable(self):
+        self.cache = None
+
+    def prop_notify(self, name, prop_id, value, tid):
+        """ Track NCP state from a property received on HEADER_ASYNC. """
+        if tid != SPINEL.HEADER_ASYNC:
+            return
+
+        if prop_id == SPINEL.PROP_LAST_STATUS:
+            if SPINEL.STATUS_RESET__BEGIN <= value < SPINEL.STATUS_RESET__END:
+                self.caps = None
+                if self.cache is not None:
+                    self.cache.flush()
+                if self.pacer is not None:
+                    self.pacer.reset()
+                self.__reset_detected(value)
+        elif self.cache is None:
+            pass
+        elif name == "IS":
+            self.cache.update(prop_id, value)
+        else:
+            # INSERTED / REMOVED only carry the delta.
+            self.cache.invalidate(prop_id)
+
+    def journal_enable(self, props=None):
+        """
+        Record successful property sets, and replay them as soon as the NCP
+        reports a reset that was not requested through cmd_reset().
+
+        props: iterable of prop_ids to record, or None to record all sets.
+        """
+        self.journal = OrderedDict()
+        self.journal_props = None if props is None else set(props)
+        self.queue_register(JOURNAL_TID)
+
+    def journal_disable(self):
+        self.journal = None
+        self.journal_props = None
+
+    def journal_record(self, prop_id, value, py_format='B'):
+        """ Remember the value last set for prop_id, keeping set order. """
+        if self.journal is None:
+            return
+        if self.journal_props is not None and prop_id not in self.journal_props:
+            return
+        self.journal.pop(prop_id, None)
+        self.journal[prop_id] = (value, py_format)
+
+    def __reset_detected(self, status):
+        if self.__reset_expected:
+            self.__reset_expected = False
+            return
+
+        self.__metrics.reset_detected()
+        if not self.journal:
+            CONFIG.LOGGER.warning("NCP reset (status %d)", status)
+            return
+
+        CONFIG.LOGGER.warning("NCP reset (status %d), restoring %d properties",
+                              status, len(self.journal))
+        if not self.threaded:
+            self.__replay_pending = time.perf_counter()
+            return
+
+        # Responses are parsed on the reader thread, replay from another one.
+        replay_thread = threading.Thread(target=self.__journal_replay,
+                                         args=(time.perf_counter(),))
+        replay_thread.daemon = True
+        replay_thread.start()
+
+    def __journal_replay(self, start):
+        items = [(prop_id, value, py_format)
+                 for prop_id, (value, py_format) in list(self.journal.items())]
+        values = self.prop_set_many(items, JOURNAL_TID)
+
+        failed = [prop_id for prop_id, value in values.items() if value is None]
+        elapsed = time.perf_counter() - start
+        self.__metrics.reset_restored(elapsed, not failed)
+        if failed:
+            CONFIG.LOGGER.error("NCP restore failed for properties %s", failed)
+        else:
+            CONFIG.LOGGER.info("NCP restored in %.1f ms", elapsed * 1000)
+
+    def pacing_enable(self, interval=PACING_INTERVAL, **kwargs):
+        """
+        Pace ip_send() with an AIMD window driven by the LAST_STATUS of each
+        packet and by MSG_BUFFER_COUNTERS, sampled every interval seconds
+        while packets are being sent. kwargs are passed to SendPacer.
+        """
+        self.pacing_disable()
+        self.pacer = SendPacer(**kwargs)
+        # Samples are written from their own thread, as writes may block.
+        self.__pacing_stop = threading.Event()
+        sampler = threading.Thread(target=self.__pacing_run,
+                                   args=(self.pacer, interval,
+                                         self.__pacing_stop),
+                                   name="SendPacer")
+        sampler.daemon = True
+        sampler.start()
+        return self.pacer
+
+    def pacing_disable(self):
+        if self.__pacing_stop is not None:
+            self.__pacing_stop.set()
+            self.__pacing_stop = None
+        self.pacer = None
+
+    def __pacing_run(self, pacer, interval, stop):
+        """ Sampling thread, answered on PACING_SAMPLE_TID. """
+        while not stop.wait(interval):
+            if not self._reader_alive or not pacer.sample_due():
+                continue
+            try:
+                self.transact(SPINEL.CMD_PROP_VALUE_GET,
+                              self.encode_i(SPINEL.PROP_MSG_BUFFER_COUNTERS),
+                              PACING_SAMPLE_TID)
+            except Exception:
+                CONFIG.LOGGER.error(traceback.format_exc())
+
+    def __pacing_response(self, prop, value, tid):
+        pacer = self.pacer
+        if pacer is None:
+            return
+        if tid == PACING_TID:
+            # Only STREAM_NET frames are sent on PACING_TID.
+            if prop == SPINEL.PROP_LAST_STATUS:
+                pacer.response(value)
+        elif prop == SPINEL.PROP_MSG_BUFFER_COUNTERS:
+            (total, free) = value[:2]
+            pacer.buffers_sampled(free, total)
+
+    def cache_stats(self):
+        """ Return cache hit / miss counters, or None if caching is disabled. """
+        if self.cache is None:
+            return None
+        return self.cache.stats()
 
     def queue_wait_prepare(self, _prop_id, tid=SPINEL.HEADER_DEFAULT):
         self.queue_clear(tid)
 
     def queue_add(self, prop, value, tid):
+        if tid in (PACING_TID, PACING_SAMPLE_TID):
+            self.__pacing_response(prop, value, tid)
+            return
+
+        if tid in RETRY_TIDS:
+            attempt = self.__attempts.get(tid)
+            if attempt is None or prop not in (attempt[1],
+                                               SPINEL.PROP_LAST_STATUS):
+                # Reply to another attempt of a completed request.
+                self.__metrics.late_response()
+                return
+            tid = attempt[0]
+
+        # Drop responses whose caller has already timed out.
+        if tid != SPINEL.HEADER_ASYNC and not self.__metrics.response(
+                tid, prop, SPINEL.PROP_LAST_STATUS):
+            return
+
         cb_list = self.callback[prop]
 
         # Asynchronous handlers can consume message and not add to queue.
@@ -1189,13 +1535,19 @@ class WpanApi(SpinelCodec):
         if tid not in self.tid_filter:
             return
         item = self.PropertyItem(prop, value, tid)
-        self.__queue_prop[tid].put_nowait(item)
+        # Only blocks when the queue was registered with QUEUE_POLICY_BLOCK.
+        self.__queue_prop[tid].put(item)
 
     def queue_clear(self, tid):
-        with self.__queue_prop[tid].mutex:
-            self.__queue_prop[tid].queue.clear()
+        self.__queue_prop[tid].clear()
 
     def queue_get(self, tid, timeout=None):
+        if not self.threaded:
+            # Pick up what arrived since the last blocking call.
+            self.poll()
+            return self.__queue_next(self.__queue_prop[tid],
+                                     Deadline(timeout or 0))
+
         try:
             if (timeout):
                 item = self.__queue_prop[tid].get(True, timeout)
@@ -1205,6 +1557,19 @@ class WpanApi(SpinelCodec):
             item = None
         return item
 
+    def __queue_next(self, prop_queue, deadline):
+        """ Return the next item of prop_queue, or None once deadline expired. """
+        if self.threaded:
+            return prop_queue.get_until(deadline)
+
+        while True:
+            try:
+                return prop_queue.get_nowait()
+            except queue.Empty:
+                pass
+            if deadline.expired or not self.poll(deadline.remaining()):
+                return None
+
     def queue_wait_for_prop(self,
                             _prop,
                             tid=SPINEL.HEADER_DEFAULT,
@@ -1215,20 +1580,17 @@ class WpanApi(SpinelCodec):
         if timeout is None:
             timeout = self.timeout
 
+        prop_queue = self.__queue_prop[tid]
         processed_queue = queue.Queue()
-        timeout_time = time.time() + timeout
+        deadline = Deadline(timeout)
 
-        while time.time() < timeout_time:
-            item = self.queue_get(tid, timeout_time - time.time())
+        while True:
+            item = self.__queue_next(prop_queue, deadline)
 
-            if item is None:
-                continue
-            if item.prop == _prop:
+            if item is None or item.prop == _prop:
                 break
 
             processed_queue.put_nowait(item)
-        else:
-            item = None
 
         # To make sure that all received properties will be processed in the same order.
         with self.__queue_prop[tid].mutex:
@@ -1240,26 +1602,125 @@ class WpanApi(SpinelCodec):
 
         return item
 
-    def ip_send(self, pkt):
-        pay = self.encode_i(SPINEL.PROP_STREAM_NET)
+    def queue_wait_for_props(self,
+                             prop_ids,
+                             tid=SPINEL.HEADER_DEFAULT,
+                             timeout=None):
+        """
+        Wait for one response per property in prop_ids, in request order.
+
+        A LAST_STATUS in place of a property reports a failure for it.
+        Returns a dict mapping prop_id to the received item or None.
+        """
+        if timeout is None:
+            timeout = self.timeout
 
-        pkt_len = len(pkt)
-        pay += pack("<H", pkt_len)  # Start with length of IPv6 packet
+        results = dict.fromkeys(prop_ids)
+        pending = list(prop_ids)
+        prop_queue = self.__queue_prop[tid]
+        processed_queue = queue.Queue()
+        deadline = Deadline(timeout)
 
-        pkt_len += 2  # Increment to include length word
-        pay += pkt  # Append packet after length
+        while pending:
+            item = self.__queue_next(prop_queue, deadline)
 
-        self.transact(SPINEL.CMD_PROP_VALUE_SET, pay)
+            if item is None:
+                break
+            if item.prop == pending[0]:
+                results[pending.pop(0)] = item
+            elif item.prop == SPINEL.PROP_LAST_STATUS:
+                pending.pop(0)
+            else:
+                processed_queue.put_nowait(item)
 
-    def cmd_reset(self):
+        # To make sure that all received properties will be processed in the same order.
+        with self.__queue_prop[tid].mutex:
+            while self.__queue_prop[tid]._qsize() > 0:
+                processed_queue.put(self.__queue_prop[tid]._get())
+
+            while not processed_queue.empty():
+                self.__queue_prop[tid]._put(processed_queue.get_nowait())
+
+        return results
+
+    def ip_send(self, pkt, flow=None):
+        """
+        Send an IPv6 packet as bulk traffic. Callers passing distinct flow
+        keys share the stream fairly when packets are queued.
+
+        With pacing enabled, blocks while the NCP has a window of packets
+        to process and returns False if no room was made within the timeout.
+        """
+        tid = SPINEL.HEADER_DEFAULT
+        pacer = self.pacer
+        if pacer is not None:
+            if not pacer.acquire(self.timeout,
+                                 None if self.threaded else self.poll):
+                return False
+            tid = PACING_TID
+        else:
+            # Answered with a LAST_STATUS nobody waits for.
+            self.__metrics.request_async(tid)
+
+        try:
+            frame = self.__ip_frames.pop()
+        except IndexError:
+            frame = bytearray(IP_FRAME_SIZE)
+        end = self.encode_ip_frame(frame, pkt, tid)
+        if CONFIG.DEBUG_LOG_SERIAL:
+            CONFIG.LOGGER.debug("TX IP: (%i) %s ", end,
+                                binascii.hexlify(frame[:end]).decode('utf-8'))
+
+        self.tx.submit(memoryview(frame)[:end], TX_BULK, flow,
+                       self.__ip_frame_done)
+        return True
+
+    def encode_ip_frame(self, frame, pkt, tid=SPINEL.HEADER_DEFAULT):
+        """
+        Encode the STREAM_NET set of IPv6 packet pkt, any bytes-like object,
+        into the bytearray frame and return the end offset. The packet is
+        copied once, straight into its place in the (HDLC) frame.
+        """
+        header = self.__ip_headers.get(tid)
+        if header is None:
+            header = (pack(">B", tid) +
+                      self.encode_i(SPINEL.CMD_PROP_VALUE_SET) +
+                      self.encode_i(SPINEL.PROP_STREAM_NET))
+            self.__ip_headers[tid] = header
+        # The IPv6 packet is prefixed with its length.
+        length = pack("<H", len(pkt))
+
+        if self.use_hdlc:
+            return self.hdlc.encode_into(frame, header, length, pkt)
+
+        end = len(header) + 2 + len(pkt)
+        if len(frame) < end:
+            frame.extend(bytes(end - len(frame)))
+        frame[:len(header)] = header
+        frame[len(header):len(header) + 2] = length
+        frame[len(header) + 2:end] = pkt
+        return end
+
+    def __ip_frame_done(self, view):
+        frame = view.obj
+        view.release()
+        self.__ip_frames.append(frame)
+
+    def cmd_reset(self, timeout=None):
+        self.__reset_expected = True
         self.queue_wait_prepare(None, SPINEL.HEADER_ASYNC)
         self.transact(SPINEL.CMD_RESET)
         result = self.queue_wait_for_prop(SPINEL.PROP_LAST_STATUS,
-                                          SPINEL.HEADER_ASYNC)
-        return (result is not None and result.value == 114)
+                                          SPINEL.HEADER_ASYNC, timeout)
+        self.__reset_expected = False
+        return (result is not None and
+                SPINEL.STATUS_RESET__BEGIN <= result.value <
+                SPINEL.STATUS_RESET__END)
 
     def cmd_send(self, command_id, payload=bytes(), tid=SPINEL.HEADER_DEFAULT):
         self.queue_wait_prepare(None, tid)
+        if tid != SPINEL.HEADER_ASYNC:
+            self.__metrics.request_async(tid)
         self.transact(command_id, payload, tid)
         self.queue_wait_for_prop(None, tid)
 
@@ -1269,9 +1730,9 @@ class WpanApi(SpinelCodec):
                           value,
                           py_format='B',
                           tid=SPINEL.HEADER_DEFAULT):
-        pay = self.encode_i(prop_id)
-        if py_format != None:
-            pay += pack(py_format, value)
+        pay = self.encode_prop(prop_id, value, py_format)
+        if tid != SPINEL.HEADER_ASYNC:
+            self.__metrics.request_async(tid)
         self.transact(cmd, pay, tid)
 
     def prop_insert_async(self,
@@ -1290,73 +1751,302 @@ class WpanApi(SpinelCodec):
         self.prop_change_async(SPINEL.CMD_PROP_VALUE_REMOVE, prop_id, value,
                                py_format, tid)
 
+    def __attempt_tids_take(self, tid, prop_id, count):
+        """ Return up to count free attempt tids, answering on tid. """
+        with self.__attempts_lock:
+            tids = []
+            while self.__retry_tids and len(tids) < count:
+                attempt_tid = self.__retry_tids.popleft()
+                self.__attempts[attempt_tid] = (tid, prop_id)
+                tids.append(attempt_tid)
+            return tids
+
+    def __attempt_tids_release(self, tids):
+        """ Free attempt tids, late replies on them are dropped. """
+        with self.__attempts_lock:
+            for attempt_tid in tids:
+                del self.__attempts[attempt_tid]
+                self.__retry_tids.append(attempt_tid)
+
     def __prop_change_value(self,
                             cmd,
                             prop_id,
                             value,
                             py_format='B',
-                            tid=SPINEL.HEADER_DEFAULT):
-        """ Utility routine to change a property value over SPINEL. """
-        self.queue_wait_prepare(prop_id, tid)
+                            tid=SPINEL.HEADER_DEFAULT,
+                            timeout=None,
+                            retries=None):
+        """
+        Utility routine to change a property value over SPINEL.
 
-        pay = self.encode_i(prop_id)
-        if py_format != None:
-            pay += pack(py_format, value)
-        self.transact(cmd, pay, tid)
+        timeout: seconds to wait for each attempt instead of the RTO, which
+                 is kept within [RTO_MIN, self.timeout].
+        retries: number of retransmissions instead of the default, which
+                 only retransmits idempotent GET and SET requests.
+        """
+        if retries is None:
+            retries = (self.retries if cmd in (SPINEL.CMD_PROP_VALUE_GET,
+                                               SPINEL.CMD_PROP_VALUE_SET) else
+                       0)
+        if timeout is None:
+            budget = self.timeout
+        else:
+            budget = timeout * (retries + 1)
+        end = time.monotonic() + budget
 
-        result = self.queue_wait_for_prop(prop_id, tid)
+        self.queue_wait_prepare(prop_id, tid)
+        self.__metrics.request_start(tid, prop_id)
+        start = time.perf_counter()
+
+        # Retransmissions go out on their own tids, replies are queued on tid.
+        attempt_tids = [tid]
+        if retries:
+            attempt_tids += self.__attempt_tids_take(tid, prop_id, retries)
+
+        pay = self.encode_prop(prop_id, value, py_format)
+        result = None
+        for (attempt, attempt_tid) in enumerate(attempt_tids):
+            wait = end - time.monotonic()
+            if wait <= 0:
+                break
+            wait = min(wait, self.rtt.rto() if timeout is None else timeout)
+
+            sent = time.perf_counter()
+            self.transact(cmd, pay, attempt_tid)
+            # Replies to earlier attempts are still taken while waiting.
+            result = self.queue_wait_for_prop(prop_id, tid, wait)
+            if result is not None:
+                # Karn: a response to a retransmission is ambiguous.
+                if attempt == 0:
+                    self.rtt.sample(time.perf_counter() - sent)
+                break
+            self.rtt.timed_out()
+
+        self.__attempt_tids_release(attempt_tids[1:])
+        # The reply to the first attempt may still come on tid.
+        self.__metrics.request_done(tid, cmd, prop_id,
+                                    time.perf_counter() - start,
+                                    result is not None, result is None or
+                                    attempt > 0)
         if result:
+            if self.cache is not None:
+                if cmd in (SPINEL.CMD_PROP_VALUE_GET,
+                           SPINEL.CMD_PROP_VALUE_SET):
+                    self.cache.update(prop_id, result.value)
+                else:
+                    self.cache.invalidate(prop_id)
+            if cmd == SPINEL.CMD_PROP_VALUE_SET:
+                self.journal_record(prop_id, value, py_format)
             return result.value
         else:
+            if self.cache is not None and cmd != SPINEL.CMD_PROP_VALUE_GET:
+                # Outcome of the change is unknown.
+                self.cache.invalidate(prop_id)
             return None
 
-    def prop_get_value(self, prop_id, tid=SPINEL.HEADER_DEFAULT):
+    def prop_get_value(self,
+                       prop_id,
+                       tid=SPINEL.HEADER_DEFAULT,
+                       timeout=None,
+                       retries=None):
         """ Blocking routine to get a property value over SPINEL. """
         if CONFIG.DEBUG_LOG_PROP:
             handler = SPINEL_PROP_DISPATCH[prop_id]
             prop_name = handler.__name__
             print("PROP_VALUE_GET [tid=%d]: %s" % (tid & 0xF, prop_name))
+        if self.cache is not None:
+            value = self.cache.get(prop_id)
+            if value is not None:
+                return value
         return self.__prop_change_value(SPINEL.CMD_PROP_VALUE_GET, prop_id,
-                                        None, None, tid)
+                                        None, None, tid, timeout, retries)
 
     def prop_set_value(self,
                        prop_id,
                        value,
                        py_format='B',
-                       tid=SPINEL.HEADER_DEFAULT):
+                       tid=SPINEL.HEADER_DEFAULT,
+                       timeout=None,
+                       retries=None):
         """ Blocking routine to set a property value over SPINEL. """
         if CONFIG.DEBUG_LOG_PROP:
             handler = SPINEL_PROP_DISPATCH[prop_id]
             prop_name = handler.__name__
             print("PROP_VALUE_SET [tid=%d]: %s" % (tid & 0xF, prop_name))
         return self.__prop_change_value(SPINEL.CMD_PROP_VALUE_SET, prop_id,
-                                        value, py_format, tid)
+                                        value, py_format, tid, timeout,
+                                        retries)
 
     def prop_insert_value(self,
                           prop_id,
                           value,
                           py_format='B',
-                          tid=SPINEL.HEADER_DEFAULT):
+                          tid=SPINEL.HEADER_DEFAULT,
+                          timeout=None,
+                          retries=None):
         """ Blocking routine to insert a property value over SPINEL. """
         if CONFIG.DEBUG_LOG_PROP:
             handler = SPINEL_PROP_DISPATCH[prop_id]
             prop_name = handler.__name__
             print("PROP_VALUE_INSERT [tid=%d]: %s" % (tid & 0xF, prop_name))
         return self.__prop_change_value(SPINEL.CMD_PROP_VALUE_INSERT, prop_id,
-                                        value, py_format, tid)
+                                        value, py_format, tid, timeout,
+                                        retries)
 
     def prop_remove_value(self,
                           prop_id,
                           value,
                           py_format='B',
-                          tid=SPINEL.HEADER_DEFAULT):
+                          tid=SPINEL.HEADER_DEFAULT,
+                          timeout=None,
+                          retries=None):
         """ Blocking routine to remove a property value over SPINEL. """
         if CONFIG.DEBUG_LOG_PROP:
             handler = SPINEL_PROP_DISPATCH[prop_id]
             prop_name = handler.__name__
             print("PROP_VALUE_REMOVE [tid=%d]: %s" % (tid & 0xF, prop_name))
         return self.__prop_change_value(SPINEL.CMD_PROP_VALUE_REMOVE, prop_id,
-                                        value, py_format, tid)
+                                        value, py_format, tid, timeout,
+                                        retries)
+
+    def metrics(self):
+        """
+        Return a snapshot of request latency percentiles (in microseconds),
+        timeouts, late and unmatched responses, keyed by command and
+        property names, along with the RTT estimate used for timeouts and
+        the head-of-line latency of control and bulk frames.
+        """
+
+        def prop_name(prop_id):
+            handler = SPINEL_PROP_DISPATCH.get(prop_id)
+            return handler.__name__ if handler else str(prop_id)
+
+        snapshot = self.__metrics.snapshot(
+            lambda cmd: SPINEL_PROP_CMD_NAMES.get(cmd, str(cmd)), prop_name)
+        snapshot['rtt'] = self.rtt.stats()
+        snapshot['tx'] = self.tx.stats()
+        if self.pacer is not None:
+            snapshot['pacing'] = self.pacer.stats()
+        return snapshot
+
+    def metrics_reset(self):
+        self.__metrics.reset()
+
+    def has_cap(self, cap, tid=SPINEL.HEADER_DEFAULT):
+        """ Return True if PROP_CAPS of the NCP advertises the given capability. """
+        if self.caps is None:
+            value = self.prop_get_value(SPINEL.PROP_CAPS, tid)
+            if value is None:
+                return False
+            self.caps = set(caps[0][0] for caps in value[0])
+        return cap in self.caps
+
+    def __prop_change_many(self,
+                           cmd,
+                           items,
+                           tid=SPINEL.HEADER_DEFAULT,
+                           timeout=None):
+        """
+        Utility routine to get or set several properties in one round-trip.
+
+        Uses the MULTI variant of cmd when the NCP supports it, and otherwise
+        pipelines single requests before waiting for all of the responses.
+        """
+        prop_ids = [item[0] for item in items]
+        multi = self.has_cap(SPINEL.CAP_CMD_MULTI, tid)
+
+        self.queue_wait_prepare(None, tid)
+        for prop_id in prop_ids:
+            self.__metrics.request_start(tid, prop_id)
+        start = time.perf_counter()
+
+        if cmd == SPINEL.CMD_PROP_VALUE_GET:
+            if multi:
+                self.transact(SPINEL.CMD_PROP_VALUE_MULTI_GET,
+                              self.encode_multi_get(prop_ids), tid)
+            else:
+                for prop_id in prop_ids:
+                    self.transact(cmd, self.encode_prop(prop_id), tid)
+        else:
+            if multi:
+                self.transact(SPINEL.CMD_PROP_VALUE_MULTI_SET,
+                              self.encode_multi_set(items), tid)
+            else:
+                for item in items:
+                    self.transact(cmd, self.encode_prop(*item), tid)
+
+        results = self.queue_wait_for_props(prop_ids, tid, timeout)
+
+        elapsed = time.perf_counter() - start
+        metric_cmd = cmd
+        if multi:
+            metric_cmd = (SPINEL.CMD_PROP_VALUE_MULTI_GET if cmd
+                          == SPINEL.CMD_PROP_VALUE_GET else
+                          SPINEL.CMD_PROP_VALUE_MULTI_SET)
+        for prop_id, result in results.items():
+            self.__metrics.request_done(tid, metric_cmd, prop_id, elapsed,
+                                        result is not None)
+
+        values = {}
+        for item in items:
+            prop_id = item[0]
+            result = results[prop_id]
+            if result is None:
+                values[prop_id] = None
+                if self.cache is not None and cmd != SPINEL.CMD_PROP_VALUE_GET:
+                    self.cache.invalidate(prop_id)
+            else:
+                values[prop_id] = result.value
+                if self.cache is not None:
+                    self.cache.update(prop_id, result.value)
+                if cmd != SPINEL.CMD_PROP_VALUE_GET:
+                    self.journal_record(*item)
+        return values
+
+    def prop_get_many(self, prop_ids, tid=SPINEL.HEADER_DEFAULT, timeout=None):
+        """
+        Blocking routine to get several property values over SPINEL.
+
+        Returns a dict mapping each prop_id to its value, or None on failure.
+        """
+        values = {}
+        pending = []
+        for prop_id in prop_ids:
+            value = None
+            if self.cache is not None:
+                value = self.cache.get(prop_id)
+            if value is None:
+                pending.append((prop_id,))
+            else:
+                values[prop_id] = value
+
+        if CONFIG.DEBUG_LOG_PROP:
+            for (prop_id,) in pending:
+                handler = SPINEL_PROP_DISPATCH[prop_id]
+                print("PROP_VALUE_GET [tid=%d]: %s" %
+                      (tid & 0xF, handler.__name__))
+
+        if pending:
+            values.update(
+                self.__prop_change_many(SPINEL.CMD_PROP_VALUE_GET, pending,
+                                        tid, timeout))
+        return {prop_id: values[prop_id] for prop_id in prop_ids}
+
+    def prop_set_many(self, items, tid=SPINEL.HEADER_DEFAULT, timeout=None):
+        """
+        Blocking routine to set several property values over SPINEL.
+
+        items: sequence of (prop_id, value, py_format) tuples.
+        Returns a dict mapping each prop_id to the value reported back by
+        the NCP, or None on failure.
+        """
+        if CONFIG.DEBUG_LOG_PROP:
+            for item in items:
+                handler = SPINEL_PROP_DISPATCH[item[0]]
+                print("PROP_VALUE_SET [tid=%d]: %s" %
+                      (tid & 0xF, handler.__name__))
+        return self.__prop_change_many(SPINEL.CMD_PROP_VALUE_SET, items, tid,
+                                       timeout)
 
     def get_ipaddrs(self, tid=SPINEL.HEADER_DEFAULT):
         """
@@ -0,0 +1,149 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing capture output compressed on its own thread.
+"""
+
+import lzma
+import queue
+import threading
+import time
+import traceback
+import zlib
+
+import spinel.config as CONFIG
+
+COMPRESS_METHODS = ('gzip', 'lzma')
+
+# Chunks queued before writers block on the compressor.
+COMPRESS_QUEUE_DEPTH = 64
+
+_FLUSH = object()
+_CLOSE = object()
+
+
+class CompressedOutput(object):
+    """ File-like object compressing what is written to output. """
+
+    def __init__(self, output, method='gzip', depth=COMPRESS_QUEUE_DEPTH):
+        if method not in COMPRESS_METHODS:
+            raise ValueError("unknown compression method %s" % method)
+        self.output = output
+        self.method = method
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.stalls = 0  # Writes that waited for the compressor.
+        self.high_water = 0
+        self.error = None
+
+        self._compressor = None
+        self._queue = queue.Queue(depth)
+        self._start = time.monotonic()
+        self._stop = None
+        self._thread = threading.Thread(target=self._run,
+                                        name="CompressedOutput")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _put(self, item):
+        if self.error is not None:
+            raise self.error
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.stalls += 1
+            self._queue.put(item)
+        self.high_water = max(self.high_water, self._queue.qsize())
+
+    def write(self, data):
+        self._put(bytes(data))
+        self.bytes_in += len(data)
+        return len(data)
+
+    def flush(self):
+        """ Make everything written so far decompressible from output. """
+        self._put(_FLUSH)
+
+    def close(self):
+        self._put(_CLOSE)
+        self._thread.join()
+        self.output.close()
+        if self.error is not None:
+            raise self.error
+
+    def _new_compressor(self):
+        if self.method == 'gzip':
+            return zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+        return lzma.LZMACompressor(format=lzma.FORMAT_XZ)
+
+    def _frame(self):
+        """ Return the compressed bytes ending the current frame. """
+        if self._compressor is None:
+            return b''
+        if self.method == 'gzip':
+            return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        compressed = self._compressor.flush()
+        self._compressor = None
+        return compressed
+
+    def _run(self):
+        """ Compressor thread. """
+        item = None
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _CLOSE:
+                    compressed = b''
+                    if self._compressor is not None:
+                        compressed = self._compressor.flush()
+                elif item is _FLUSH:
+                    # Frame only once caught up, rather than every flush.
+                    if not self._queue.empty():
+                        continue
+                    compressed = self._frame()
+                else:
+                    if self._compressor is None:
+                        self._compressor = self._new_compressor()
+                    compressed = self._compressor.compress(item)
+
+                if compressed:
+                    self.output.write(compressed)
+                    self.bytes_out += len(compressed)
+                if item is _FLUSH:
+                    self.output.flush()
+                elif item is _CLOSE:
+                    break
+        except Exception as ex:
+            CONFIG.LOGGER.error(traceback.format_exc())
+            self.error = ex
+            # Keep draining, so that writers never block on a dead thread.
+            while item is not _CLOSE:
+                item = self._queue.get()
+        self._stop = time.monotonic()
+
+    def stats(self):
+        """ Return byte counters, throughput and queue depth. """
+        elapsed = (self._stop or time.monotonic()) - self._start
+        return {
+            'method': self.method,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'rate': self.bytes_out / elapsed if elapsed > 0 else 0,
+            'queued': self._queue.qsize(),
+            'high_water': self.high_water,
+            'stalls': self.stalls,
+        }
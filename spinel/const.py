@@ -53,6 +53,10 @@ class SPINEL(object):
     CMD_HBO_RECLAIMED = 16
     CMD_HBO_DROPPED = 17
 
+    CMD_PROP_VALUE_MULTI_GET = 18
+    CMD_PROP_VALUE_MULTI_SET = 19
+    RSP_PROP_VALUES_ARE = 20
+
     CMD_NEST__BEGIN = 15296
     CMD_NEST__END = 15360
 
@@ -449,7 +453,22 @@ class SPINEL(object):
 
     #=========================================
 
+    STATUS_OK = 0
+    STATUS_FAILURE = 1
+    STATUS_NOMEM = 11
+    STATUS_BUSY = 12
+
+    STATUS_RESET__BEGIN = 112
+    STATUS_RESET_POWER_ON = STATUS_RESET__BEGIN + 0
+    STATUS_RESET_EXTERNAL = STATUS_RESET__BEGIN + 1
+    STATUS_RESET_SOFTWARE = STATUS_RESET__BEGIN + 2
+    STATUS_RESET__END = 128
+
+    #=========================================
+
     # Describes the supported capabilities of NCP.
+    CAP_CMD_MULTI = 11
+
     CAP_OPENTHREAD__BEGIN = 512
 
     CAP_MAC_RETRY_HISTOGRAM = CAP_OPENTHREAD__BEGIN + 12
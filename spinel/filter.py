@@ -0,0 +1,313 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing capture filters over raw IEEE 802.15.4 frames.
+"""
+
+import operator
+import re
+
+FRAME_TYPES = {'beacon': 0, 'data': 1, 'ack': 2, 'cmd': 3}
+
+FCF_FRAME_TYPE = 0x0007
+FCF_SECURITY = 0x0008
+FCF_PANID_COMPRESSION = 0x0040
+FCF_SEQ_SUPPRESSION = 0x0100
+
+ADDR_SIZES = (0, 0, 2, 8)  # Per addressing mode, mode 1 is reserved.
+
+OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+TOKEN_RE = re.compile(r'[()]|[<>=!]=|[<>]|[^\s()<>=!]+')
+
+# Index of the fields in a layout returned by mhr_layout().
+DST_PAN = 0
+DST_ADDR = 1
+SRC_PAN = 2
+SRC_ADDR = 3
+
+_LAYOUTS = {}
+
+
+def mhr_layout(fcf):
+    """
+    Return the ((offset, size), ...) of the destination PAN, destination
+    address, source PAN and source address of frames with the given frame
+    control field. Absent fields have a size of 0, and a compressed source
+    PAN is read from the destination PAN.
+    """
+    layout = _LAYOUTS.get(fcf)
+    if layout is not None:
+        return layout
+
+    dst_size = ADDR_SIZES[(fcf >> 10) & 3]
+    src_size = ADDR_SIZES[(fcf >> 14) & 3]
+    compressed = fcf & FCF_PANID_COMPRESSION
+    offset = 3
+
+    if (fcf >> 12) & 3 == 2:
+        # IEEE 802.15.4-2015 frames.
+        if fcf & FCF_SEQ_SUPPRESSION:
+            offset = 2
+        both_extended = dst_size == src_size == 8
+        if dst_size and src_size:
+            dst_pan = not (compressed and both_extended)
+            src_pan = not (compressed or both_extended)
+        else:
+            dst_pan = not src_size and bool(dst_size) != bool(compressed)
+            src_pan = bool(src_size) and not compressed
+    else:
+        dst_pan = bool(dst_size)
+        src_pan = bool(src_size) and not compressed
+
+    fields = []
+    for (present, size) in ((dst_pan, 2), (True, dst_size), (src_pan, 2),
+                            (True, src_size)):
+        size = size if present else 0
+        fields.append((offset, size))
+        offset += size
+    if not src_pan and dst_pan and src_size:
+        fields[SRC_PAN] = fields[DST_PAN]
+
+    layout = _LAYOUTS[fcf] = tuple(fields)
+    return layout
+
+
+def _field(index, value):
+    """ Predicate of a MAC header field equal to value, little endian. """
+    size = len(value)
+
+    def match(data, base, length, rssi):
+        if length < 3:
+            return False
+        fcf = data[base] | data[base + 1] << 8
+        (offset, field_size) = mhr_layout(fcf)[index]
+        return (field_size == size and offset + size <= length and
+                data[base + offset:base + offset + size] == value)
+
+    return match
+
+
+def _fcf(mask, value):
+    """ Predicate of the frame control field bits in mask equal to value. """
+
+    def match(data, base, length, rssi):
+        return (length >= 2 and
+                (data[base] | data[base + 1] << 8) & mask == value)
+
+    return match
+
+
+def _rssi(compare, value):
+
+    def match(data, base, length, rssi):
+        return rssi is not None and compare(rssi, value)
+
+    return match
+
+
+def _length(compare, value):
+
+    def match(data, base, length, rssi):
+        return compare(length, value)
+
+    return match
+
+
+def _any(first, second):
+
+    def match(data, base, length, rssi):
+        return (first(data, base, length, rssi) or
+                second(data, base, length, rssi))
+
+    return match
+
+
+def _all(first, second):
+
+    def match(data, base, length, rssi):
+        return (first(data, base, length, rssi) and
+                second(data, base, length, rssi))
+
+    return match
+
+
+def _not(predicate):
+
+    def match(data, base, length, rssi):
+        return not predicate(data, base, length, rssi)
+
+    return match
+
+
+class _Parser(object):
+    """ Recursive descent parser of a capture filter into a predicate. """
+
+    def __init__(self, text):
+        self.tokens = TOKEN_RE.findall(text)
+        self.pos = 0
+
+    def next(self, what):
+        if self.pos >= len(self.tokens):
+            raise ValueError("capture filter: missing %s" % what)
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None
+
+    def parse(self):
+        predicate = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError("capture filter: unexpected '%s'" % self.peek())
+        return predicate
+
+    def parse_or(self):
+        predicate = self.parse_and()
+        while self.peek() == 'or':
+            self.pos += 1
+            predicate = _any(predicate, self.parse_and())
+        return predicate
+
+    def parse_and(self):
+        predicate = self.parse_not()
+        while self.peek() == 'and':
+            self.pos += 1
+            predicate = _all(predicate, self.parse_not())
+        return predicate
+
+    def parse_not(self):
+        token = self.next("expression")
+        if token == 'not':
+            return _not(self.parse_not())
+        if token == '(':
+            predicate = self.parse_or()
+            if self.next("')'") != ')':
+                raise ValueError("capture filter: missing ')'")
+            return predicate
+        return self.parse_primitive(token)
+
+    def parse_int(self, what):
+        token = self.next(what)
+        try:
+            return int(token, 0)
+        except ValueError:
+            raise ValueError("capture filter: bad %s '%s'" % (what, token))
+
+    def parse_compare(self, what):
+        compare = operator.eq
+        if self.peek() in OPERATORS:
+            compare = OPERATORS[self.next("operator")]
+        return (compare, self.parse_int(what))
+
+    def parse_address(self):
+        token = self.next("address")
+        if ':' in token:
+            value = bytes(int(octet, 16) for octet in token.split(':'))
+            if len(value) != 8:
+                raise ValueError("capture filter: bad address '%s'" % token)
+            # Extended addresses are sent least significant octet first.
+            return value[::-1]
+        return self.pack_short(token, "address")
+
+    def pack_short(self, token, what):
+        try:
+            return int(token, 0).to_bytes(2, 'little')
+        except (ValueError, OverflowError):
+            raise ValueError("capture filter: bad %s '%s'" % (what, token))
+
+    def parse_primitive(self, token):
+        if token == 'pan':
+            value = self.pack_short(self.next("PAN ID"), "PAN ID")
+            return _any(_field(DST_PAN, value), _field(SRC_PAN, value))
+        if token in ('src', 'dst', 'addr'):
+            value = self.parse_address()
+            if token == 'src':
+                return _field(SRC_ADDR, value)
+            if token == 'dst':
+                return _field(DST_ADDR, value)
+            return _any(_field(DST_ADDR, value), _field(SRC_ADDR, value))
+        if token == 'type':
+            name = self.next("frame type")
+            frame_type = FRAME_TYPES.get(name)
+            if frame_type is None:
+                self.pos -= 1
+                frame_type = self.parse_int("frame type")
+            return _fcf(FCF_FRAME_TYPE, frame_type & FCF_FRAME_TYPE)
+        if token == 'security':
+            return _fcf(FCF_SECURITY, FCF_SECURITY)
+        if token == 'rssi':
+            return _rssi(*self.parse_compare("RSSI"))
+        if token == 'len':
+            return _length(*self.parse_compare("length"))
+        raise ValueError("capture filter: unknown primitive '%s'" % token)
+
+
+class CaptureFilter(object):
+    """
+    Capture filter compiled once into nested predicates reading fixed byte
+    offsets of the MAC header, so that frames are dropped before their
+    metadata is parsed. Primitives, combined with and, or, not and
+    parentheses:
+
+        pan <id>                    destination or source PAN ID, e.g. 0xface
+        src|dst|addr <address>      short (0x1234) or extended address
+                                    (00:11:22:33:44:55:66:77)
+        type beacon|data|ack|cmd    frame type, or its number
+        security                    security enabled
+        rssi <op> <dBm>             op is one of == != < <= > >=, default ==
+        len <op> <bytes>            PSDU length, FCS included
+
+    For example: pan 0xface and not type ack and rssi >= -70
+    """
+
+    def __init__(self, text):
+        """ Raise ValueError if text is not a valid filter. """
+        self.text = text
+        self._match = _Parser(text).parse()
+        self.passed = 0
+        self.dropped = 0
+
+    def match(self, frame, rssi=None):
+        """ Return whether a raw frame, FCS included, passes the filter. """
+        return self._match(frame, 0, len(frame), rssi)
+
+    def match_stream_raw(self, value):
+        """
+        Return whether the frame of a PROP_STREAM_RAW value passes the
+        filter, without parsing its metadata beyond the RSSI.
+        """
+        length = value[0] | value[1] << 8
+        rssi = None
+        if len(value) > 2 + length:
+            rssi = value[2 + length]
+            rssi -= (rssi & 0x80) << 1
+        if self._match(value, 2, min(length, len(value) - 2), rssi):
+            self.passed += 1
+            return True
+        self.dropped += 1
+        return False
@@ -17,6 +17,7 @@
 """ High-Level Data Link Control (HDLC) module. """
 
 import binascii
+import re
 
 from struct import pack
 
@@ -32,6 +33,9 @@ HDLC_FCS_INIT = 0xFFFF
 HDLC_FCS_POLY = 0x8408
 HDLC_FCS_GOOD = 0xF0B8
 
+# Bytes that must be escaped in an encoded frame.
+HDLC_ESCAPE_RE = re.compile(b'[\x7d\x7e]')
+
 
 class Hdlc(IStream):
     """ Utility class for HDLC encoding and decoding. """
@@ -40,6 +44,13 @@ class Hdlc(IStream):
         self.stream = stream
         self.fcstab = self.mkfcstab()
 
+        # Incremental decoder state for feed().
+        self.rx_synced = False
+        self.rx_escape = False
+        self.rx_packet = bytearray()
+        self.rx_fcs = HDLC_FCS_INIT
+        self.fcs_errors = 0  # Packets dropped on a bad FCS.
+
     @classmethod
     def mkfcstab(cls):
         """ Make a static lookup table for byte value to FCS16 result. """
@@ -104,6 +115,7 @@ class Hdlc(IStream):
                 "RX Hdlc: " + binascii.hexlify(bytearray(raw)).decode('utf-8'))
 
         if fcs != HDLC_FCS_GOOD:
+            self.fcs_errors += 1
             packet = None
         else:
             packet = packet[:-2]  # remove FCS16 from end
@@ -111,6 +123,50 @@ class Hdlc(IStream):
 
         return packet
 
+    def feed(self, data):
+        """
+        Decode a chunk of raw stream bytes and return the list of complete
+        packets that passed HDLC decoding. Partial packets are kept until
+        the next call, so data may be split at any byte boundary.
+        """
+        packets = []
+        fcstab = self.fcstab
+        packet = self.rx_packet
+        fcs = self.rx_fcs
+
+        for byte in data:
+            if byte == HDLC_FLAG:
+                if self.rx_synced and len(packet) != 0:
+                    if fcs == HDLC_FCS_GOOD:
+                        packets.append(bytes(packet[:-2]))
+                    else:
+                        self.fcs_errors += 1
+                        if CONFIG.DEBUG_HDLC:
+                            CONFIG.LOGGER.debug(
+                                "RX Hdlc: bad fcs " +
+                                binascii.hexlify(packet).decode('utf-8'))
+                    packet = bytearray()
+                # A closing flag also opens the next packet.
+                self.rx_synced = True
+                self.rx_escape = False
+                fcs = HDLC_FCS_INIT
+                continue
+
+            if not self.rx_synced:
+                continue
+            if byte == HDLC_ESCAPE:
+                self.rx_escape = True
+                continue
+            if self.rx_escape:
+                byte ^= 0x20
+                self.rx_escape = False
+            packet.append(byte)
+            fcs = (fcs >> 8) ^ fcstab[(fcs ^ byte) & 0xff]
+
+        self.rx_packet = packet
+        self.rx_fcs = fcs
+        return packets
+
     @classmethod
     def encode_byte(cls, byte, packet=[]):
         """ HDLC encode and append a single byte to the given packet. """
@@ -121,22 +177,63 @@ class Hdlc(IStream):
             packet.append(byte)
         return packet
 
-    def encode(self, payload=""):
-        """ Return the HDLC encoding of the given packet. """
+    @classmethod
+    def encoded_size(cls, length):
+        """ Return the largest HDLC encoding of a packet of length bytes. """
+        return 2 * (length + 2) + 2
+
+    def encode_into(self, buf, *chunks):
+        """
+        HDLC encode the concatenation of chunks into the bytearray buf,
+        starting at offset 0, and return the end offset of the frame.
+
+        Chunks may be any bytes-like object such as a memoryview, and are
+        copied straight into buf, which only grows if it is too short.
+        """
+        size = self.encoded_size(sum(len(chunk) for chunk in chunks))
+        if len(buf) < size:
+            buf.extend(bytes(size - len(buf)))
+
+        fcstab = self.fcstab
         fcs = HDLC_FCS_INIT
-        packet = []
-        packet.append(HDLC_FLAG)
-        for byte in payload:
-            fcs = self.fcs16(byte, fcs)
-            packet = self.encode_byte(byte, packet)
+        buf[0] = HDLC_FLAG
+        end = 1
+        for chunk in chunks:
+            chunk = memoryview(chunk).cast('B')
+            for byte in chunk:
+                fcs = (fcs >> 8) ^ fcstab[(fcs ^ byte) & 0xff]
+
+            start = 0
+            for match in HDLC_ESCAPE_RE.finditer(chunk):
+                pos = match.start()
+                length = pos - start
+                buf[end:end + length] = chunk[start:pos]
+                end += length
+                buf[end] = HDLC_ESCAPE
+                buf[end + 1] = chunk[pos] ^ 0x20
+                end += 2
+                start = pos + 1
+            length = len(chunk) - start
+            buf[end:end + length] = chunk[start:]
+            end += length
 
         fcs ^= 0xffff
-        byte = fcs & 0xFF
-        packet = self.encode_byte(byte, packet)
-        byte = fcs >> 8
-        packet = self.encode_byte(byte, packet)
-        packet.append(HDLC_FLAG)
-        packet = pack("%dB" % len(packet), *packet)
+        for byte in (fcs & 0xFF, fcs >> 8):
+            if (byte == HDLC_ESCAPE) or (byte == HDLC_FLAG):
+                buf[end] = HDLC_ESCAPE
+                buf[end + 1] = byte ^ 0x20
+                end += 2
+            else:
+                buf[end] = byte
+                end += 1
+        buf[end] = HDLC_FLAG
+        return end + 1
+
+    def encode(self, payload=b""):
+        """ Return the HDLC encoding of the given packet. """
+        buf = bytearray(self.encoded_size(len(payload)))
+        end = self.encode_into(buf, payload)
+        packet = bytes(buf[:end])
 
         if CONFIG.DEBUG_HDLC:
             CONFIG.LOGGER.debug(
@@ -0,0 +1,111 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing a single I/O thread shared by many WpanApi instances.
+"""
+
+import selectors
+import socket
+import threading
+import traceback
+
+import spinel.config as CONFIG
+
+
+class WpanHub(object):
+    """ Selector driven reader for the streams of many WpanApi instances. """
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._alive = True
+
+        # Used to wake up select() when registrations change.
+        (self._wakeup_rx, self._wakeup_tx) = socket.socketpair()
+        self._wakeup_rx.setblocking(False)
+        self.selector.register(self._wakeup_rx, selectors.EVENT_READ, None)
+
+        self.thread = threading.Thread(target=self.run, name="WpanHub")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _wakeup(self):
+        try:
+            self._wakeup_tx.send(b'\0')
+        except OSError:
+            pass
+
+    def register(self, wpan_api):
+        """
+        Service the stream of wpan_api from the hub thread.
+
+        Returns False if the stream cannot be polled on this platform,
+        in which case the caller needs its own reader thread.
+        """
+        try:
+            fileno = wpan_api.stream.fileno()
+            if fileno is None:
+                return False
+            with self._lock:
+                self.selector.register(fileno, selectors.EVENT_READ, wpan_api)
+        except (AttributeError, OSError, ValueError):
+            return False
+
+        self._wakeup()
+        return True
+
+    def unregister(self, wpan_api):
+        with self._lock:
+            for key in list(self.selector.get_map().values()):
+                if key.data is wpan_api:
+                    self.selector.unregister(key.fileobj)
+        self._wakeup()
+
+    def close(self):
+        self._alive = False
+        self._wakeup()
+        if self.thread is not threading.current_thread():
+            self.thread.join()
+        self.selector.close()
+        self._wakeup_rx.close()
+        self._wakeup_tx.close()
+
+    def run(self):
+        """ Hub thread: read ready streams and dispatch their frames. """
+        while self._alive:
+            for (key, _) in self.selector.select():
+                wpan_api = key.data
+                if wpan_api is None:
+                    try:
+                        self._wakeup_rx.recv(512)
+                    except OSError:
+                        pass
+                    continue
+
+                try:
+                    if not wpan_api.stream_feed():
+                        CONFIG.LOGGER.info("WpanHub: stream closed")
+                        self.unregister(wpan_api)
+                except Exception:
+                    CONFIG.LOGGER.error(traceback.format_exc())
+                    self.unregister(wpan_api)
@@ -0,0 +1,164 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing a timestamp ordered merge of frames from several sources.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+from spinel.boundedqueue import QUEUE_POLICY_BLOCK
+from spinel.boundedqueue import QUEUE_POLICY_DROP_NEWEST
+from spinel.boundedqueue import QUEUE_POLICY_DROP_OLDEST
+from spinel.metrics import LatencyHistogram
+
+MERGE_WINDOW = 0.2  # Seconds a frame may wait for slower sources.
+MERGE_DEPTH = 10000
+
+
+class FrameMerger(object):
+    """ Heap based k-way merge of timestamped frames with a reorder window. """
+
+    def __init__(self,
+                 sources,
+                 window=MERGE_WINDOW,
+                 depth=MERGE_DEPTH,
+                 policy=QUEUE_POLICY_DROP_OLDEST):
+        """
+        depth: frames held at most, beyond which put() applies policy.
+        """
+        self.sources = sources
+        self.window = window
+        self.depth = depth
+        self.policy = policy
+
+        self._cond = threading.Condition()
+        self._heap = []  # (timestamp, arrival seq, source, arrival, item)
+        self._seq = itertools.count()
+        self._latest = [None] * sources  # Newest timestamp of each source.
+        self._last_seq = -1  # Highest arrival seq released.
+        self._last_timestamp = None
+        self._closed = False
+        self._start = time.monotonic()
+
+        self.frames = [0] * sources
+        self.bytes = [0] * sources
+        self.reordered = 0  # Released after a frame that arrived later.
+        self.late = 0  # Released after a more recent frame, out of order.
+        self.forced = 0  # Released by the window or depth bound.
+        self.dropped = 0  # Discarded by the policy while full.
+        self.high_water = 0
+        self.hold = LatencyHistogram()  # Microseconds frames were held.
+
+    def put(self, source, timestamp, item, size=0):
+        """ Add a frame from source, whose timestamps must not decrease. """
+        with self._cond:
+            self._latest[source] = timestamp
+            self.frames[source] += 1
+            self.bytes[source] += size
+            if len(self._heap) >= self.depth:
+                if self.policy == QUEUE_POLICY_BLOCK:
+                    # Woken up by the early release of get().
+                    while len(self._heap) >= self.depth and not self._closed:
+                        self._cond.wait()
+                elif self.policy == QUEUE_POLICY_DROP_NEWEST:
+                    self.dropped += 1
+                    return
+                else:
+                    heapq.heappop(self._heap)
+                    self.dropped += 1
+            heapq.heappush(self._heap, (timestamp, next(self._seq), source,
+                                        time.monotonic(), item))
+            self.high_water = max(self.high_water, len(self._heap))
+            self._cond.notify_all()
+
+    def close(self):
+        """ Release all held frames, then make get() return None. """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _watermark(self):
+        """ Timestamp up to which every source has delivered its frames. """
+        if None in self._latest:
+            return None
+        return min(self._latest)
+
+    def get(self, timeout=None):
+        """
+        Return the next (source, timestamp, item) in timestamp order, or
+        None if none can be released within timeout seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = None
+                if self._heap:
+                    (timestamp, seq, source, arrival, item) = self._heap[0]
+                    watermark = self._watermark()
+                    if watermark is not None and timestamp <= watermark:
+                        return self._release(now)
+                    if (self._closed or len(self._heap) >= self.depth or
+                            now - arrival >= self.window):
+                        self.forced += 1
+                        return self._release(now)
+                    wait = arrival + self.window - now
+                elif self._closed:
+                    return None
+
+                if deadline is not None:
+                    if now >= deadline:
+                        return None
+                    wait = deadline - now if wait is None else min(
+                        wait, deadline - now)
+                self._cond.wait(wait)
+
+    def _release(self, now):
+        (timestamp, seq, source, arrival, item) = heapq.heappop(self._heap)
+        # Wakes up a put() blocked on a full heap.
+        self._cond.notify_all()
+        if seq < self._last_seq:
+            self.reordered += 1
+        self._last_seq = max(self._last_seq, seq)
+        if self._last_timestamp is None or timestamp >= self._last_timestamp:
+            self._last_timestamp = timestamp
+        else:
+            self.late += 1
+        self.hold.record((now - arrival) * 1000000)
+        return (source, timestamp, item)
+
+    def stats(self):
+        """ Return per-source throughput and reorder statistics. """
+        with self._cond:
+            elapsed = max(time.monotonic() - self._start, 1e-6)
+            return {
+                'sources': [{
+                    'frames': self.frames[source],
+                    'bytes': self.bytes[source],
+                    'rate': self.frames[source] / elapsed,
+                } for source in range(self.sources)],
+                'held': len(self._heap),
+                'high_water': self.high_water,
+                'reordered': self.reordered,
+                'late': self.late,
+                'forced': self.forced,
+                'dropped': self.dropped,
+                'hold': self.hold.snapshot(),
+            }
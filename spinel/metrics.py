@@ -0,0 +1,268 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Module providing latency histograms and request accounting for WpanApi. """
+
+import threading
+import time
+
+from collections import defaultdict
+from collections import deque
+
+# Log-linear buckets: values below 2^SUB_BUCKET_BITS are exact, above that
+# each power of two is split into 2^(SUB_BUCKET_BITS-1) buckets, giving a
+# relative error below 1 / 2^(SUB_BUCKET_BITS-1) (about 6%).
+SUB_BUCKET_BITS = 5
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+
+# Largest trackable value is 2^MAX_VALUE_BITS - 1 (about 19 hours in usec).
+MAX_VALUE_BITS = 36
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+# Seconds the reply to a request nobody waits for is expected within.
+REPLY_TIMEOUT = 2
+
+
+class LatencyHistogram(object):
+    """
+    HDR-style histogram of integer latencies in microseconds.
+
+    Recording is O(1) and the memory footprint is fixed.
+    """
+
+    def __init__(self):
+        self.counts = [0] * ((MAX_VALUE_BITS - SUB_BUCKET_BITS + 1) *
+                             SUB_BUCKET_COUNT)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    @classmethod
+    def index_of(cls, value):
+        if value < SUB_BUCKET_COUNT:
+            return value
+        shift = value.bit_length() - SUB_BUCKET_BITS
+        return (shift << SUB_BUCKET_BITS) + (value >> shift)
+
+    @classmethod
+    def value_of(cls, index):
+        """ Highest value that maps to the given bucket index. """
+        shift = index >> SUB_BUCKET_BITS
+        if shift == 0:
+            return index
+        sub_bucket = index & (SUB_BUCKET_COUNT - 1)
+        return ((sub_bucket + 1) << shift) - 1
+
+    def record(self, value):
+        value = min(max(int(value), 0), (1 << MAX_VALUE_BITS) - 1)
+        self.counts[self.index_of(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """ Add the samples of another histogram to this one. """
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or
+                                      other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or
+                                      other.max > self.max):
+            self.max = other.max
+
+    def percentile(self, percent):
+        """ Return the value at or below which percent of samples fall. """
+        if self.count == 0:
+            return None
+        threshold = max(1, int(round(self.count * percent / 100.0)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                return min(self.value_of(index), self.max)
+        return self.max
+
+    def snapshot(self):
+        result = {
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.total / self.count if self.count else None,
+        }
+        for percent in PERCENTILES:
+            result['p%g' % percent] = self.percentile(percent)
+        return result
+
+
+class RequestMetrics(object):
+    """
+    Per command / property latency and timeout accounting for WpanApi.
+
+    Responses are classified when they reach the host:
+        matched:   a caller is waiting for it, or it answers a request
+                   sent without waiting (see request_async()).
+        late:      its caller already gave up and returned None.
+        unmatched: nobody asked for it on that tid.
+    """
+
+    def __init__(self, reply_timeout=REPLY_TIMEOUT):
+        self.reply_timeout = reply_timeout
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = defaultdict(LatencyHistogram)  # (cmd, prop) keys.
+            self.timeouts = defaultdict(int)  # (cmd, prop) keys.
+            self.late = 0
+            self.unmatched = 0
+            self._pending = defaultdict(int)  # (tid, prop) keys.
+            # Reply deadlines of abandoned requests, by (tid, prop).
+            self._abandoned = defaultdict(deque)
+            self._async = defaultdict(deque)  # Map tid to reply deadlines.
+            self.resets = 0
+            self.restore_failures = 0
+            self.downtime = LatencyHistogram()
+
+    def request_start(self, tid, prop_id):
+        with self._lock:
+            self._pending[(tid, prop_id)] += 1
+
+    def request_async(self, tid):
+        """ Expect one reply on tid to a request nobody waits for. """
+        with self._lock:
+            self._async[tid].append(time.monotonic() + self.reply_timeout)
+
+    def request_done(self, tid, cmd, prop_id, elapsed, ok, abandon=None):
+        """
+        Record the outcome of a request that took elapsed seconds.
+
+        abandon: whether a reply to the request may still come on tid, where
+                 it must not be taken for another reply. Defaults to not ok.
+        """
+        key = (tid, prop_id)
+        with self._lock:
+            self._pending[key] -= 1
+            if self._pending[key] <= 0:
+                del self._pending[key]
+            if ok:
+                self.latency[(cmd, prop_id)].record(elapsed * 1000000)
+            else:
+                self.timeouts[(cmd, prop_id)] += 1
+            if abandon is None:
+                abandon = not ok
+            if abandon:
+                self._abandoned[key].append(time.monotonic() +
+                                            self.reply_timeout)
+
+    def late_response(self):
+        """ Count a reply dropped because its request already completed. """
+        with self._lock:
+            self.late += 1
+
+    def response(self, tid, prop_id, status_prop=None):
+        """
+        Classify a response received on tid.
+
+        Returns False for late responses, which should not be delivered.
+        A status_prop response (LAST_STATUS) matches any pending request
+        on tid.
+        """
+        key = (tid, prop_id)
+        with self._lock:
+            # A waiting request always gets the reply: the one it abandoned
+            # may have been lost, and is then taken for the next reply.
+            if key in self._pending:
+                return True
+            if prop_id == status_prop and any(
+                    pending_tid == tid for (pending_tid, _) in self._pending):
+                return True
+            if self._expected(self._abandoned, key):
+                self.late += 1
+                return False
+            if self._expected(self._async, tid):
+                return True
+            self.unmatched += 1
+            return True
+
+    @classmethod
+    def _expected(cls, replies, key):
+        """ Consume a reply expected under key, if one is still due. """
+        deadlines = replies.get(key)
+        if not deadlines:
+            return False
+        now = time.monotonic()
+        while deadlines and deadlines[0] < now:
+            deadlines.popleft()
+        if not deadlines:
+            return False
+        deadlines.popleft()
+        return True
+
+    def reset_detected(self):
+        """ Count an NCP reset that was not requested by the host. """
+        with self._lock:
+            self.resets += 1
+
+    def reset_restored(self, elapsed, ok):
+        """ Record the seconds from reset detection to restored state. """
+        with self._lock:
+            self.downtime.record(elapsed * 1000000)
+            if not ok:
+                self.restore_failures += 1
+
+    def snapshot(self, cmd_name=str, prop_name=str):
+        """ Return a dict snapshot of all counters and latency percentiles. """
+        with self._lock:
+            requests = {}
+            commands = defaultdict(LatencyHistogram)
+            keys = set(self.latency) | set(self.timeouts)
+            for (cmd, prop_id) in keys:
+                histogram = self.latency.get((cmd, prop_id),
+                                             LatencyHistogram())
+                commands[cmd].merge(histogram)
+                stats = histogram.snapshot()
+                stats['timeouts'] = self.timeouts.get((cmd, prop_id), 0)
+                requests[(cmd_name(cmd), prop_name(prop_id))] = stats
+
+            command_stats = {}
+            for cmd, histogram in commands.items():
+                stats = histogram.snapshot()
+                stats['timeouts'] = sum(count
+                                        for (key_cmd, _), count in
+                                        self.timeouts.items()
+                                        if key_cmd == cmd)
+                command_stats[cmd_name(cmd)] = stats
+
+            return {
+                'requests': requests,
+                'commands': command_stats,
+                'timeouts': sum(self.timeouts.values()),
+                'late': self.late,
+                'unmatched': self.unmatched,
+                'resets': self.resets,
+                'restore_failures': self.restore_failures,
+                'downtime': self.downtime.snapshot(),
+            }
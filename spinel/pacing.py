@@ -0,0 +1,187 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing NCP-buffer-aware pacing of the packets WpanApi sends.
+"""
+
+import threading
+import time
+
+from collections import deque
+
+from spinel.const import SPINEL
+
+# STREAM_NET frames are sent on their own tid so that their LAST_STATUS
+# responses can be told apart from those of property commands.
+PACING_TID = SPINEL.HEADER_ASYNC | 3
+
+# MSG_BUFFER_COUNTERS samples are answered on a tid of their own, so that
+# their status is never taken for that of a STREAM_NET frame.
+PACING_SAMPLE_TID = SPINEL.HEADER_ASYNC | 5
+
+PACING_WINDOW_INIT = 4
+PACING_WINDOW_MIN = 1
+PACING_WINDOW_MAX = 64
+
+PACING_INTERVAL = 0.5  # Seconds between MSG_BUFFER_COUNTERS samples.
+PACING_FREE_LOW = 0.25  # Fraction of free buffers considered congested.
+PACING_LOSS_TIMEOUT = 1.0  # Seconds before a missing response is a loss.
+
+PACING_CONGESTED = (SPINEL.STATUS_NOMEM, SPINEL.STATUS_BUSY)
+
+
+class SendPacer(object):
+    """ AIMD window of STREAM_NET frames in flight to the NCP. """
+
+    def __init__(self,
+                 window_init=PACING_WINDOW_INIT,
+                 window_min=PACING_WINDOW_MIN,
+                 window_max=PACING_WINDOW_MAX,
+                 free_low=PACING_FREE_LOW,
+                 loss_timeout=PACING_LOSS_TIMEOUT):
+        self.window_init = window_init
+        self.window_min = window_min
+        self.window_max = window_max
+        self.free_low = free_low
+        self.loss_timeout = loss_timeout
+
+        self._cond = threading.Condition()
+        self.reset()
+
+    def reset(self):
+        """ Forget the frames in flight, e.g. after an NCP reset. """
+        with self._cond:
+            self.window = float(self.window_init)
+            self._inflight = deque()  # (seq, send time), in send order.
+            self._seq = 0
+            self._recover = 0  # Frames sent before seq were already cut for.
+            self._active = False  # Sent anything since the last sample.
+            self.counters = {
+                'sent': 0,
+                'ok': 0,
+                'nomem': 0,
+                'busy': 0,
+                'dropped': 0,
+                'lost': 0,
+                'buffer_low': 0,
+                'decreases': 0,
+            }
+            self.buffers = None  # Last (free, total) sampled.
+            self._cond.notify_all()
+
+    @property
+    def inflight(self):
+        return len(self._inflight)
+
+    def acquire(self, timeout, poll=None):
+        """
+        Wait up to timeout seconds for room in the window and account one
+        frame as sent. poll(seconds) pumps the stream when no reader thread
+        delivers responses. Returns False if the window stayed full.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                if len(self._inflight) < int(self.window):
+                    self._inflight.append((self._seq, now))
+                    self._seq += 1
+                    self._active = True
+                    self.counters['sent'] += 1
+                    return True
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    return False
+                # Wake up in time to declare the oldest frame lost.
+                remaining = min(remaining,
+                                self._inflight[0][1] + self.loss_timeout - now)
+                if poll is None:
+                    self._cond.wait(max(remaining, 0))
+                    continue
+
+                self._cond.release()
+                try:
+                    poll(max(remaining, 0))
+                finally:
+                    self._cond.acquire()
+
+    def response(self, status):
+        """ Account the LAST_STATUS of the oldest frame in flight. """
+        with self._cond:
+            if not self._inflight:
+                return
+            (seq, _) = self._inflight.popleft()
+            if status == SPINEL.STATUS_OK:
+                self.counters['ok'] += 1
+                self.window = min(self.window + 1 / self.window,
+                                  self.window_max)
+            elif status in PACING_CONGESTED:
+                if status == SPINEL.STATUS_NOMEM:
+                    self.counters['nomem'] += 1
+                else:
+                    self.counters['busy'] += 1
+                self._decrease(seq)
+            else:
+                self.counters['dropped'] += 1
+            self._cond.notify_all()
+
+    def buffers_sampled(self, free, total):
+        """ Account a MSG_BUFFER_COUNTERS sample of the NCP. """
+        with self._cond:
+            self.buffers = (free, total)
+            if total and free < total * self.free_low:
+                self.counters['buffer_low'] += 1
+                self._decrease(self._seq - 1)
+                self._cond.notify_all()
+
+    def sample_due(self):
+        """ Return True if frames were sent since the last call. """
+        with self._cond:
+            active = self._active or bool(self._inflight)
+            self._active = False
+            self._expire(time.monotonic())
+            return active
+
+    def _expire(self, now):
+        expired = False
+        while (self._inflight and
+               now - self._inflight[0][1] >= self.loss_timeout):
+            (seq, _) = self._inflight.popleft()
+            self.counters['lost'] += 1
+            self._decrease(seq)
+            expired = True
+        if expired:
+            self._cond.notify_all()
+
+    def _decrease(self, seq):
+        """ Halve the window unless it was already cut for frame seq. """
+        if seq < self._recover:
+            return
+        self._recover = self._seq
+        self.window = max(self.window / 2, self.window_min)
+        self.counters['decreases'] += 1
+
+    def stats(self):
+        """ Return the window, frames in flight and congestion counters. """
+        with self._cond:
+            result = dict(self.counters)
+            result['window'] = self.window
+            result['inflight'] = len(self._inflight)
+            result['buffers'] = self.buffers
+            return result
@@ -16,7 +16,14 @@
 #
 """ Module to provide codec utilities for .pcap formatters. """
 
+import os
 import struct
+import threading
+import time
+
+from spinel.phy import channel_frequency
+from spinel.phy import channel_page
+from spinel.phy import MAX_PSDU_SIZE
 
 PCAP_MAGIC_NUMBER = 0xA1B2C3D4
 PCAP_VERSION_MAJOR = 2
@@ -28,11 +35,12 @@ DLT_IEEE802_15_4_TAP = 283
 
 # Refer to the IEEE 802.15.4 TAP Link Type Specification on
 # https://github.com/jkcko/ieee802.15.4-tap
-# Default length of TAP Header and channel TLV
-TLVS_LENGTH_DEFAULT = 12
+# Channel assignment TLV, and channel center frequency TLV in kHz when the
+# channel is in the channel plan of spinel.phy.
 CHANNEL_TYPE = 3
 CHANNEL_LEN = 3
-CHANNEL_PAGE = 0
+FREQUENCY_TYPE = 11
+FREQUENCY_LEN = 4
 
 # FCS TLV (optional, depending on `--crc`)
 FCS_TYPE = 0
@@ -45,6 +53,35 @@ RSS_LEN = 4
 LQI_TYPE = 10
 LQI_LEN = 1
 
+PCAP_RECORD_HEADER = struct.Struct("<LLLL")
+TAP_HEADER = struct.Struct("<HH")
+TAP_CHANNEL = struct.Struct("<HHHH")  # Channel and page, padded.
+TAP_FREQUENCY = struct.Struct("<HHf")
+TAP_RSSI_LQI = struct.Struct("<HHfHHI")
+TAP_FCS = struct.Struct("<HHI")
+
+# Record header and TAP header of PcapCodec.pack_raw().
+TAP_RECORD = struct.Struct("<LLLLHH")
+
+# Captures hold the longest PSDU with all the TAP TLVs written.
+TAP_LENGTH_MAX = (TAP_HEADER.size + TAP_CHANNEL.size + TAP_FREQUENCY.size +
+                  TAP_RSSI_LQI.size + TAP_FCS.size)
+PCAP_SNAPLEN = MAX_PSDU_SIZE + TAP_LENGTH_MAX
+
+# Default flush policy of PcapWriter: whichever of these comes first.
+PCAP_FLUSH_FRAMES = 256
+PCAP_FLUSH_INTERVAL = 0.2  # Seconds.
+PCAP_LIVE_FLUSH_INTERVAL = 0.02  # Seconds, for captures read as they go.
+PCAP_BUFFER_SIZE = 1 << 20  # Bytes.
+
+# Map channel to its TAP TLVs, see PcapCodec.channel_tlvs().
+CHANNEL_TLVS = {}
+
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
 
 def crc(s):
     # Some chips do not transmit the CRC, here we recalculate the CRC.
@@ -72,7 +109,21 @@ class PcapCodec(object):
         """ Returns a pcap file header. """
         cls._dlt = dlt
         return struct.pack("<LHHLLLL", PCAP_MAGIC_NUMBER, PCAP_VERSION_MAJOR,
-                           PCAP_VERSION_MINOR, 0, 0, 256, cls._dlt)
+                           PCAP_VERSION_MINOR, 0, 0, PCAP_SNAPLEN, cls._dlt)
+
+    @classmethod
+    def channel_tlvs(cls, channel):
+        """ Returns the TAP TLVs of the channel, page and frequency. """
+        tlvs = CHANNEL_TLVS.get(channel)
+        if tlvs is None:
+            tlvs = TAP_CHANNEL.pack(CHANNEL_TYPE, CHANNEL_LEN, channel,
+                                    channel_page(channel))
+            frequency = channel_frequency(channel)
+            if frequency is not None:
+                tlvs += TAP_FREQUENCY.pack(FREQUENCY_TYPE, FREQUENCY_LEN,
+                                           frequency)
+            CHANNEL_TLVS[channel] = tlvs
+        return tlvs
 
     @classmethod
     def encode_frame(cls,
@@ -84,7 +135,7 @@ class PcapCodec(object):
                      metadata=None):
         """ Returns a pcap encapsulation of the given frame. """
         # write frame pcap header
-        TLVs_length = TLVS_LENGTH_DEFAULT
+        TLVs_length = TAP_HEADER.size
 
         frame = bytearray(frame)
 
@@ -101,27 +152,257 @@ class PcapCodec(object):
                 frame[-2] = metadata[0] & 0xFF
                 frame[-1] = metadata[3][1] & 0xFF
 
-        if cls._dlt == DLT_IEEE802_15_4_TAP:
-            length = len(frame) + TLVs_length
-        else:
+        if cls._dlt != DLT_IEEE802_15_4_TAP:
             length = len(frame)
+            return PCAP_RECORD_HEADER.pack(sec, usec, length, length) + frame
 
-        pcap_frame = struct.pack("<LLLL", sec, usec, length, length)
+        channel_tlvs = cls.channel_tlvs(metadata[3][0])
+        TLVs_length += len(channel_tlvs)
+        length = len(frame) + TLVs_length
+        pcap_frame = bytearray(
+            PCAP_RECORD_HEADER.pack(sec, usec, length, length))
+        # Append TLVs according to 802.15.4 TAP specification:
+        # https://github.com/jkcko/ieee802.15.4-tap
+        pcap_frame += TAP_HEADER.pack(0, TLVs_length)
+        pcap_frame += channel_tlvs
+        if options_rssi:
+            pcap_frame += TAP_RSSI_LQI.pack(RSS_TYPE, RSS_LEN, metadata[0],
+                                            LQI_TYPE, LQI_LEN, metadata[3][1])
+        if options_crc:
+            pcap_frame += TAP_FCS.pack(FCS_TYPE, FCS_LEN, FCS_16bitCRC)
 
-        if cls._dlt == DLT_IEEE802_15_4_TAP:
-            # Append TLVs according to 802.15.4 TAP specification:
-            # https://github.com/jkcko/ieee802.15.4-tap
-            pcap_frame += struct.pack('<HH', 0, TLVs_length)
-            pcap_frame += struct.pack('<HHHH', CHANNEL_TYPE, CHANNEL_LEN,
-                                      metadata[3][0], CHANNEL_PAGE)
+        pcap_frame += frame
+        return bytes(pcap_frame)
+
+    @classmethod
+    def raw_size(cls, raw, options_rssi):
+        """ Returns the size of the pcap record pack_raw() packs. """
+        if cls._dlt != DLT_IEEE802_15_4_TAP:
+            return PCAP_RECORD_HEADER.size + len(raw.frame)
+        size = TAP_RECORD.size + len(cls.channel_tlvs(raw.channel))
+        if options_rssi:
+            size += TAP_RSSI_LQI.size
+        return size + len(raw.frame)
+
+    @classmethod
+    def pack_raw(cls, buffer, offset, raw, sec, usec, options_rssi):
+        """
+        Packs the pcap encapsulation of a RawFrame with metadata into buffer
+        at offset, as encode_frame() without options_crc would return it.
+        """
+        frame = raw.frame
+        length = len(frame)
+        if cls._dlt != DLT_IEEE802_15_4_TAP:
+            PCAP_RECORD_HEADER.pack_into(buffer, offset, sec, usec, length,
+                                         length)
+            offset += PCAP_RECORD_HEADER.size
+            buffer[offset:offset + length] = frame
             if options_rssi:
-                pcap_frame += struct.pack('<HHf', RSS_TYPE, RSS_LEN,
-                                          metadata[0])
-                pcap_frame += struct.pack('<HHI', LQI_TYPE, LQI_LEN,
-                                          metadata[3][1])
-            if options_crc:
-                pcap_frame += struct.pack('<HHI', FCS_TYPE, FCS_LEN,
-                                          FCS_16bitCRC)
+                # TI style FCS format, as in encode_frame().
+                buffer[offset + length - 2] = raw.rssi & 0xFF
+                buffer[offset + length - 1] = raw.lqi
+            return
 
-        pcap_frame += frame
-        return pcap_frame
+        channel_tlvs = cls.channel_tlvs(raw.channel)
+        tlvs_length = TAP_HEADER.size + len(channel_tlvs)
+        if options_rssi:
+            tlvs_length += TAP_RSSI_LQI.size
+        TAP_RECORD.pack_into(buffer, offset, sec, usec, length + tlvs_length,
+                             length + tlvs_length, 0, tlvs_length)
+        offset += TAP_RECORD.size
+        buffer[offset:offset + len(channel_tlvs)] = channel_tlvs
+        offset += len(channel_tlvs)
+        if options_rssi:
+            TAP_RSSI_LQI.pack_into(buffer, offset, RSS_TYPE, RSS_LEN, raw.rssi,
+                                   LQI_TYPE, LQI_LEN, raw.lqi)
+            offset += TAP_RSSI_LQI.size
+        buffer[offset:offset + length] = frame
+
+
+class PcapWriter(object):
+    """
+    Buffered writer of pcap records.
+
+    Records are kept in a list and written with a single os.writev() once
+    flush_frames of them are pending, flush_interval seconds after the
+    oldest pending one, or when buffer_size bytes are pending, whichever
+    comes first. flush_frames=1 writes every record immediately, while a
+    short flush_interval such as PCAP_LIVE_FLUSH_INTERVAL keeps live
+    captures read by Wireshark current with fewer writes.
+
+    Records given to write_packed() are packed in place into a buffer of
+    buffer_size bytes allocated once, and written from it.
+
+    Flushes due to flush_interval are written from a thread of the writer,
+    started with the first of them.
+    """
+
+    def __init__(self,
+                 output,
+                 flush_frames=PCAP_FLUSH_FRAMES,
+                 flush_interval=PCAP_FLUSH_INTERVAL,
+                 buffer_size=PCAP_BUFFER_SIZE):
+        self.output = output
+        self.flush_frames = flush_frames
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+
+        self.frames = 0
+        self.bytes = 0
+        self.flushes = 0
+
+        self._lock = threading.Lock()
+        self._flush_cond = threading.Condition(self._lock)
+        self._pending = []
+        self._pending_bytes = 0
+        self._pending_frames = 0
+        self._flush_due = None  # When the pending records are due.
+        self._flusher = None
+        self._closed = False
+
+        self._arena = None
+        self._arena_start = 0  # Start of the packed records not queued yet.
+        self._arena_end = 0
+
+        # Write to the file descriptor directly when possible, after what
+        # was already written through output.
+        self._fileno = None
+        if hasattr(os, 'writev'):
+            try:
+                self._fileno = output.fileno()
+                output.flush()
+            except (AttributeError, OSError, ValueError):
+                self._fileno = None
+
+    def write(self, record):
+        """ Queue a pcap record, or the file header, for writing. """
+        if not record:
+            return
+        with self._lock:
+            if self.flush_frames == 1 and not self._pending_bytes:
+                self._write_now(record)
+                return
+            self._arena_queue()
+            self._pending.append(record)
+            self._pending_bytes += len(record)
+            self._queued()
+
+    def write_packed(self, size, pack, *args):
+        """
+        Queue a pcap record of size bytes, packed by calling
+        pack(buffer, offset, *args), without allocating it.
+        """
+        with self._lock:
+            if self._arena is None:
+                self._arena = bytearray(self.buffer_size)
+            if (self.flush_frames == 1 and not self._pending_bytes and
+                    size <= len(self._arena)):
+                pack(self._arena, 0, *args)
+                self._write_now(memoryview(self._arena)[:size])
+                return
+            if self._arena_end + size > len(self._arena):
+                self._flush()
+                if size > len(self._arena):
+                    record = bytearray(size)
+                    pack(record, 0, *args)
+                    self._pending.append(record)
+                    self._pending_bytes += size
+                    self._queued()
+                    return
+            pack(self._arena, self._arena_end, *args)
+            self._arena_end += size
+            self._pending_bytes += size
+            self._queued()
+
+    def _queued(self):
+        self.frames += 1
+        self._pending_frames += 1
+        if (self._pending_frames >= self.flush_frames or
+                self._pending_bytes >= self.buffer_size):
+            self._flush()
+        elif self._flush_due is None and self.flush_interval:
+            self._flush_due = time.monotonic() + self.flush_interval
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_run,
+                                                 name="PcapWriter")
+                self._flusher.daemon = True
+                self._flusher.start()
+            self._flush_cond.notify()
+
+    def _flush_run(self):
+        """ Flushing thread, writes out records once flush_interval passed. """
+        with self._flush_cond:
+            while not self._closed:
+                if self._flush_due is None:
+                    self._flush_cond.wait()
+                    continue
+                delay = self._flush_due - time.monotonic()
+                if delay > 0:
+                    self._flush_cond.wait(delay)
+                    continue
+                self._flush()
+
+    def _arena_queue(self):
+        """ Queue the records packed since the last call as one buffer. """
+        if self._arena_end > self._arena_start:
+            self._pending.append(
+                memoryview(self._arena)[self._arena_start:self._arena_end])
+            self._arena_start = self._arena_end
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._closed = True
+            self._flush_cond.notify()
+        self.output.close()
+
+    def _write_now(self, record):
+        """ Write a record when nothing is pending, without queuing it. """
+        size = len(record)
+        if self._fileno is None:
+            self.output.write(record)
+            self.output.flush()
+        else:
+            written = os.write(self._fileno, record)
+            while written < len(record):
+                record = memoryview(record)[written:]
+                written = os.write(self._fileno, record)
+        self.frames += 1
+        self.bytes += size
+        self.flushes += 1
+
+    def _flush(self):
+        self._flush_due = None
+        self._arena_queue()
+        if not self._pending:
+            return
+
+        if self._fileno is None:
+            self.output.write(b''.join(self._pending))
+            self.output.flush()
+        else:
+            self._writev(self._pending)
+
+        self.bytes += self._pending_bytes
+        self.flushes += 1
+        self._pending = []
+        self._pending_bytes = 0
+        self._pending_frames = 0
+        self._arena_start = self._arena_end = 0
+
+    def _writev(self, buffers):
+        """ Write all buffers, IOV_MAX at a time, resuming short writes. """
+        index = 0
+        while index < len(buffers):
+            written = os.writev(self._fileno, buffers[index:index + IOV_MAX])
+            while written:
+                size = len(buffers[index])
+                if written < size:
+                    buffers[index] = memoryview(buffers[index])[written:]
+                    break
+                written -= size
+                index += 1
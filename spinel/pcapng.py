@@ -0,0 +1,204 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module to provide codec utilities for .pcapng formatters.
+"""
+
+import struct
+
+from spinel.pcap import crc
+from spinel.pcap import DLT_IEEE802_15_4_TAP
+from spinel.pcap import FCS_16bitCRC
+from spinel.pcap import FCS_LEN
+from spinel.pcap import FCS_TYPE
+from spinel.pcap import LQI_LEN
+from spinel.pcap import LQI_TYPE
+from spinel.pcap import PCAP_SNAPLEN
+from spinel.pcap import PcapCodec
+from spinel.pcap import RSS_LEN
+from spinel.pcap import RSS_TYPE
+from spinel.pcap import TAP_FCS
+from spinel.pcap import TAP_HEADER
+from spinel.pcap import TAP_RSSI_LQI
+from spinel.phy import channel_frequency
+from spinel.phy import channel_page
+
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+PCAPNG_VERSION_MAJOR = 1
+PCAPNG_VERSION_MINOR = 0
+PCAPNG_SNAPLEN = PCAP_SNAPLEN
+
+BLOCK_TYPE_SHB = 0x0A0D0D0A
+BLOCK_TYPE_IDB = 0x00000001
+BLOCK_TYPE_EPB = 0x00000006
+
+OPT_ENDOFOPT = 0
+SHB_USERAPPL = 4
+IF_NAME = 2
+IF_DESCRIPTION = 3
+IF_TSRESOL = 9
+
+IF_TSRESOL_NSEC = 9
+
+# Received frames are inbound, with a 2 byte FCS, and flagged with a CRC
+# error when the NCP reports an FCS receive error.
+EPB_FLAGS = 2
+EPB_FLAGS_INBOUND = 1
+EPB_FLAGS_FCS_2 = 2 << 5
+EPB_FLAGS_CRC_ERROR = 1 << 24
+OT_ERROR_FCS = 17
+
+PCAPNG_APPLICATION = "OpenThread sniffer"
+
+BLOCK_HEADER = struct.Struct("<LL")
+BLOCK_TRAILER = struct.Struct("<L")
+OPTION_HEADER = struct.Struct("<HH")
+SHB_BODY = struct.Struct("<LHHq")
+IDB_BODY = struct.Struct("<HHL")
+EPB_HEADER = struct.Struct("<LLLLLLL")
+
+# EPB tail: epb_flags, end of options and trailer.
+EPB_TAIL = struct.Struct("<HHLHHL")
+
+# FCS TLV of the TAP header, the frames captured end with their FCS.
+TAP_FCS_TLV = TAP_FCS.pack(FCS_TYPE, FCS_LEN, FCS_16bitCRC)
+
+END_OF_OPTIONS = OPTION_HEADER.pack(OPT_ENDOFOPT, 0)
+PADDING = (b'', b'\0\0\0', b'\0\0', b'\0')  # Indexed by length % 4.
+
+
+class PcapngCodec(object):
+    """ Utility class for .pcapng formatters, tracking one section. """
+
+    def __init__(self,
+                 dlt=DLT_IEEE802_15_4_TAP,
+                 device=None,
+                 channel=None,
+                 snaplen=PCAPNG_SNAPLEN):
+        """
+        device:  name of the capture device, prefixed to interface names.
+        channel: channel of frames received without metadata.
+        """
+        self.dlt = dlt
+        self.device = device
+        self.channel = channel
+        self.snaplen = snaplen
+        self.interfaces = {}  # Map (device, channel) to interface id.
+
+    @classmethod
+    def encode_options(cls, options):
+        """ Encode a list of (code, bytes) options and the end marker. """
+        result = b''
+        for (code, value) in options:
+            result += OPTION_HEADER.pack(code, len(value))
+            result += value + PADDING[len(value) % 4]
+        return result + END_OF_OPTIONS
+
+    @classmethod
+    def encode_block(cls, block_type, body):
+        """ Wrap a 32-bit aligned block body in its type and lengths. """
+        length = len(body) + 12
+        return (BLOCK_HEADER.pack(block_type, length) + body +
+                BLOCK_TRAILER.pack(length))
+
+    def encode_header(self):
+        """ Returns a pcapng Section Header Block. """
+        # Section length is not known up front while streaming.
+        body = SHB_BODY.pack(PCAPNG_BYTE_ORDER_MAGIC, PCAPNG_VERSION_MAJOR,
+                             PCAPNG_VERSION_MINOR, -1)
+        body += self.encode_options([(SHB_USERAPPL,
+                                      PCAPNG_APPLICATION.encode())])
+        self.interfaces = {}
+        return self.encode_block(BLOCK_TYPE_SHB, body)
+
+    def encode_interface(self, channel, device=None):
+        """ Returns the Interface Description Block of a channel. """
+        name = "ch%s" % channel
+        device = device or self.device
+        if device:
+            name = "%s:%s" % (device, name)
+        description = "IEEE 802.15.4 channel %s" % channel
+        if channel is not None:
+            description += ", page %d" % channel_page(channel)
+            frequency = channel_frequency(channel)
+            if frequency is not None:
+                description += ", %g MHz" % (frequency / 1000.0)
+        body = IDB_BODY.pack(self.dlt, 0, self.snaplen)
+        body += self.encode_options([
+            (IF_NAME, name.encode()),
+            (IF_DESCRIPTION, description.encode()),
+            (IF_TSRESOL, bytes([IF_TSRESOL_NSEC])),
+        ])
+        return self.encode_block(BLOCK_TYPE_IDB, body)
+
+    def encode_frame(self,
+                     frame,
+                     sec,
+                     usec,
+                     _options_rssi,
+                     options_crc,
+                     metadata=None,
+                     device=None):
+        """
+        Returns a pcapng Enhanced Packet Block of the given frame, preceded
+        by an Interface Description Block for the first frame of a channel.
+        Takes the same arguments as PcapCodec.encode_frame(), and the
+        device that captured the frame when there are several.
+
+        With the TAP link type, the channel, RSSI and LQI of the frame are
+        TAP TLVs, and an FCS receive error is flagged in epb_flags.
+        """
+        if options_crc:
+            frame = crc(bytearray(frame))
+
+        flags = EPB_FLAGS_INBOUND | EPB_FLAGS_FCS_2
+        if metadata is None:
+            channel = self.channel
+        else:
+            channel = metadata[3][0]
+            if metadata[4][0][0] == OT_ERROR_FCS:
+                flags |= EPB_FLAGS_CRC_ERROR
+
+        if self.dlt == DLT_IEEE802_15_4_TAP:
+            tlvs = b'' if channel is None else PcapCodec.channel_tlvs(channel)
+            size = TAP_HEADER.size + len(tlvs) + TAP_FCS.size
+            if metadata is None:
+                tlvs = TAP_HEADER.pack(0, size) + tlvs + TAP_FCS_TLV
+            else:
+                size += TAP_RSSI_LQI.size
+                tlvs = (TAP_HEADER.pack(0, size) + tlvs +
+                        TAP_RSSI_LQI.pack(RSS_TYPE, RSS_LEN, metadata[0],
+                                          LQI_TYPE, LQI_LEN, metadata[3][1]) +
+                        TAP_FCS_TLV)
+            frame = tlvs + frame
+
+        length = len(frame)
+        padding = PADDING[length % 4]
+        total = EPB_HEADER.size + length + len(padding) + EPB_TAIL.size
+        tail = EPB_TAIL.pack(EPB_FLAGS, 4, flags, OPT_ENDOFOPT, 0, total)
+
+        idb = b''
+        interface = self.interfaces.get((device, channel))
+        if interface is None:
+            interface = len(self.interfaces)
+            self.interfaces[(device, channel)] = interface
+            idb = self.encode_interface(channel, device)
+
+        timestamp = (int(sec) * 1000000 + int(usec)) * 1000
+        return idb + EPB_HEADER.pack(
+            BLOCK_TYPE_EPB, total, interface, timestamp >> 32,
+            timestamp & 0xFFFFFFFF, length, length) + frame + padding + tail
@@ -0,0 +1,56 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing the IEEE 802.15.4 channel plan of captured frames.
+"""
+
+CHANNEL_MIN = 0
+CHANNEL_MAX = 26
+
+CHANNEL_PAGE_2P4GHZ = 0
+CHANNEL_PAGE_SUBGHZ = 2
+
+# Largest PSDU of the 2.4 GHz PHY (aMaxPhyPacketSize), and of any PHY: the
+# 802.15.4g SUN PHYs of sub-GHz radios carry up to 2047 bytes.
+MAX_PSDU_SIZE_2P4GHZ = 127
+MAX_PSDU_SIZE = 2047
+
+
+def channel_page(channel):
+    """ Return the channel page of an OpenThread channel number. """
+    if channel <= 10:
+        return CHANNEL_PAGE_SUBGHZ
+    return CHANNEL_PAGE_2P4GHZ
+
+
+def channel_frequency(channel):
+    """ Return the center frequency of a channel in kHz, None if unknown. """
+    if channel == 0:
+        return 868300
+    if 1 <= channel <= 10:
+        return 906000 + 2000 * (channel - 1)
+    if 11 <= channel <= CHANNEL_MAX:
+        return 2405000 + 5000 * (channel - 11)
+    return None
+
+
+def channel_str(channel):
+    """ Return a channel number with its center frequency, for display. """
+    frequency = channel_frequency(channel)
+    if frequency is None:
+        return str(channel)
+    return "%d (%g MHz)" % (channel, frequency / 1000.0)
@@ -0,0 +1,123 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Module providing per-WpanApi tracking of on-mesh SLAAC prefixes. """
+
+import ipaddress
+import threading
+import traceback
+
+from struct import unpack
+
+import spinel.config as CONFIG
+from spinel.const import kThread
+
+# Seconds to coalesce THREAD_ON_MESH_NETS updates over.
+PREFIX_DEBOUNCE = 0.1
+
+
+class PrefixTracker(object):
+    """
+    Debounced tracker of the SLAAC prefixes in THREAD_ON_MESH_NETS.
+
+    Updates are coalesced: only the latest payload received during a
+    debounce window is parsed, on the timer thread, and callbacks only run
+    when the set of SLAAC prefixes actually changed.
+    """
+
+    def __init__(self, timer_service, debounce=PREFIX_DEBOUNCE):
+        self.timer = timer_service
+        self.debounce = debounce
+        self.callbacks = []
+        self.updates = 0  # Payloads received.
+        self.processed = 0  # Payloads parsed after coalescing.
+
+        self._lock = threading.Lock()
+        self._payload = None
+        self._pending = None
+        self._prefixes = frozenset()  # Set of (network int, prefixlen).
+
+    def callback_register(self, cb):
+        """
+        Call cb(added, removed) with lists of ipaddress.IPv6Network when
+        the SLAAC prefix set changes. Runs on the timer thread, so cb
+        must not block.
+        """
+        self.callbacks.append(cb)
+
+    def update(self, payload):
+        """ Record the latest THREAD_ON_MESH_NETS payload. """
+        with self._lock:
+            self.updates += 1
+            self._payload = payload
+            if self._pending is None:
+                self._pending = self.timer.schedule(self.debounce,
+                                                    self.process)
+
+    @classmethod
+    def parse(cls, payload):
+        """ Return the set of (network int, prefixlen) of SLAAC prefixes. """
+        prefixes = set()
+        pay = payload
+        while len(pay) >= 22:
+            struct_len = unpack('<H', pay[:2])[0]
+            pay = pay[2:]
+            flags = pay[18]
+            if flags & kThread.PrefixSlaacFlag:
+                prefixlen = pay[16]
+                host_bits = 128 - min(prefixlen, 128)
+                network = int.from_bytes(pay[:16], 'big')
+                network = network >> host_bits << host_bits
+                prefixes.add((network, prefixlen))
+            pay = pay[struct_len:]
+        return frozenset(prefixes)
+
+    @classmethod
+    def to_network(cls, prefix):
+        return ipaddress.IPv6Network(prefix)
+
+    def process(self):
+        """ Parse the latest payload and report changed prefixes. """
+        with self._lock:
+            payload = self._payload
+            self._payload = None
+            self._pending = None
+        if payload is None:
+            return
+
+        self.processed += 1
+        prefixes = self.parse(payload)
+        added = [self.to_network(p) for p in prefixes - self._prefixes]
+        removed = [self.to_network(p) for p in self._prefixes - prefixes]
+        self._prefixes = prefixes
+        if not added and not removed:
+            return
+
+        if CONFIG.DEBUG_LOG_PROP:
+            print("\n========= PREFIX ============")
+            print("slaac prefixes added: " + str(added))
+            print("slaac prefixes removed: " + str(removed))
+            print("==============================\n")
+
+        for cb in self.callbacks:
+            try:
+                cb(added, removed)
+            except Exception:
+                CONFIG.LOGGER.error(traceback.format_exc())
+
+    def prefixes(self):
+        """ Return the current SLAAC prefixes as ipaddress.IPv6Network. """
+        return set(self.to_network(p) for p in self._prefixes)
@@ -0,0 +1,92 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing a fast decoder of PROP_STREAM_RAW values.
+"""
+
+import struct
+
+RAW_LENGTH = struct.Struct("<H")
+
+# Metadata layouts are told apart by their size: 17 bytes (deprecated) with
+# a msec and usec timestamp, 19 bytes with a usec timestamp, and 26 bytes
+# followed by the ACK key ID and frame counter.
+# The 16-bit lengths of the t() structs are skipped with pad bytes, and the
+# receive error fits in one byte of its packed integer.
+RAW_METADATA_17 = struct.Struct("<bbH2xBBLH2xB")
+RAW_METADATA_19 = struct.Struct("<bbH2xBBQ2xB")
+RAW_METADATA_26 = struct.Struct("<bbH2xBBQ2xB2xBL")
+
+
+class RawFrame(object):
+    """ A frame received on PROP_STREAM_RAW, with its metadata if any. """
+
+    __slots__ = ('frame', 'metadata_size', 'rssi', 'noise', 'flags',
+                 'channel', 'lqi', 'timestamp', 'rx_error', 'ack_key_id',
+                 'ack_counter', 'sec', 'usec')
+
+    def __init__(self, frame, metadata_size=0):
+        self.frame = frame
+        self.metadata_size = metadata_size
+        self.timestamp = None  # NCP timestamp in usec.
+        # Capture time, as written to captures, see SnifferSession.decode().
+        self.sec = None
+        self.usec = None
+
+    @classmethod
+    def decode(cls, value):
+        """ Return the RawFrame of a PROP_STREAM_RAW value. """
+        length = RAW_LENGTH.unpack_from(value)[0]
+        end = 2 + length
+        raw = cls(value[2:end], len(value) - end)
+
+        if raw.metadata_size == 19:
+            (raw.rssi, raw.noise, raw.flags, raw.channel, raw.lqi,
+             raw.timestamp, raw.rx_error) = RAW_METADATA_19.unpack_from(
+                 value, end)
+        elif raw.metadata_size == 26:
+            (raw.rssi, raw.noise, raw.flags, raw.channel, raw.lqi,
+             raw.timestamp, raw.rx_error, raw.ack_key_id,
+             raw.ack_counter) = RAW_METADATA_26.unpack_from(value, end)
+        elif raw.metadata_size == 17:
+            (raw.rssi, raw.noise, raw.flags, raw.channel, raw.lqi, msec, usec,
+             raw.rx_error) = RAW_METADATA_17.unpack_from(value, end)
+            raw.timestamp = msec * 1000 + usec
+        else:
+            raw.metadata_size = 0
+        return raw
+
+    @property
+    def metadata(self):
+        """
+        The metadata as parsed by WpanApi.parse_fields() from its spinel
+        format, or None if the frame has none.
+        """
+        if self.metadata_size == 19:
+            return (self.rssi, self.noise, self.flags,
+                    (self.channel, self.lqi, self.timestamp),
+                    ((self.rx_error, 1),))
+        if self.metadata_size == 26:
+            return (self.rssi, self.noise, self.flags,
+                    (self.channel, self.lqi, self.timestamp),
+                    ((self.rx_error, 1),), (self.ack_key_id,
+                                            self.ack_counter))
+        if self.metadata_size == 17:
+            return (self.rssi, self.noise, self.flags,
+                    (self.channel, self.lqi, self.timestamp // 1000,
+                     self.timestamp % 1000), ((self.rx_error, 1),))
+        return None
@@ -0,0 +1,148 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing a ring buffer of capture files.
+"""
+
+import os
+import threading
+import time
+
+from spinel.pcap import PcapWriter
+
+# Extensions kept after the label, as in capture_<start>_ch11.pcap.gz.
+COMPRESSED_EXTENSIONS = ('.gz', '.xz')
+
+
+class CaptureRotator(object):
+    """
+    Writer of pcap records to a series of files named after the given
+    path, their UTC start time and a label, such as the channel: with a
+    path of capture.pcap, capture_20180101T120000.000Z_ch11.pcap.
+    """
+
+    def __init__(self,
+                 path,
+                 label,
+                 header,
+                 max_bytes=None,
+                 max_seconds=None,
+                 keep=None,
+                 opener=None,
+                 **writer_options):
+        """
+        header:         callable returning the file header to start each file
+                        with. Called before the first record of the file is
+                        encoded, so codecs may reset per-file state.
+        keep:           number of files to keep, None to keep all of them.
+        opener:         callable returning the output to write a new file
+                        at a path to, defaults to opening it in binary mode.
+        writer_options: passed on to the PcapWriter of each file.
+        """
+        (self.base, self.ext) = os.path.splitext(path)
+        if self.ext in COMPRESSED_EXTENSIONS:
+            (self.base, ext) = os.path.splitext(self.base)
+            self.ext = ext + self.ext
+        self.label = label
+        self.header = header
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.keep = keep
+        self.opener = opener or (lambda path: open(path, 'wb'))
+        self.writer_options = writer_options
+
+        self.files = []  # Paths of the files kept, oldest first.
+        self.rotations = 0
+        self._retiring = []  # Threads closing previous files.
+        self._name = None
+        self._suffix = 0
+        self._open()
+
+    def _open(self):
+        now = time.time()
+        start = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now))
+        name = "%s_%s.%03dZ_%s" % (self.base, start, int(now * 1000) % 1000,
+                                   self.label)
+        if name == self._name:
+            # Rotated again within the same millisecond.
+            self._suffix += 1
+            path = "%s-%d%s" % (name, self._suffix, self.ext)
+        else:
+            (self._name, self._suffix) = (name, 0)
+            path = name + self.ext
+        header = self.header()
+        self.writer = PcapWriter(self.opener(path), **self.writer_options)
+        self.writer.write(header)
+        self.files.append(path)
+        self.bytes = len(header)
+        self.start = time.monotonic()
+
+    def write(self, record):
+        """ Write a record, then rotate if the file is full or old enough. """
+        self.writer.write(record)
+        self._written(len(record))
+
+    def write_packed(self, size, pack, *args):
+        """ As write(), for a record packed by PcapWriter.write_packed(). """
+        self.writer.write_packed(size, pack, *args)
+        self._written(size)
+
+    def _written(self, size):
+        self.bytes += size
+        if ((self.max_bytes and self.bytes >= self.max_bytes) or
+            (self.max_seconds and
+             time.monotonic() - self.start >= self.max_seconds)):
+            self.rotate()
+
+    def rotate(self):
+        """ Continue in a new file, and close the previous one aside. """
+        writer = self.writer
+        self._open()
+        self.rotations += 1
+
+        expired = []
+        if self.keep:
+            while len(self.files) > self.keep:
+                expired.append(self.files.pop(0))
+
+        self._retiring = [
+            thread for thread in self._retiring if thread.is_alive()
+        ]
+        thread = threading.Thread(target=self._retire,
+                                  args=(writer, expired),
+                                  name="CaptureRotator")
+        thread.daemon = True
+        thread.start()
+        self._retiring.append(thread)
+
+    @classmethod
+    def _retire(cls, writer, expired):
+        writer.close()
+        for path in expired:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+        for thread in self._retiring:
+            thread.join()
+        self._retiring = []
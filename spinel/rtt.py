@@ -0,0 +1,97 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing a per-device retransmission timeout estimator.
+"""
+
+import threading
+
+RTT_ALPHA = 1.0 / 8
+RTT_BETA = 1.0 / 4
+RTO_K = 4
+
+RTO_MIN = 0.5  # Seconds.
+RTO_GRANULARITY = 0.001  # Seconds.
+RTO_BACKOFF_MAX = 6
+
+# Retransmissions of GET / SET requests, see WpanApi(retries).
+RETRIES_DEFAULT = 1
+
+
+class RttEstimator(object):
+    """ Smoothed RTT and RTO of the requests sent to one device. """
+
+    def __init__(self, initial, minimum=RTO_MIN, maximum=None):
+        """
+        initial: RTO in seconds until the first sample is taken.
+        maximum: upper bound of the RTO, defaults to initial.
+        """
+        self.initial = initial
+        self.minimum = min(minimum, initial)
+        self.maximum = initial if maximum is None else maximum
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.srtt = None
+            self.rttvar = None
+            self.backoff = 0
+            self.samples = 0
+            self.timeouts = 0
+
+    def rto(self):
+        """ Return the current retransmission timeout in seconds. """
+        with self._lock:
+            if self.srtt is None:
+                rto = self.initial
+            else:
+                rto = self.srtt + max(RTO_GRANULARITY, RTO_K * self.rttvar)
+            # Backed off from the floor, as RFC 6298 does.
+            rto = max(rto, self.minimum) * (1 << self.backoff)
+            return min(rto, self.maximum)
+
+    def sample(self, rtt):
+        """ Update the estimate with the RTT of a first transmission. """
+        with self._lock:
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2
+            else:
+                self.rttvar += RTT_BETA * (abs(self.srtt - rtt) - self.rttvar)
+                self.srtt += RTT_ALPHA * (rtt - self.srtt)
+            self.backoff = 0
+            self.samples += 1
+
+    def timed_out(self):
+        """ Back off after a request got no response within the RTO. """
+        with self._lock:
+            self.backoff = min(self.backoff + 1, RTO_BACKOFF_MAX)
+            self.timeouts += 1
+
+    def stats(self):
+        """ Return a snapshot of the estimator state, in microseconds. """
+        rto = self.rto()
+        with self._lock:
+            return {
+                'srtt': None if self.srtt is None else int(self.srtt * 1e6),
+                'rttvar':
+                    None if self.rttvar is None else int(self.rttvar * 1e6),
+                'rto': int(rto * 1e6),
+                'samples': self.samples,
+                'timeouts': self.timeouts,
+            }
@@ -0,0 +1,362 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing sniffer NCP capture sessions.
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+import spinel.util as util
+from spinel.const import SPINEL
+from spinel.codec import WpanApi
+from spinel.hub import WpanHub
+from spinel.clock import ClockCorrelator
+from spinel.pcap import PcapCodec
+from spinel.rawframe import RawFrame
+from spinel.boundedqueue import QUEUE_POLICY_NAMES
+
+if sys.platform == 'win32':
+    import ctypes
+    import msvcrt
+
+DEFAULT_CHANNEL = 11
+DEFAULT_QUEUE_DEPTH = 10000
+DEFAULT_QUEUE_POLICY = 'drop-oldest'
+
+# Seconds to wait for the NCP to report a reset.
+RESET_TIMEOUT = 1
+
+# Sniffer configuration restored when the NCP resets during a capture.
+SNIFFER_JOURNAL_PROPS = (
+    SPINEL.PROP_PHY_ENABLED,
+    SPINEL.PROP_MAC_FILTER_MODE,
+    SPINEL.PROP_PHY_CHAN,
+    SPINEL.PROP_MAC_RAW_STREAM_ENABLED,
+)
+
+EPOCH = datetime(1970, 1, 1)
+
+# Bytes sent over the UART with a PROP_STREAM_RAW value: HDLC flags and FCS,
+# spinel header, command and property.
+UART_FRAME_OVERHEAD = 7
+
+FIFO_CHECK_INTERVAL = 0.1
+
+
+class CaptureLimit(object):
+    """ Frame count and duration limits of a capture, None for none. """
+
+    def __init__(self, frames=None, seconds=None):
+        self.frames = frames
+        self.deadline = None
+        if seconds:
+            self.deadline = time.monotonic() + seconds
+        self.count = 0
+
+    def remaining(self, timeout=None):
+        """ Return timeout, shortened to the time left before stopping. """
+        if self.deadline is None:
+            return timeout
+        remaining = max(self.deadline - time.monotonic(), 0)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def done(self):
+        if self.frames and self.count >= self.frames:
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+def clocks_create(count=1):
+    """
+    Return count ClockCorrelators sharing one epoch, so that the captures
+    of several NCPs agree.
+    """
+    epoch = (time.time() - time.monotonic()) * 1000000
+    return [ClockCorrelator(epoch) for _ in range(count)]
+
+
+class SnifferSession(object):
+    """ Capture of the frames received by one NCP in monitor mode. """
+
+    def __init__(self,
+                 stream,
+                 channel=DEFAULT_CHANNEL,
+                 nodeid=None,
+                 reset=True,
+                 capture_filter=None,
+                 clock=None,
+                 host_timestamp=False,
+                 baudrate=None,
+                 queue_depth=DEFAULT_QUEUE_DEPTH,
+                 queue_policy=DEFAULT_QUEUE_POLICY,
+                 hub=None):
+        """
+        stream:         stream to the NCP, closed with the session.
+        reset:          whether start() resets the NCP first.
+        capture_filter: CaptureFilter the frames yielded must match.
+        clock:          ClockCorrelator mapping the NCP timestamps to the
+                        host clock, see clocks_create().
+        host_timestamp: stamp frames with the host time instead.
+        baudrate:       of the UART to the NCP, to account for the time
+                        frames take to reach the host. None if not a UART.
+        queue_depth:    raw frames held in memory when the reader stalls,
+                        beyond which queue_policy applies.
+        hub:            WpanHub reading the stream, defaults to one of the
+                        session.
+        """
+        self.channel = channel
+        self.reset = reset
+        self.capture_filter = capture_filter
+        self.clock = clock
+        self.host_timestamp = host_timestamp
+        self.baudrate = baudrate
+        self.queue_depth = queue_depth
+        self.queue_policy = queue_policy
+        # A hub reads what the stream has available at once, where a reader
+        # thread would read long sub-GHz frames a byte at a time.
+        self._hub = None
+        if hub is None:
+            hub = self._hub = WpanHub()
+        self.wpan_api = WpanApi(stream, nodeid, hub=hub)
+        if self._hub is not None and self.wpan_api.hub is None:
+            # The stream cannot be polled, WpanApi started a reader thread.
+            self._hub.close()
+            self._hub = None
+        self.captured = 0
+        self._closed = False
+
+        # Base of the timestamps in the deprecated metadata format.
+        timebase = datetime.utcnow() - EPOCH
+        self.timebase = (timebase.days * 24 * 60 * 60 + timebase.seconds,
+                         timebase.microseconds)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """ Send spinel commands to initialize the sniffer node. """
+        wpan_api = self.wpan_api
+        wpan_api.queue_register(SPINEL.HEADER_DEFAULT)
+        # Bound the raw frames held in memory when the output stalls.
+        wpan_api.queue_register(
+            SPINEL.HEADER_ASYNC,
+            policy=QUEUE_POLICY_NAMES[self.queue_policy],
+            prop_limits={SPINEL.PROP_STREAM_RAW: self.queue_depth})
+
+        if self.reset:
+            # Returns as soon as the NCP reports the reset on HEADER_ASYNC.
+            wpan_api.cmd_reset(RESET_TIMEOUT)
+
+        wpan_api.journal_enable(SNIFFER_JOURNAL_PROPS)
+
+        wpan_api.prop_set_value(SPINEL.PROP_PHY_ENABLED, 1)
+
+        result = wpan_api.prop_set_value(SPINEL.PROP_MAC_FILTER_MODE,
+                                         SPINEL.MAC_FILTER_MODE_MONITOR)
+        if result is None:
+            return False
+
+        if not self.set_channel(self.channel):
+            return False
+
+        result = wpan_api.prop_set_value(SPINEL.PROP_MAC_RAW_STREAM_ENABLED, 1)
+        if result is None:
+            return False
+
+        return True
+
+    def set_channel(self, channel):
+        """ Capture on another channel, restored if the NCP resets. """
+        result = self.wpan_api.prop_set_value(SPINEL.PROP_PHY_CHAN, channel)
+        if result is None:
+            return False
+        self.channel = channel
+        return True
+
+    def decode(self, value, rx_time=None):
+        """
+        Return the RawFrame of a PROP_STREAM_RAW value, with sec and usec
+        set to its capture time.
+
+        rx_time: time.monotonic() when the value was received.
+        """
+        raw = RawFrame.decode(value)
+        ncp_usec = raw.timestamp
+
+        if raw.metadata_size == 17:
+            # The deprecated metadata format counts from the NCP start.
+            (timebase_sec, timebase_usec) = self.timebase
+            timestamp_usec = timebase_usec + ncp_usec
+            timestamp_sec = timebase_sec + timestamp_usec // 1000000
+            timestamp_usec = timestamp_usec % 1000000
+        elif ncp_usec is not None:
+            timestamp_sec = ncp_usec // 1000000
+            timestamp_usec = ncp_usec % 1000000
+
+        # Some old version NCP doesn't contain timestamp information in metadata
+        else:
+            timestamp = datetime.utcnow() - EPOCH
+            timestamp_sec = timestamp.days * 24 * 60 * 60 + timestamp.seconds
+            timestamp_usec = timestamp.microseconds
+
+        if self.host_timestamp:
+            timestamp = round(time.time() * 1000000)
+            timestamp_sec = timestamp // 1000000
+            timestamp_usec = timestamp % 1000000
+        elif self.clock is not None:
+            if rx_time is None:
+                rx_time = time.monotonic()
+            rx_usec = rx_time * 1000000
+            if self.baudrate:
+                # Received once the whole frame went through the UART.
+                rx_usec -= ((len(value) + UART_FRAME_OVERHEAD) * 10000000 /
+                            self.baudrate)
+            if ncp_usec is None:
+                timestamp = self.clock.epoch + rx_usec
+            else:
+                self.clock.observe(ncp_usec, rx_usec)
+                timestamp = self.clock.to_wall(ncp_usec)
+            timestamp = round(timestamp)
+            timestamp_sec = timestamp // 1000000
+            timestamp_usec = timestamp % 1000000
+
+        raw.sec = int(timestamp_sec)
+        raw.usec = timestamp_usec
+        return raw
+
+    def frames(self, stop_frames=None, stop_seconds=None):
+        """
+        Yield the RawFrames captured that pass the capture filter, until
+        close() is called or either limit is reached.
+        """
+        tid = SPINEL.HEADER_ASYNC
+        prop_id = SPINEL.PROP_STREAM_RAW
+        limit = CaptureLimit(stop_frames, stop_seconds)
+        while not self._closed and not limit.done():
+            result = self.wpan_api.queue_wait_for_prop(
+                prop_id, tid, limit.remaining(self.wpan_api.timeout))
+            if not result or result.prop != prop_id:
+                continue
+            if (self.capture_filter and
+                    not self.capture_filter.match_stream_raw(result.value)):
+                continue
+            raw = self.decode(result.value, result.time)
+            limit.count += 1
+            self.captured += 1
+            yield raw
+
+    def stats(self):
+        """ Return the capture counters of the session. """
+        wpan_api = self.wpan_api
+        queue = wpan_api.queue_stats().get(SPINEL.HEADER_ASYNC, {})
+        metrics = wpan_api.metrics()
+        stats = {
+            'channel': self.channel,
+            'frames': self.captured,
+            'dropped': queue.get('dropped', 0),
+            'high_water': queue.get('high_water', 0),
+            'fcs_errors': wpan_api.hdlc.fcs_errors if wpan_api.use_hdlc else 0,
+            'resets': metrics['resets'],
+            'restore_failures': metrics['restore_failures'],
+            'downtime': metrics['downtime']['max'] or 0,
+        }
+        if self.capture_filter:
+            stats['filter'] = {
+                'passed': self.capture_filter.passed,
+                'dropped': self.capture_filter.dropped,
+            }
+        if self.clock is not None and self.clock.samples:
+            stats['clock'] = self.clock.stats()
+        return stats
+
+    def close(self):
+        """ Stop frames() and close the stream. """
+        if self._closed:
+            return
+        self._closed = True
+        self.wpan_api.__exit__(None, None, None)
+        self.wpan_api.stream.close()
+        if self._hub is not None:
+            self._hub.close()
+
+
+def frame_write(writer,
+                pcap,
+                raw,
+                rssi=False,
+                crc=False,
+                hexify=False,
+                device=None):
+    """
+    Encode a RawFrame returned by SnifferSession.frames() and write it out,
+    as a line of hex with hexify.
+    """
+    if rssi and not raw.metadata_size:
+        sys.stderr.write(
+            "WARNING: failed to display RSSI, please update the NCP version\n")
+
+    if device is not None:
+        pkt = pcap.encode_frame(raw.frame, raw.sec, raw.usec, rssi, crc,
+                                raw.metadata, device)
+    elif (raw.metadata_size and not crc and not hexify and
+          isinstance(pcap, PcapCodec)):
+        # Packed straight into the writer buffer.
+        writer.write_packed(pcap.raw_size(raw, rssi), pcap.pack_raw, raw,
+                            raw.sec, raw.usec, rssi)
+        return
+    else:
+        pkt = pcap.encode_frame(raw.frame, raw.sec, raw.usec, rssi, crc,
+                                raw.metadata)
+
+    if hexify:
+        pkt = (util.hexify_str(pkt) + "\n").encode()
+    writer.write(pkt)
+
+
+def check_fifo(fifo):
+    """ Exit the process once the reader of the fifo went away. """
+    if sys.platform == 'win32':
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        handle = msvcrt.get_osfhandle(fifo.fileno())
+        data = b''
+        p_data = ctypes.c_char_p(data)
+        written = ctypes.c_ulong(0)
+        while True:
+            time.sleep(FIFO_CHECK_INTERVAL)
+            if not kernel32.WriteFile(handle, p_data, 0, ctypes.byref(written),
+                                      None):
+                error = ctypes.get_last_error()
+                if error in (
+                        0xe8,  # ERROR_NO_DATA
+                        0xe9,  # ERROR_PIPE_NOT_CONNECTED
+                ):
+                    os._exit(0)
+                else:
+                    raise ctypes.WinError(error)
+    else:
+        while True:
+            time.sleep(FIFO_CHECK_INTERVAL)
+            try:
+                os.stat(fifo.name)
+            except OSError:
+                os._exit(0)
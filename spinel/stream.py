@@ -19,6 +19,7 @@ Module providing a generic stream interface.
 Also includes adapter implementations for serial, socket, and pipes.
 """
 
+import os
 import sys
 import binascii
 import time
@@ -30,6 +31,8 @@ import serial
 
 import spinel.config as CONFIG
 
+READ_CHUNK_SIZE = 4096
+
 
 class IStream(object):
     """ Abstract base class for a generic Stream Interface. """
@@ -46,6 +49,24 @@ class IStream(object):
         """ Close the stream cleanly as needed. """
         pass
 
+    def fileno(self):
+        """ Return a file descriptor to poll for input, or None. """
+        return None
+
+    def read_available(self, size=READ_CHUNK_SIZE):
+        """
+        Return up to size bytes without blocking once fileno() is readable.
+        Returns b'' at end of stream.
+
+        Reads a single byte, streams that can do better override this.
+        """
+        data = self.read(1)
+        if data is None:
+            return b''
+        if isinstance(data, int):
+            return bytes((data,))
+        return bytes(data)
+
 
 class StreamSerial(IStream):
     """ An IStream interface implementation for serial devices. """
@@ -73,6 +94,16 @@ class StreamSerial(IStream):
 
         return pkt[0]
 
+    def fileno(self):
+        return self.serial.fileno()
+
+    def read_available(self, size=READ_CHUNK_SIZE):
+        pkt = self.serial.read(min(max(self.serial.in_waiting, 1), size))
+        if CONFIG.DEBUG_STREAM_RX:
+            CONFIG.LOGGER.debug("RX Raw: " +
+                                binascii.hexlify(pkt).decode('utf-8'))
+        return pkt
+
     def close(self):
         self.serial.close()
 
@@ -99,6 +130,16 @@ class StreamSocket(IStream):
 
         return pkt[0]
 
+    def fileno(self):
+        return self.sock.fileno()
+
+    def read_available(self, size=READ_CHUNK_SIZE):
+        pkt = self.sock.recv(size)
+        if CONFIG.DEBUG_STREAM_RX:
+            CONFIG.LOGGER.debug("RX Raw: " +
+                                binascii.hexlify(pkt).decode('utf-8'))
+        return pkt
+
 
 class StreamPipe(IStream):
     """ An IStream interface implementation to stdin/out of a piped process. """
@@ -139,6 +180,17 @@ class StreamPipe(IStream):
 
         return pkt[0]
 
+    def fileno(self):
+        return self.pipe.stdout.fileno()
+
+    def read_available(self, size=READ_CHUNK_SIZE):
+        # Bypass the buffered reader, which would block to fill size bytes.
+        pkt = os.read(self.fileno(), size)
+        if CONFIG.DEBUG_STREAM_RX:
+            CONFIG.LOGGER.debug("RX Raw: " +
+                                binascii.hexlify(pkt).decode('utf-8'))
+        return pkt
+
     def close(self):
         if self.pipe:
             self.pipe.stdin.close()
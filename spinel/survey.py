@@ -0,0 +1,270 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing a channel survey for the sniffer.
+"""
+
+import threading
+import time
+import traceback
+
+import spinel.config as CONFIG
+from spinel.const import SPINEL
+from spinel.filter import DST_PAN
+from spinel.filter import SRC_PAN
+from spinel.filter import mhr_layout
+from spinel.metrics import LatencyHistogram
+
+# PHY_CHAN switches are sent on their own tid, so that their responses can
+# be told apart from those of blocking requests.
+SURVEY_TID = SPINEL.HEADER_ASYNC | 4
+
+SURVEY_DWELL = 0.5  # Seconds.
+
+# Distinct PAN IDs tracked per channel, others are counted together.
+SURVEY_PANS = 16
+
+SURVEY_CHANNELS = '11-26'
+
+
+def channels_parse(text):
+    """ Return the list of channels in a '11-14,20,25' style list. """
+    channels = []
+    for item in text.split(','):
+        (first, dash, last) = item.partition('-')
+        try:
+            first = int(first)
+            last = int(last) if dash else first
+        except ValueError:
+            raise ValueError("bad channel list %s" % text)
+        if not 0 <= first <= last <= 255:
+            raise ValueError("bad channel range %s" % item)
+        channels.extend(range(first, last + 1))
+    return channels
+
+
+class ChannelActivity(object):
+    """ Activity seen on one channel. """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.frames = 0
+        self.bytes = 0
+        self.rssi_total = 0
+        self.rssi_count = 0
+        self.rssi_max = None
+        self.pans = {}  # Map PAN ID to frames.
+        self.pans_other = 0
+        self.dwell = 0.0  # Seconds spent listening.
+        self.visits = 0
+
+    def stats(self):
+        return {
+            'channel': self.channel,
+            'frames': self.frames,
+            'bytes': self.bytes,
+            'rate': self.frames / self.dwell if self.dwell else 0,
+            'rssi_mean':
+                self.rssi_total / self.rssi_count if self.rssi_count else None,
+            'rssi_max': self.rssi_max,
+            'pans': sorted(self.pans.items(), key=lambda pan: -pan[1]),
+            'pans_other': self.pans_other,
+            'dwell': self.dwell,
+            'visits': self.visits,
+        }
+
+
+class ChannelSurvey(object):
+    """ Dwell schedule across channels, and activity seen on each. """
+
+    def __init__(self, wpan_api, channels, dwell=SURVEY_DWELL):
+        self.wpan_api = wpan_api
+        self.channels = list(channels)
+        self.dwell = dwell
+        self.activity = dict(
+            (channel, ChannelActivity(channel)) for channel in self.channels)
+        self.switch_latency = LatencyHistogram()  # Dead time, in usec.
+        self.switch_failures = 0
+        self.overruns = 0  # Switches due before the previous one completed.
+
+        self._lock = threading.Lock()
+        self._index = 0
+        self._current = None  # Channel confirmed by the NCP.
+        self._listening = None  # When the current channel was confirmed.
+        self._requested = None  # (channel, perf_counter) awaiting response.
+        self._timer = None
+        self._due = threading.Event()
+        self._stopped = False
+
+    def start(self):
+        """ Tune to the first channel, then switch every dwell seconds. """
+        self.wpan_api.callback_register(SPINEL.PROP_PHY_CHAN, self._response)
+        self.wpan_api.callback_register(SPINEL.PROP_LAST_STATUS,
+                                        self._response)
+        self._switch()
+        thread = threading.Thread(target=self._run, name="ChannelSurvey")
+        thread.daemon = True
+        thread.start()
+        # The shared timer thread only signals that a switch is due.
+        self._timer = self.wpan_api.timer.schedule(self.dwell,
+                                                   self._due.set,
+                                                   interval=self.dwell)
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._stopped = True
+        self._due.set()
+        with self._lock:
+            self._leave(time.perf_counter())
+
+    def _leave(self, now):
+        """ Account for the time spent on the current channel. """
+        if self._listening is not None:
+            activity = self.activity.get(self._current)
+            if activity is not None:
+                activity.dwell += now - self._listening
+            self._listening = None
+
+    def _run(self):
+        """ Survey thread, switching channels when the dwell is over. """
+        while True:
+            self._due.wait()
+            self._due.clear()
+            if self._stopped:
+                return
+            try:
+                self._switch()
+            except Exception:
+                CONFIG.LOGGER.error(traceback.format_exc())
+
+    def _switch(self):
+        """ Request the next channel without waiting for the response. """
+        with self._lock:
+            now = time.perf_counter()
+            if self._requested is not None:
+                self.overruns += 1
+                if now - self._requested[1] < 2 * self.dwell:
+                    return
+                # The response was lost, move on.
+                self.switch_failures += 1
+                self._requested = None
+            channel = self.channels[self._index]
+            self._index = (self._index + 1) % len(self.channels)
+            if channel == self._current:
+                return
+            self._leave(now)
+            self._requested = (channel, now)
+
+        # Restored after an NCP reset like the rest of the sniffer state.
+        self.wpan_api.journal_record(SPINEL.PROP_PHY_CHAN, channel)
+        self.wpan_api.prop_change_async(SPINEL.CMD_PROP_VALUE_SET,
+                                        SPINEL.PROP_PHY_CHAN,
+                                        channel,
+                                        tid=SURVEY_TID)
+
+    def _response(self, prop, value, tid):
+        """ Callback for the response to a channel switch. """
+        if tid != SURVEY_TID:
+            return False
+        now = time.perf_counter()
+        with self._lock:
+            if self._requested is None:
+                return True
+            (channel, sent) = self._requested
+            self._requested = None
+            self.switch_latency.record((now - sent) * 1000000)
+            if prop == SPINEL.PROP_PHY_CHAN and value == channel:
+                self._current = channel
+                self._listening = now
+                self.activity[channel].visits += 1
+            else:
+                self.switch_failures += 1
+        return True
+
+    def record(self, frame, metadata=None):
+        """ Account for a raw frame and its PROP_STREAM_RAW metadata. """
+        channel = self._current if metadata is None else metadata[3][0]
+        with self._lock:
+            activity = self.activity.get(channel)
+            if activity is None:
+                activity = self.activity[channel] = ChannelActivity(channel)
+            activity.frames += 1
+            activity.bytes += len(frame)
+            if metadata is not None:
+                activity.rssi_total += metadata[0]
+                activity.rssi_count += 1
+                if activity.rssi_max is None or metadata[0] > activity.rssi_max:
+                    activity.rssi_max = metadata[0]
+
+            if len(frame) < 3:
+                return
+            layout = mhr_layout(frame[0] | frame[1] << 8)
+            (offset, size) = layout[DST_PAN]
+            if not size:
+                (offset, size) = layout[SRC_PAN]
+            if not size or offset + 2 > len(frame):
+                return
+            pan = frame[offset] | frame[offset + 1] << 8
+            if pan in activity.pans:
+                activity.pans[pan] += 1
+            elif len(activity.pans) < SURVEY_PANS:
+                activity.pans[pan] = 1
+            else:
+                activity.pans_other += 1
+
+    def summary(self):
+        """ Return the activity per channel, and switch statistics. """
+        with self._lock:
+            channels = [
+                self.activity[channel].stats()
+                for channel in sorted(self.activity)
+            ]
+            switch = self.switch_latency.snapshot()
+            switch['total'] = self.switch_latency.total
+            switch['failures'] = self.switch_failures
+            switch['overruns'] = self.overruns
+        return {'channels': channels, 'switch': switch}
+
+
+def survey_lines(summary):
+    """ Format a survey summary as a table. """
+    lines = [
+        "%4s %8s %10s %8s %6s %6s  %s" %
+        ("ch", "frames", "bytes", "frames/s", "rssi", "max", "PAN IDs")
+    ]
+    for channel in summary['channels']:
+        rssi = channel['rssi_mean']
+        pans = " ".join(
+            "0x%04x(%d)" % pan for pan in channel['pans'])
+        if channel['pans_other']:
+            pans += " other(%d)" % channel['pans_other']
+        lines.append(
+            "%4d %8d %10d %8.1f %6s %6s  %s" %
+            (channel['channel'], channel['frames'], channel['bytes'],
+             channel['rate'], "-" if rssi is None else "%.0f" % rssi,
+             "-" if channel['rssi_max'] is None else channel['rssi_max'],
+             pans))
+    switch = summary['switch']
+    if switch['count']:
+        lines.append(
+            "%d channel switches, dead time %d usec total, p50 %d usec, "
+            "max %d usec, %d failed, %d overruns" %
+            (switch['count'], switch['total'], switch['p50'], switch['max'],
+             switch['failures'], switch['overruns']))
+    return lines
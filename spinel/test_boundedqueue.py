@@ -0,0 +1,76 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.boundedqueue module. """
+
+import queue
+import unittest
+
+from spinel.const import SPINEL
+from spinel.codec import WpanApi
+from spinel.boundedqueue import BoundedQueue
+from spinel.boundedqueue import QUEUE_POLICY_DROP_OLDEST
+from spinel.boundedqueue import QUEUE_POLICY_DROP_NEWEST
+from spinel.boundedqueue import QUEUE_POLICY_BLOCK
+
+RAW = SPINEL.PROP_STREAM_RAW
+STATUS = SPINEL.PROP_LAST_STATUS
+
+
+def item(prop, value):
+    return WpanApi.PropertyItem(prop, value, SPINEL.HEADER_ASYNC)
+
+
+class TestBoundedQueue(unittest.TestCase):
+    """ Unit TestCase class for spinel.boundedqueue.BoundedQueue class. """
+
+    def drain(self, prop_queue):
+        values = []
+        while not prop_queue.empty():
+            values.append(prop_queue.get_nowait().value)
+        return values
+
+    def test_drop_oldest(self):
+        """ Unit test of a per-property limit with QUEUE_POLICY_DROP_OLDEST. """
+        prop_queue = BoundedQueue(policy=QUEUE_POLICY_DROP_OLDEST,
+                                  prop_limits={RAW: 2})
+        prop_queue.put(item(RAW, 1))
+        prop_queue.put(item(STATUS, 0))
+        prop_queue.put(item(RAW, 2))
+        prop_queue.put(item(RAW, 3))
+
+        stats = prop_queue.stats()
+        self.assertEqual(stats['dropped'], 1)
+        self.assertEqual(stats['dropped_props'], {RAW: 1})
+        self.assertEqual(stats['high_water'], 3)
+        self.assertEqual(self.drain(prop_queue), [0, 2, 3])
+
+    def test_drop_newest(self):
+        """ Unit test of a queue limit with QUEUE_POLICY_DROP_NEWEST. """
+        prop_queue = BoundedQueue(2, QUEUE_POLICY_DROP_NEWEST)
+        for value in range(4):
+            prop_queue.put(item(RAW, value))
+
+        self.assertEqual(prop_queue.stats()['dropped'], 2)
+        self.assertEqual(self.drain(prop_queue), [0, 1])
+
+    def test_block(self):
+        """ Unit test of a queue limit with QUEUE_POLICY_BLOCK. """
+        prop_queue = BoundedQueue(1, QUEUE_POLICY_BLOCK)
+        prop_queue.put(item(RAW, 0))
+        with self.assertRaises(queue.Full):
+            prop_queue.put(item(RAW, 1), timeout=0.01)
+        self.assertEqual(prop_queue.stats()['dropped'], 0)
@@ -0,0 +1,82 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.cache module. """
+
+import binascii
+import time
+import unittest
+
+from spinel.const import SPINEL
+from spinel.codec import WpanApi
+from spinel.cache import PropertyCache
+from spinel.cache import CACHE_POLICY_STATIC
+from spinel.cache import CACHE_POLICY_TTL
+from spinel.cache import CACHE_POLICY_NOTIFY
+from spinel.test_stream import MockStream
+
+
+class TestCache(unittest.TestCase):
+    """ Unit TestCase class for spinel.cache.PropertyCache class. """
+
+    ML_ADDR = "fdde0ad000beef0000000000fffe0400"
+
+    def test_policies(self):
+        """ Unit test of cache policies and counters. """
+        cache = PropertyCache({
+            SPINEL.PROP_CAPS: CACHE_POLICY_STATIC,
+            SPINEL.PROP_PHY_CHAN: (CACHE_POLICY_TTL, 0.05),
+        })
+
+        cache.update(SPINEL.PROP_NET_ROLE, 1)
+        self.assertIsNone(cache.get(SPINEL.PROP_NET_ROLE))
+
+        cache.update(SPINEL.PROP_CAPS, (1, 2))
+        cache.update(SPINEL.PROP_PHY_CHAN, 11)
+        self.assertEqual(cache.get(SPINEL.PROP_CAPS), (1, 2))
+        self.assertEqual(cache.get(SPINEL.PROP_PHY_CHAN), 11)
+
+        time.sleep(0.06)
+        self.assertIsNone(cache.get(SPINEL.PROP_PHY_CHAN))
+        self.assertEqual(cache.get(SPINEL.PROP_CAPS), (1, 2))
+
+        cache.flush()
+        self.assertIsNone(cache.get(SPINEL.PROP_CAPS))
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 3)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['flushes'], 1)
+
+    def test_async_notify(self):
+        """ Unit test of cache update and flush from HEADER_ASYNC frames. """
+        # Any request that reaches the stream would raise KeyError.
+        mock_stream = MockStream({})
+        wpan_api = WpanApi(mock_stream, 1, use_hdlc=False)
+        wpan_api.cache_enable({SPINEL.PROP_IPV6_ML_ADDR: CACHE_POLICY_NOTIFY})
+
+        # PROP_VALUE_IS(IPV6_ML_ADDR) on HEADER_ASYNC
+        wpan_api.parse_rx(binascii.unhexlify("800661" + self.ML_ADDR))
+        value = wpan_api.prop_get_value(SPINEL.PROP_IPV6_ML_ADDR)
+        self.assertEqual(binascii.hexlify(value).decode(), self.ML_ADDR)
+
+        # PROP_VALUE_IS(LAST_STATUS) = STATUS_RESET_SOFTWARE
+        wpan_api.parse_rx(binascii.unhexlify("80060072"))
+        self.assertIsNone(wpan_api.cache.get(SPINEL.PROP_IPV6_ML_ADDR))
+
+        stats = wpan_api.cache_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['flushes'], 1)
@@ -0,0 +1,144 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.capstats module. """
+
+import io
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+from spinel.capstats import CaptureStats
+from spinel.capstats import SpaceSaving
+from spinel.capstats import StatsReporter
+
+# Data, PAN ID 0xface, short 0x0001 to broadcast.
+DATA = bytes.fromhex('6188' '05' 'cefa' 'ffff' '0100') + b'payload' + b'\0\0'
+
+# Data from 00:11:22:33:44:55:66:77 to 0x1234.
+DATA_EXT = bytes.fromhex('41d8' '06' 'cefa' '3412' '7766554433221100' '0000')
+
+ACK = bytes.fromhex('0200' '05' '0000')
+
+
+def metadata(rssi, lqi, usec, rx_error=0):
+    return (rssi, -100, 0, (11, lqi, usec), ((rx_error, 1),))
+
+
+class TestCapStats(unittest.TestCase):
+    """ Unit TestCase class for spinel.capstats module. """
+
+    def test_space_saving(self):
+        """ Unit test of top talkers in a fixed number of counters. """
+        talkers = SpaceSaving(slots=4)
+        for key in 'aaaa' 'bbb' 'cc' 'd':
+            talkers.add(key)
+        self.assertEqual(talkers.top(2), [('a', 4, 0), ('b', 3, 0)])
+
+        # Rare keys churn through the smallest counters only.
+        for i in range(100):
+            talkers.add(i)
+            talkers.add('a')
+        self.assertEqual(len(talkers.counts), 4)
+        self.assertEqual(talkers.top(1), [('a', 104, 0)])
+        for (key, count, error) in talkers.top(4):
+            self.assertLessEqual(error, count)
+
+    def test_record(self):
+        """ Unit test of frame, error, radio and skew counters. """
+        stats = CaptureStats()
+        stats.counter_register('queue', lambda: 3)
+        stats.record(DATA, metadata(-60, 200, 1000))
+        stats.record(DATA, metadata(-70, 100, 2000, rx_error=1))
+        stats.record(DATA_EXT, metadata(-80, 255, 3000))
+        stats.record(ACK)
+
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot['frames'], 4)
+        self.assertEqual(snapshot['bytes'], 2 * len(DATA) + len(DATA_EXT) + 5)
+        self.assertEqual(snapshot['rx_errors'], 1)
+        self.assertEqual(snapshot['dropped'], {'queue': 3})
+        self.assertEqual(snapshot['rssi'], {'min': -80, 'p50': -70, 'max': -60})
+        self.assertEqual(snapshot['lqi'], {'min': 100, 'p50': 200, 'max': 255})
+        self.assertEqual(snapshot['talkers'],
+                         [('0x0001', 2), ('00:11:22:33:44:55:66:77', 1)])
+        self.assertIsNotNone(snapshot['skew']['drift'])
+        self.assertGreaterEqual(snapshot['skew']['spread'], 0)
+
+    def test_report(self):
+        """ Unit test of the periodic report line. """
+        stats = CaptureStats()
+        stats.record(DATA, metadata(-60, 200, 1000))
+        output = io.StringIO()
+        reporter = StatsReporter(stats, output=output)
+        reporter.report()
+        reporter.close()
+        line = output.getvalue()
+        self.assertIn("1 frames", line)
+        self.assertIn("rssi -60/-60/-60, lqi 200", line)
+        self.assertIn("top: 0x0001(1)", line)
+
+    def test_report_thread(self):
+        """ Unit test of periodic reports written by their own thread. """
+
+        class Output(io.StringIO):
+
+            def __init__(self):
+                super().__init__()
+                self.threads = set()
+                self.written = threading.Event()
+
+            def write(self, text):
+                self.threads.add(threading.current_thread().name)
+                self.written.set()
+                return super().write(text)
+
+        stats = CaptureStats()
+        stats.record(ACK)
+        output = Output()
+        reporter = StatsReporter(stats, interval=0.01, output=output)
+        try:
+            self.assertTrue(output.written.wait(2))
+        finally:
+            reporter.close()
+        self.assertEqual(output.threads, {"StatsReport"})
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "needs Unix sockets")
+    def test_socket(self):
+        """ Unit test of serving snapshots on a Unix socket. """
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'stats.sock')
+        stats = CaptureStats()
+        stats.record(ACK)
+        reporter = StatsReporter(stats, path=path)
+        try:
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client.connect(path)
+            data = b''
+            chunk = client.recv(4096)
+            while chunk:
+                data += chunk
+                chunk = client.recv(4096)
+            client.close()
+            self.assertEqual(json.loads(data.decode())['frames'], 1)
+        finally:
+            reporter.close()
+            shutil.rmtree(directory)
+        self.assertFalse(os.path.exists(path))
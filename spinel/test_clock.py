@@ -0,0 +1,96 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.clock module. """
+
+import random
+import unittest
+
+from spinel.clock import ClockCorrelator
+
+DRIFT = 40e-6
+OFFSET = 1000000000.0
+DELAY = 500.0
+
+
+class TestClock(unittest.TestCase):
+    """ Unit TestCase class for spinel.clock.ClockCorrelator class. """
+
+    def feed(self,
+             clock,
+             count,
+             rand,
+             start=5000000,
+             outliers=0.0,
+             offset=OFFSET):
+        """ Feed samples with jittered and late host arrivals. """
+        ncp = start
+        for _ in range(count):
+            ncp += rand.randint(1000, 20000)
+            delay = DELAY + rand.expovariate(1 / 50.0)
+            if rand.random() < outliers:
+                delay += rand.uniform(2000, 20000)
+            clock.observe(ncp, offset + ncp * (1 + DRIFT) + delay)
+        return ncp
+
+    def test_fit(self):
+        """ Unit test of drift and offset estimation with outliers. """
+        rand = random.Random(1)
+        clock = ClockCorrelator(epoch=10)
+        ncp = self.feed(clock, 5000, rand, outliers=0.05)
+
+        stats = clock.stats()
+        self.assertAlmostEqual(stats['drift'], DRIFT * 1e6, delta=0.5)
+        self.assertGreater(stats['outliers'], 200)
+        # Within tens of usec of the arrival time without jitter.
+        expected = OFFSET + ncp * (1 + DRIFT) + DELAY + 50
+        self.assertAlmostEqual(clock.to_host(ncp), expected, delta=30)
+        self.assertEqual(clock.to_wall(ncp), clock.to_host(ncp) + 10)
+
+    def test_empty(self):
+        """ Unit test of a correlator without samples. """
+        clock = ClockCorrelator()
+        self.assertIsNone(clock.to_host(1000))
+        self.assertIsNone(clock.stats()['offset'])
+
+    def test_ncp_restart(self):
+        """ Unit test of a new fit when the NCP clock restarts. """
+        rand = random.Random(2)
+        clock = ClockCorrelator()
+        ncp = self.feed(clock, 100, rand, start=50000000)
+        # The host clock went on while the NCP restarted from 0.
+        offset = OFFSET + ncp + 2000000
+        ncp = self.feed(clock, 1, rand, start=0, offset=offset)
+        self.assertEqual((clock.resets, clock.samples), (1, 1))
+        ncp = self.feed(clock, 100, rand, start=ncp, offset=offset)
+        self.assertAlmostEqual(clock.to_host(ncp),
+                               offset + ncp * (1 + DRIFT) + DELAY + 50,
+                               delta=100)
+
+    def test_step(self):
+        """ Unit test of a new fit when the clocks jump apart. """
+        rand = random.Random(3)
+        clock = ClockCorrelator()
+        ncp = self.feed(clock, 100, rand)
+        outliers = clock.outliers
+        clock.observe(ncp + 1000, OFFSET + 100000 + ncp)
+        self.assertEqual((clock.outliers, clock.resets), (outliers + 1, 0))
+        for i in range(20):
+            ncp += 1000
+            clock.observe(ncp, OFFSET + 100000 + ncp)
+        self.assertEqual(clock.resets, 1)
+        self.assertAlmostEqual(clock.to_host(ncp), OFFSET + 100000 + ncp,
+                               delta=100)
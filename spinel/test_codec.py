@@ -16,12 +16,15 @@
 #
 """ Unittest for spinel.codec module. """
 
+import binascii
+import threading
 import time
 import unittest
 
 from spinel.const import SPINEL
 from spinel.codec import WpanApi
 from spinel.test_stream import MockStream
+from spinel.test_hub import SocketPairStream
 
 
 class TestCodec(unittest.TestCase):
@@ -82,3 +85,77 @@ class TestCodec(unittest.TestCase):
             time.sleep(0.1)
 
         self.failUnless(self.test_callback_pass)
+
+    def test_multi_encode(self):
+        """ Unit test of CMD_PROP_VALUE_MULTI_GET / MULTI_SET encoders. """
+        wpan_api = WpanApi(MockStream({}), 1, use_hdlc=False)
+
+        pay = wpan_api.encode_multi_get(
+            [SPINEL.PROP_MAC_15_4_PANID, SPINEL.PROP_THREAD_RLOC16])
+        self.assertEqual(binascii.hexlify(pay), b"36812a")
+
+        pay = wpan_api.encode_multi_set([
+            (SPINEL.PROP_PHY_CHAN, 11, 'B'),
+            (SPINEL.PROP_MAC_15_4_PANID, 0x1234, '<H'),
+        ])
+        self.assertEqual(binascii.hexlify(pay), b"0200210b0300363412")
+
+    def test_values_are(self):
+        """ Unit test of RSP_PROP_VALUES_ARE dispatch. """
+        wpan_api = WpanApi(MockStream({}), 1, use_hdlc=False)
+
+        # PANID = 0xffff, LEADER_RID failed with STATUS_PROPERTY_NOT_FOUND,
+        # NET_ROLE = detached.
+        wpan_api.parse_rx(
+            binascii.unhexlify("8114" + "030036ffff" + "0200000d" + "02004300"))
+
+        prop_ids = [
+            SPINEL.PROP_MAC_15_4_PANID, SPINEL.PROP_THREAD_LEADER_RID,
+            SPINEL.PROP_NET_ROLE
+        ]
+        results = wpan_api.queue_wait_for_props(prop_ids, timeout=0.1)
+        self.assertEqual(results[SPINEL.PROP_MAC_15_4_PANID].value, 0xffff)
+        self.assertIsNone(results[SPINEL.PROP_THREAD_LEADER_RID])
+        self.assertEqual(results[SPINEL.PROP_NET_ROLE].value, 0)
+
+    def test_unthreaded(self):
+        """ Unit test of WpanApi(threaded=False) pumping the stream. """
+        stream = SocketPairStream({
+            "810236": "810636ffff",  # get panid = 65535
+        })
+        threads_before = threading.active_count()
+        wpan_api = WpanApi(stream, 1, threaded=False)
+        wpan_api.queue_register(SPINEL.HEADER_ASYNC)
+        self.assertFalse(wpan_api.threaded)
+
+        # PROP_VALUE_IS(NET_ROLE) on HEADER_ASYNC, seen before the response.
+        stream.write_child_hex("80064302")
+        self.assertEqual(wpan_api.prop_get_value(SPINEL.PROP_MAC_15_4_PANID),
+                         0xffff)
+        self.assertEqual(threading.active_count(), threads_before)
+
+        item = wpan_api.queue_get(SPINEL.HEADER_ASYNC)
+        self.assertEqual((item.prop, item.value), (SPINEL.PROP_NET_ROLE, 2))
+        self.assertIsNone(wpan_api.queue_get(SPINEL.HEADER_ASYNC, 0.01))
+        stream.close()
+
+        # A stream that cannot be polled needs the reader thread.
+        self.assertRaises(ValueError, WpanApi, MockStream({}), 1,
+                          threaded=False)
+
+    def test_ip_send(self):
+        """ Unit test of ip_send() encoding into reused frame buffers. """
+        written = []
+        stream = MockStream({})
+        stream.write = lambda data: written.append(bytes(data))
+        wpan_api = WpanApi(stream, 1)
+
+        pkt = bytearray(b"\x60\x7e\x7d" * 500)
+        for _ in range(3):
+            self.assertTrue(wpan_api.ip_send(memoryview(pkt)))
+
+        payload = (wpan_api.encode_i(SPINEL.PROP_STREAM_NET) +
+                   len(pkt).to_bytes(2, 'little') + pkt)
+        frame = wpan_api.hdlc.encode(
+            wpan_api.encode_packet(SPINEL.CMD_PROP_VALUE_SET, payload))
+        self.assertEqual(written, [frame] * 3)
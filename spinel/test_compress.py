@@ -0,0 +1,104 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.compress module. """
+
+import gzip
+import io
+import lzma
+import threading
+import unittest
+import zlib
+
+from spinel.compress import CompressedOutput
+
+
+class RecordingOutput(io.BytesIO):
+    """ Output keeping its content on close, and signalling flushes. """
+
+    def __init__(self):
+        io.BytesIO.__init__(self)
+        self.flushed = threading.Event()
+        self.closed_count = 0
+
+    def flush(self):
+        self.flushed.set()
+
+    def close(self):
+        self.closed_count += 1
+
+
+class FailingOutput(RecordingOutput):
+
+    def write(self, data):
+        raise OSError("disk full")
+
+
+class TestCompress(unittest.TestCase):
+    """ Unit TestCase class for spinel.compress.CompressedOutput class. """
+
+    def roundtrip(self, method, decompress):
+        output = RecordingOutput()
+        compressed = CompressedOutput(output, method)
+        records = [b'record %d ' % i * 10 for i in range(100)]
+        for record in records:
+            compressed.write(record)
+        compressed.close()
+
+        self.assertEqual(decompress(output.getvalue()), b''.join(records))
+        self.assertEqual(output.closed_count, 1)
+        stats = compressed.stats()
+        self.assertEqual(stats['bytes_in'], len(b''.join(records)))
+        self.assertEqual(stats['bytes_out'], len(output.getvalue()))
+        self.assertLess(stats['bytes_out'], stats['bytes_in'])
+
+    def test_gzip(self):
+        """ Unit test of gzip output. """
+        self.roundtrip('gzip', gzip.decompress)
+
+    def test_lzma(self):
+        """ Unit test of xz output. """
+        self.roundtrip('lzma', lzma.decompress)
+
+    def test_flush_framing(self):
+        """ Unit test of decompressing a capture cut short after a flush. """
+        for (method, decompressor) in (
+            ('gzip', lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)),
+            ('lzma', lzma.LZMADecompressor)):
+            output = RecordingOutput()
+            compressed = CompressedOutput(output, method)
+            compressed.write(b'header')
+            compressed.write(b'frame')
+            compressed.flush()
+            self.assertTrue(output.flushed.wait(5))
+            partial = decompressor().decompress(output.getvalue())
+            self.assertEqual(partial, b'headerframe', method)
+            compressed.close()
+
+    def test_error(self):
+        """ Unit test of reporting a failed output to the writer. """
+        compressed = CompressedOutput(FailingOutput(), 'gzip', depth=1)
+        with self.assertRaises(OSError):
+            for _ in range(100):
+                compressed.write(b'frame')
+                compressed.flush()
+        with self.assertRaises(OSError):
+            compressed.close()
+
+    def test_method(self):
+        """ Unit test of rejecting unknown methods. """
+        with self.assertRaises(ValueError):
+            CompressedOutput(RecordingOutput(), 'zip')
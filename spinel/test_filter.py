@@ -0,0 +1,114 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.filter module. """
+
+import unittest
+
+from spinel.filter import CaptureFilter
+from spinel.filter import mhr_layout
+
+EXT_ADDR = bytes.fromhex('7766554433221100')  # 00:11:22:33:44:55:66:77
+
+# Data, PAN ID 0xface, short 0x0001 to broadcast.
+DATA = bytes.fromhex('6188' '05' 'cefa' 'ffff' '0100') + b'payload' + b'\0\0'
+
+# Secured data, PAN ID 0xface, extended 00:11:..:77 to short 0x1234.
+SECURED = bytes.fromhex('49d8' '06' 'cefa' '3412') + EXT_ADDR + b'\0' * 12
+
+ACK = bytes.fromhex('0200' '05' '0000')
+
+# IEEE 802.15.4-2015 data between extended addresses, PAN ID 0xbeef.
+DATA_2015 = bytes.fromhex('01ec' '07' 'efbe') + EXT_ADDR * 2 + b'\0\0'
+
+
+class TestFilter(unittest.TestCase):
+    """ Unit TestCase class for spinel.filter.CaptureFilter class. """
+
+    def check(self, text, frames, rssi=None):
+        capture_filter = CaptureFilter(text)
+        for (frame, expected) in frames:
+            self.assertEqual(capture_filter.match(frame, rssi), expected,
+                             "%s on %s" % (text, frame.hex()))
+
+    def test_layout(self):
+        """ Unit test of the MAC header field offsets. """
+        self.assertEqual(mhr_layout(0x8861), ((3, 2), (5, 2), (3, 2), (7, 2)))
+        self.assertEqual(mhr_layout(0x0002), ((3, 0), (3, 0), (3, 0), (3, 0)))
+        self.assertEqual(mhr_layout(0xec01),
+                         ((3, 2), (5, 8), (3, 2), (13, 8)))
+        # Sequence number suppressed, source PAN ID compressed.
+        self.assertEqual(mhr_layout(0xe941),
+                         ((2, 2), (4, 2), (2, 2), (6, 8)))
+        # Sequence number suppressed, no PAN ID between extended addresses.
+        self.assertEqual(mhr_layout(0xed41),
+                         ((2, 0), (2, 8), (10, 0), (10, 8)))
+
+    def test_pan(self):
+        """ Unit test of PAN ID primitives. """
+        self.check('pan 0xface', [(DATA, True), (SECURED, True),
+                                  (ACK, False), (DATA_2015, False)])
+        self.check('pan 0xbeef', [(DATA, False), (DATA_2015, True)])
+
+    def test_address(self):
+        """ Unit test of address primitives. """
+        self.check('src 0x0001', [(DATA, True), (SECURED, False)])
+        self.check('dst 0xffff', [(DATA, True), (SECURED, False)])
+        self.check('src 00:11:22:33:44:55:66:77',
+                   [(DATA, False), (SECURED, True), (DATA_2015, True)])
+        self.check('addr 0x1234', [(DATA, False), (SECURED, True)])
+
+    def test_type_security(self):
+        """ Unit test of frame control primitives. """
+        self.check('type ack', [(DATA, False), (ACK, True)])
+        self.check('type 1', [(DATA, True), (ACK, False)])
+        self.check('security', [(DATA, False), (SECURED, True)])
+
+    def test_compare(self):
+        """ Unit test of RSSI and length comparisons. """
+        self.check('rssi >= -70', [(DATA, True)], rssi=-70)
+        self.check('rssi > -70', [(DATA, False)], rssi=-70)
+        self.check('rssi < 0', [(DATA, False)])
+        self.check('len <= 5', [(DATA, False), (ACK, True)])
+
+    def test_logic(self):
+        """ Unit test of and, or, not and parentheses. """
+        self.check('pan 0xface and not type ack',
+                   [(DATA, True), (ACK, False), (DATA_2015, False)])
+        self.check('type ack or security and src 00:11:22:33:44:55:66:77',
+                   [(DATA, False), (ACK, True), (SECURED, True)])
+        self.check('not (type ack or security)',
+                   [(DATA, True), (ACK, False), (SECURED, False)])
+
+    def test_errors(self):
+        """ Unit test of invalid filters. """
+        for text in ('', 'pan', 'pan face', 'src 00:11', 'type foo',
+                     '(type ack', 'type ack)', 'rssi >', 'foo'):
+            with self.assertRaises(ValueError, msg=text):
+                CaptureFilter(text)
+
+    def test_stream_raw(self):
+        """ Unit test of matching PROP_STREAM_RAW values. """
+        capture_filter = CaptureFilter('rssi >= -70 and type data')
+        for (frame, rssi, expected) in ((DATA, 0xc0, True), (DATA, 0xa0, False),
+                                        (ACK, 0xc0, False)):
+            value = len(frame).to_bytes(2, 'little') + frame + bytes([rssi, 0])
+            self.assertEqual(capture_filter.match_stream_raw(value), expected)
+        self.assertFalse(
+            capture_filter.match_stream_raw(
+                len(DATA).to_bytes(2, 'little') + DATA))
+        self.assertEqual((capture_filter.passed, capture_filter.dropped),
+                         (1, 3))
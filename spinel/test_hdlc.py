@@ -43,6 +43,34 @@ class TestHdlc(unittest.TestCase):
             #print "outHex = "+binascii.hexlify(out_binary)
             self.failUnless(out_hex == binascii.hexlify(out_binary))
 
+    def test_hdlc_encode_into(self):
+        """ Unit test for Hdlc.encode_into method. """
+        hdlc = Hdlc(None)
+        buf = bytearray(4)
+        for in_hex, out_hex in self.VECTOR.items():
+            in_binary = binascii.unhexlify(in_hex)
+            # Chunks split inside the payload, one of them a memoryview.
+            end = hdlc.encode_into(buf, in_binary[:2],
+                                   memoryview(in_binary)[2:])
+            self.assertEqual(binascii.hexlify(buf[:end]).decode(), out_hex)
+
     def test_hdlc_decode(self):
         """ Unit test for Hdle.decode method. """
         pass
+
+    def test_hdlc_feed(self):
+        """ Unit test for Hdlc.feed method. """
+        hdlc = Hdlc(None)
+        stream = b"".join(
+            binascii.unhexlify(out_hex) for out_hex in self.VECTOR.values())
+        # Corrupt frame followed by a frame sharing its closing flag.
+        stream = b"\x00\x7e\x81\x02\x43\x00\x00" + stream[:-1]
+
+        packets = []
+        for i in range(0, len(stream), 3):
+            packets += hdlc.feed(stream[i:i + 3])
+        packets += hdlc.feed(b"\x7e")
+
+        self.assertEqual([binascii.hexlify(pkt).decode() for pkt in packets],
+                         list(self.VECTOR.keys()))
+        self.assertEqual(hdlc.fcs_errors, 1)
@@ -0,0 +1,91 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.hub module. """
+
+import binascii
+import socket
+import threading
+import unittest
+
+from spinel.const import SPINEL
+from spinel.codec import WpanApi
+from spinel.hdlc import Hdlc
+from spinel.hub import WpanHub
+from spinel.stream import IStream
+
+
+class SocketPairStream(IStream):
+    """ A pollable IStream answering HDLC requests from a test vector. """
+
+    def __init__(self, vector):
+        self.vector = vector
+        self.requests = []
+        self.hdlc = Hdlc(None)
+        (self.sock, self.peer) = socket.socketpair()
+
+    def write(self, data):
+        for pkt in self.hdlc.feed(data):
+            self.requests.append(binascii.hexlify(pkt).decode())
+            self.write_child_hex(self.vector[self.requests[-1]])
+
+    def write_child_hex(self, out_hex):
+        """ Send an HDLC encoded frame from the mock NCP. """
+        response = self.hdlc.encode(binascii.unhexlify(out_hex))
+        # Split the response to exercise incremental deframing.
+        self.peer.send(response[:3])
+        self.peer.send(response[3:])
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def read_available(self, size=4096):
+        return self.sock.recv(size)
+
+    def close(self):
+        self.sock.close()
+        self.peer.close()
+
+
+class TestHub(unittest.TestCase):
+    """ Unit TestCase class for spinel.hub.WpanHub class. """
+
+    NODES = 8
+
+    def test_many_streams(self):
+        """ Unit test of many WpanApi instances sharing a single hub. """
+        threads_before = threading.active_count()
+
+        with WpanHub() as hub:
+            nodes = []
+            for nodeid in range(self.NODES):
+                stream = SocketPairStream({
+                    # get panid = 0x1000 + nodeid
+                    "810236": "810636%02x10" % nodeid,
+                })
+                nodes.append((stream, WpanApi(stream, nodeid, hub=hub)))
+
+            # Only the hub thread was started.
+            self.assertEqual(threading.active_count(), threads_before + 1)
+
+            for nodeid, (stream, wpan_api) in enumerate(nodes):
+                value = wpan_api.prop_get_value(SPINEL.PROP_MAC_15_4_PANID)
+                self.assertEqual(value, 0x1000 + nodeid)
+
+                with wpan_api:
+                    pass
+                stream.close()
+                self.assertIsNone(wpan_api.hub)
@@ -0,0 +1,65 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for the WpanApi configuration journal. """
+
+import time
+import unittest
+
+from spinel.const import SPINEL
+from spinel.codec import WpanApi
+from spinel.hub import WpanHub
+from spinel.test_hub import SocketPairStream
+
+
+class TestJournal(unittest.TestCase):
+    """ Unit TestCase class for WpanApi reset detection and restore. """
+
+    def test_reset_restore(self):
+        """ Unit test of journal replay after a spontaneous NCP reset. """
+        stream = SocketPairStream({
+            # Request:  Response
+            "8103210f": "8106210f",  # set channel = 15
+            "820205": "82060501",  # get caps, no CAP_CMD_MULTI
+            "8203210f": "8206210f",  # restore channel = 15
+        })
+
+        with WpanHub() as hub:
+            wpan_api = WpanApi(stream, 1, hub=hub)
+            wpan_api.journal_enable([SPINEL.PROP_PHY_CHAN])
+
+            self.assertEqual(wpan_api.prop_set_value(SPINEL.PROP_PHY_CHAN, 15),
+                             15)
+            self.assertEqual(list(wpan_api.journal),
+                             [SPINEL.PROP_PHY_CHAN])
+
+            # PROP_VALUE_IS(LAST_STATUS) = STATUS_RESET_POWER_ON
+            stream.write_child_hex("80060070")
+
+            deadline = time.monotonic() + 1
+            while (wpan_api.metrics()['downtime']['count'] == 0 and
+                   time.monotonic() < deadline):
+                time.sleep(0.01)
+
+            metrics = wpan_api.metrics()
+            self.assertEqual(metrics['resets'], 1)
+            self.assertEqual(metrics['restore_failures'], 0)
+            self.assertEqual(metrics['downtime']['count'], 1)
+            self.assertEqual(stream.requests[-1], "8203210f")
+
+            with wpan_api:
+                pass
+        stream.close()
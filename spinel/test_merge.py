@@ -0,0 +1,99 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.merge module. """
+
+import threading
+import time
+import unittest
+
+from spinel.boundedqueue import QUEUE_POLICY_BLOCK
+from spinel.boundedqueue import QUEUE_POLICY_DROP_NEWEST
+from spinel.boundedqueue import QUEUE_POLICY_DROP_OLDEST
+from spinel.merge import FrameMerger
+
+
+class TestMerge(unittest.TestCase):
+    """ Unit TestCase class for spinel.merge.FrameMerger class. """
+
+    def test_merge(self):
+        """ Unit test of timestamp order across sources. """
+        merger = FrameMerger(2, window=0.05)
+        merger.put(0, 10, 'a10', 3)
+        merger.put(0, 30, 'a30', 3)
+        # Source 1 has not been heard from, nothing can be released yet.
+        self.assertIsNone(merger.get(0))
+
+        merger.put(1, 20, 'b20', 3)
+        self.assertEqual(merger.get(0), (0, 10, 'a10'))
+        self.assertEqual(merger.get(0), (1, 20, 'b20'))
+        # Source 1 is quiet, a30 is only released after the window.
+        self.assertIsNone(merger.get(0))
+        self.assertEqual(merger.get(1), (0, 30, 'a30'))
+
+        # A frame older than one already released is late.
+        merger.put(1, 25, 'b25', 3)
+        merger.close()
+        self.assertEqual(merger.get(), (1, 25, 'b25'))
+        self.assertIsNone(merger.get())
+
+        stats = merger.stats()
+        self.assertEqual([source['frames'] for source in stats['sources']],
+                         [2, 2])
+        self.assertEqual(stats['sources'][0]['bytes'], 6)
+        self.assertEqual(stats['reordered'], 1)
+        self.assertEqual(stats['late'], 1)
+        self.assertEqual(stats['forced'], 1)
+        self.assertEqual(stats['high_water'], 3)
+        self.assertEqual(stats['hold']['count'], 4)
+
+    def test_depth(self):
+        """ Unit test of the bound on frames held. """
+        merger = FrameMerger(2, window=10, depth=2)
+        merger.put(0, 1, 'a1')
+        self.assertIsNone(merger.get(0.01))
+        merger.put(0, 2, 'a2')
+        start = time.monotonic()
+        self.assertEqual(merger.get(), (0, 1, 'a1'))
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_policy(self):
+        """ Unit test of frames put while the merger is full. """
+        for (policy, first) in ((QUEUE_POLICY_DROP_OLDEST, 'a2'),
+                                (QUEUE_POLICY_DROP_NEWEST, 'a1')):
+            merger = FrameMerger(2, window=10, depth=2, policy=policy)
+            for timestamp in (1, 2, 3):
+                merger.put(0, timestamp, 'a%d' % timestamp)
+            self.assertEqual(merger.stats()['dropped'], 1)
+            self.assertEqual(merger.stats()['held'], 2)
+            self.assertEqual(merger.get()[2], first)
+
+        merger = FrameMerger(2, window=10, depth=2, policy=QUEUE_POLICY_BLOCK)
+        merger.put(0, 1, 'a1')
+        merger.put(0, 2, 'a2')
+        producer = threading.Thread(target=merger.put, args=(0, 3, 'a3'))
+        producer.start()
+        producer.join(0.05)
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(merger.get(), (0, 1, 'a1'))
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(merger.stats()['dropped'], 0)
+        self.assertEqual(merger.stats()['held'], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.metrics module. """
+
+import binascii
+import unittest
+
+from spinel.const import SPINEL
+from spinel.codec import WpanApi
+from spinel.metrics import LatencyHistogram
+from spinel.metrics import RequestMetrics
+from spinel.test_stream import MockStream
+
+GET = SPINEL.CMD_PROP_VALUE_GET
+ROLE = SPINEL.PROP_NET_ROLE
+TID = SPINEL.HEADER_DEFAULT
+
+
+class TestMetrics(unittest.TestCase):
+    """ Unit TestCase class for spinel.metrics classes. """
+
+    def test_histogram(self):
+        """ Unit test of LatencyHistogram percentiles and bucket error. """
+        histogram = LatencyHistogram()
+        for value in range(1, 10001):
+            histogram.record(value)
+
+        stats = histogram.snapshot()
+        self.assertEqual(stats['count'], 10000)
+        self.assertEqual(stats['min'], 1)
+        self.assertEqual(stats['max'], 10000)
+        for percent in (50, 90, 99):
+            truth = percent * 100
+            value = histogram.percentile(percent)
+            self.assertGreaterEqual(value, truth)
+            self.assertLess(value, truth * 1.07)
+
+        other = LatencyHistogram()
+        other.record(20000)
+        histogram.merge(other)
+        self.assertEqual(histogram.count, 10001)
+        self.assertEqual(histogram.percentile(100), 20000)
+
+    def test_request_accounting(self):
+        """ Unit test of timeout, late and unmatched response accounting. """
+        metrics = RequestMetrics()
+
+        metrics.request_start(TID, ROLE)
+        self.assertTrue(metrics.response(TID, ROLE))
+        metrics.request_done(TID, GET, ROLE, 0.002, True)
+
+        metrics.request_start(TID, ROLE)
+        metrics.request_done(TID, GET, ROLE, 5.0, False)
+        self.assertFalse(metrics.response(TID, ROLE))
+
+        self.assertTrue(metrics.response(TID, ROLE))
+        self.assertTrue(
+            metrics.response(TID, SPINEL.PROP_LAST_STATUS,
+                             SPINEL.PROP_LAST_STATUS))
+
+        # A reply abandoned and lost is not taken from a waiting request.
+        metrics.request_start(TID, ROLE)
+        metrics.request_done(TID, GET, ROLE, 5.0, False)
+        metrics.request_start(TID, ROLE)
+        self.assertTrue(metrics.response(TID, ROLE))
+        metrics.request_done(TID, GET, ROLE, 0.002, True)
+        self.assertFalse(metrics.response(TID, ROLE))
+
+        # LAST_STATUS answers any request pending on its tid.
+        metrics.request_start(TID, ROLE)
+        self.assertTrue(
+            metrics.response(TID, SPINEL.PROP_LAST_STATUS,
+                             SPINEL.PROP_LAST_STATUS))
+        metrics.request_done(TID, GET, ROLE, 0.002, True)
+
+        # Replies to requests nobody waits for, on their tid only.
+        metrics.request_async(TID)
+        self.assertTrue(metrics.response(TID + 1, ROLE))
+        self.assertTrue(metrics.response(TID, ROLE))
+        self.assertTrue(metrics.response(TID, ROLE))
+
+        snapshot = metrics.snapshot()
+        stats = snapshot['requests'][(str(GET), str(ROLE))]
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(stats['timeouts'], 2)
+        self.assertEqual(snapshot['commands'][str(GET)]['count'], 3)
+        self.assertEqual(snapshot['timeouts'], 2)
+        self.assertEqual(snapshot['late'], 2)
+        self.assertEqual(snapshot['unmatched'], 4)
+
+    def test_unmatched_response(self):
+        """ Unit test of WpanApi classification of unsolicited responses. """
+        # The GET of NET_ROLE is answered below, by hand.
+        wpan_api = WpanApi(MockStream({b"810243": ""}), 1, use_hdlc=False)
+
+        # PROP_VALUE_IS(NET_ROLE) on HEADER_DEFAULT with no request pending.
+        wpan_api.parse_rx(binascii.unhexlify("81064302"))
+        self.assertEqual(wpan_api.metrics()['unmatched'], 1)
+
+        wpan_api.metrics_reset()
+        self.assertEqual(wpan_api.metrics()['unmatched'], 0)
+
+        # The reply to a fire-and-forget request is expected.
+        wpan_api.prop_change_async(SPINEL.CMD_PROP_VALUE_GET, ROLE, None, None)
+        wpan_api.parse_rx(binascii.unhexlify("81064302"))
+        self.assertEqual(wpan_api.metrics()['unmatched'], 0)
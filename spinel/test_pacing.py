@@ -0,0 +1,156 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.pacing module. """
+
+import threading
+import time
+import unittest
+
+from spinel.const import SPINEL
+from spinel.codec import WpanApi
+from spinel.pacing import PACING_SAMPLE_TID
+from spinel.pacing import PACING_TID
+from spinel.pacing import SendPacer
+from spinel.test_hub import SocketPairStream
+from spinel.timer import TimerService
+
+# ip_send(b'\x60\x00') on PACING_TID.
+IP_SEND = "83037202006000"
+
+# get MSG_BUFFER_COUNTERS on PACING_SAMPLE_TID, 32 of 64 buffers free.
+BUFFERS_GET = "8502900d"
+BUFFERS_IS = "8506900d" + "4000" + "2000" + "0000" * 14
+
+
+class TestPacing(unittest.TestCase):
+    """ Unit TestCase class for spinel.pacing.SendPacer class. """
+
+    def test_window(self):
+        """ Unit test of additive increase and multiplicative decrease. """
+        pacer = SendPacer(window_init=2, window_max=4)
+        self.assertTrue(pacer.acquire(0))
+        self.assertTrue(pacer.acquire(0))
+        # Window is full.
+        self.assertFalse(pacer.acquire(0))
+
+        pacer.response(SPINEL.STATUS_OK)
+        pacer.response(SPINEL.STATUS_OK)
+        self.assertAlmostEqual(pacer.window, 2 + 1 / 2 + 1 / 2.5)
+        self.assertEqual(pacer.inflight, 0)
+
+        for _ in range(2):
+            self.assertTrue(pacer.acquire(0))
+        self.assertFalse(pacer.acquire(0))
+        window = pacer.window
+        # Drops of frames sent in the same round only halve the window once.
+        pacer.response(SPINEL.STATUS_NOMEM)
+        pacer.response(SPINEL.STATUS_BUSY)
+        self.assertAlmostEqual(pacer.window, window / 2)
+
+        stats = pacer.stats()
+        self.assertEqual(stats['sent'], 4)
+        self.assertEqual(stats['ok'], 2)
+        self.assertEqual(stats['nomem'], 1)
+        self.assertEqual(stats['busy'], 1)
+        self.assertEqual(stats['decreases'], 1)
+
+    def test_buffers_and_loss(self):
+        """ Unit test of buffer samples and responses that never come. """
+        pacer = SendPacer(window_init=8, loss_timeout=0.01)
+        pacer.buffers_sampled(10, 128)
+        # Nothing was sent yet, so there is nothing to slow down.
+        self.assertEqual(pacer.window, 8)
+
+        self.assertTrue(pacer.acquire(0))
+        pacer.buffers_sampled(10, 128)
+        self.assertEqual(pacer.window, 4)
+        pacer.buffers_sampled(100, 128)
+        self.assertEqual(pacer.window, 4)
+
+        time.sleep(0.02)
+        self.assertTrue(pacer.sample_due())
+        stats = pacer.stats()
+        self.assertEqual(stats['lost'], 1)
+        self.assertEqual(stats['inflight'], 0)
+        self.assertEqual(stats['buffer_low'], 2)
+        self.assertFalse(pacer.sample_due())
+
+    def _ip_send(self, status, count):
+        stream = SocketPairStream({IP_SEND: "830600%02x" % status})
+        with WpanApi(stream, 1, threaded=False) as wpan_api:
+            pacer = wpan_api.pacing_enable(interval=60, window_init=1)
+            for _ in range(count):
+                self.assertTrue(wpan_api.ip_send(b'\x60\x00'))
+            while pacer.inflight:
+                wpan_api.poll(0.1)
+            stats = wpan_api.metrics()['pacing']
+        stream.close()
+        self.assertIsNone(wpan_api.pacer)
+        self.assertEqual(stream.requests, [IP_SEND] * count)
+        return stats
+
+    def test_sample(self):
+        """ Unit test of buffer samples sent while the timer thread blocks. """
+        timers = TimerService()
+        release = threading.Event()
+        timers.schedule(0, release.wait, 5)
+        stream = SocketPairStream({
+            IP_SEND: "83060000",
+            BUFFERS_GET: BUFFERS_IS,
+        })
+        with WpanApi(stream, 1, threaded=False, timer=timers) as wpan_api:
+            pacer = wpan_api.pacing_enable(interval=0.01)
+            self.assertTrue(wpan_api.ip_send(b'\x60\x00'))
+            deadline = time.monotonic() + 1
+            while (pacer.stats()['buffers'] is None and
+                   time.monotonic() < deadline):
+                wpan_api.poll(0.01)
+        release.set()
+        timers.close()
+        stream.close()
+        self.assertIn(BUFFERS_GET, stream.requests)
+        self.assertEqual(pacer.stats()['buffers'], (32, 64))
+
+    def test_sample_status(self):
+        """ Unit test of sample statuses kept out of the window. """
+        stream = SocketPairStream({})
+        with WpanApi(stream, 1, threaded=False) as wpan_api:
+            pacer = wpan_api.pacing_enable(interval=60)
+            self.assertTrue(pacer.acquire(0))
+            window = pacer.window
+            # The NCP was too busy to answer a MSG_BUFFER_COUNTERS sample.
+            wpan_api.queue_add(SPINEL.PROP_LAST_STATUS, SPINEL.STATUS_BUSY,
+                               PACING_SAMPLE_TID)
+            self.assertEqual((pacer.inflight, pacer.window), (1, window))
+            wpan_api.queue_add(SPINEL.PROP_LAST_STATUS, SPINEL.STATUS_OK,
+                               PACING_TID)
+            self.assertEqual(pacer.inflight, 0)
+        stream.close()
+
+    def test_ip_send(self):
+        """ Unit test of ip_send() paced by the LAST_STATUS it gets back. """
+        stats = self._ip_send(SPINEL.STATUS_OK, 4)
+        self.assertEqual(stats['ok'], 4)
+        self.assertGreater(stats['window'], 2)
+
+        stats = self._ip_send(SPINEL.STATUS_NOMEM, 4)
+        self.assertEqual(stats['nomem'], 4)
+        self.assertEqual(stats['window'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.pcap module. """
+
+import io
+import os
+import struct
+import time
+import unittest
+
+from spinel.pcap import PcapCodec
+from spinel.pcap import PcapWriter
+from spinel.pcap import DLT_IEEE802_15_4_TAP
+from spinel.pcap import DLT_IEEE802_15_4_WITHFCS
+
+
+class TestPcap(unittest.TestCase):
+    """ Unit TestCase class for spinel.pcap.PcapWriter class. """
+
+    def setUp(self):
+        (read_fd, write_fd) = os.pipe()
+        os.set_blocking(read_fd, False)
+        self.reader = os.fdopen(read_fd, 'rb', 0)
+        self.output = os.fdopen(write_fd, 'wb')
+
+    def tearDown(self):
+        self.reader.close()
+        self.output.close()
+
+    def test_tap_subghz(self):
+        """ Unit test of TAP channel TLVs of a long sub-GHz frame. """
+        header = PcapCodec.encode_header(DLT_IEEE802_15_4_TAP)
+        frame = b'\x41\x88' + bytes(558)
+        metadata = (-40, -100, 0, (1, 200, 0), ((0, 1),))
+        record = PcapCodec.encode_frame(frame, 1, 2, False, False, metadata)
+
+        snaplen = struct.unpack("<L", header[16:20])[0]
+        (incl_len, orig_len) = struct.unpack("<LL", record[8:16])
+        self.assertEqual(incl_len, orig_len)
+        self.assertLessEqual(incl_len, snaplen)
+        self.assertEqual(
+            record[16:36],
+            struct.pack("<HHHHHHHHf", 0, 20, 3, 3, 1, 2, 11, 4, 906000))
+        self.assertEqual(record[36:], frame)
+
+        # Channels outside the channel plan go without a frequency.
+        metadata = (-40, -100, 0, (40, 200, 0), ((0, 1),))
+        record = PcapCodec.encode_frame(frame, 1, 2, False, False, metadata)
+        self.assertEqual(record[16:28],
+                         struct.pack("<HHHHHH", 0, 12, 3, 3, 40, 0))
+
+    def test_flush_frames(self):
+        """ Unit test of writing out every few frames. """
+        header = PcapCodec.encode_header(DLT_IEEE802_15_4_WITHFCS)
+        frame = PcapCodec.encode_frame(b'\x41\x88\x00\x00', 1, 2, False,
+                                       False)
+        writer = PcapWriter(self.output, flush_frames=3, flush_interval=None)
+        writer.write(header)
+        writer.write(frame)
+        self.assertIsNone(self.reader.read())
+
+        writer.write(frame)
+        self.assertEqual(self.reader.read(), header + frame + frame)
+        self.assertEqual((writer.frames, writer.flushes), (3, 1))
+
+    def test_flush_interval(self):
+        """ Unit test of writing out pending frames after a while. """
+        writer = PcapWriter(self.output, flush_interval=0.01)
+        writer.write(b'frame')
+        self.assertIsNone(self.reader.read())
+        time.sleep(0.1)
+        self.assertEqual(self.reader.read(), b'frame')
+        self.assertEqual(writer._flusher.name, "PcapWriter")
+        writer.close()
+        writer._flusher.join(1)
+        self.assertFalse(writer._flusher.is_alive())
+        self.output = open(os.devnull, 'wb')
+
+    def test_no_fileno(self):
+        """ Unit test of outputs without a file descriptor. """
+        output = io.BytesIO()
+        writer = PcapWriter(output, flush_frames=1)
+        writer.write(b'one')
+        writer.write(b'two')
+        self.assertEqual(output.getvalue(), b'onetwo')
+
+
+if __name__ == "__main__":
+    unittest.main()
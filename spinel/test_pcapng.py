@@ -0,0 +1,135 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.pcapng module. """
+
+import struct
+import unittest
+
+from spinel.pcap import DLT_IEEE802_15_4_TAP
+from spinel.pcapng import PcapngCodec
+from spinel.pcapng import BLOCK_TYPE_SHB
+from spinel.pcapng import BLOCK_TYPE_IDB
+from spinel.pcapng import BLOCK_TYPE_EPB
+from spinel.pcapng import EPB_FLAGS
+from spinel.pcapng import IF_NAME
+from spinel.pcapng import IF_DESCRIPTION
+from spinel.pcapng import IF_TSRESOL
+
+
+def parse_blocks(data):
+    """ Return the list of (block type, body) in a pcapng stream. """
+    blocks = []
+    while data:
+        (block_type, length) = struct.unpack("<LL", data[:8])
+        assert length % 4 == 0
+        assert struct.unpack("<L", data[length - 4:length])[0] == length
+        blocks.append((block_type, data[8:length - 4]))
+        data = data[length:]
+    return blocks
+
+
+def parse_options(data):
+    """ Return the dict of options up to opt_endofopt. """
+    options = {}
+    while True:
+        (code, length) = struct.unpack("<HH", data[:4])
+        if code == 0:
+            return options
+        options[code] = data[4:4 + length]
+        data = data[4 + length + (-length % 4):]
+
+
+class TestPcapng(unittest.TestCase):
+    """ Unit TestCase class for spinel.pcapng.PcapngCodec class. """
+
+    FRAME = b"\x41\x88\x01\x34\x12\xff\xff\x00"
+
+    def test_blocks(self):
+        """ Unit test of section, interface and enhanced packet blocks. """
+        codec = PcapngCodec(device="/dev/ttyACM0")
+        # As parsed by sniffer.py, the receive error is an (int, size) pair.
+        metadata_11 = (-40, -100, 0, (11, 200, 0), ((0, 1),),
+                       (1, 0x12345678))
+        metadata_26 = (-70, -98, 0, (26, 100, 0), ((17, 1),))
+        data = codec.encode_header()
+        data += codec.encode_frame(self.FRAME, 1, 2, True, False, metadata_11)
+        data += codec.encode_frame(self.FRAME[:5], 3, 4, True, False,
+                                   metadata_26)
+        data += codec.encode_frame(self.FRAME, 5, 6, True, False, metadata_11)
+
+        blocks = parse_blocks(data)
+        self.assertEqual([block_type for block_type, _ in blocks], [
+            BLOCK_TYPE_SHB, BLOCK_TYPE_IDB, BLOCK_TYPE_EPB, BLOCK_TYPE_IDB,
+            BLOCK_TYPE_EPB, BLOCK_TYPE_EPB
+        ])
+        self.assertEqual(blocks[0][1][:4], b"\x4d\x3c\x2b\x1a")
+
+        self.assertEqual(
+            struct.unpack("<H", blocks[1][1][:2])[0], DLT_IEEE802_15_4_TAP)
+        options = parse_options(blocks[1][1][8:])
+        self.assertEqual(options[IF_NAME], b"/dev/ttyACM0:ch11")
+        self.assertEqual(options[IF_TSRESOL], b"\x09")
+
+        epbs = []
+        for (block_type, body) in blocks:
+            if block_type == BLOCK_TYPE_EPB:
+                header = struct.unpack("<LLLLL", body[:20])
+                length = header[3]
+                offset = 20 + length + (-length % 4)
+                epbs.append((header, body[20:20 + length],
+                             parse_options(body[offset:])))
+
+        # TAP TLVs: channel 11 in page 0 at 2405 MHz, RSSI, LQI and FCS.
+        tlvs = struct.pack("<HH" "HHHH" "HHf" "HHfHHI" "HHI", 0, 44, 3, 3, 11,
+                           0, 11, 4, 2405000, 1, 4, -40, 10, 1, 200, 0, 1, 1)
+        (header, frame, options) = epbs[0]
+        self.assertEqual(header, (0, 0, 1000002000, 52, 52))
+        self.assertEqual(frame, tlvs + self.FRAME)
+        self.assertEqual(options[EPB_FLAGS], struct.pack("<L", 0x41))
+
+        # An FCS receive error is flagged as a CRC error.
+        (header, frame, options) = epbs[1]
+        self.assertEqual(header[0], 1)
+        self.assertEqual(frame[44:], self.FRAME[:5])
+        self.assertEqual(struct.unpack("<f", frame[24:28])[0], -70)
+        self.assertEqual(frame[32], 100)
+        self.assertEqual(options[EPB_FLAGS], struct.pack("<L", 0x1000041))
+
+        self.assertEqual(epbs[2][0][0], 0)
+
+    def test_subghz(self):
+        """ Unit test of a long frame on a sub-GHz channel. """
+        codec = PcapngCodec()
+        frame = self.FRAME + bytes(552)
+        metadata = (-40, -100, 0, (1, 200, 0), ((0, 1),))
+        data = codec.encode_header()
+        data += codec.encode_frame(frame, 1, 2, True, False, metadata)
+
+        blocks = parse_blocks(data)
+        (linktype, _, snaplen) = struct.unpack("<HHL", blocks[1][1][:8])
+        self.assertGreaterEqual(snaplen, 560 + 44)
+        options = parse_options(blocks[1][1][8:])
+        self.assertEqual(options[IF_DESCRIPTION],
+                         b"IEEE 802.15.4 channel 1, page 2, 906 MHz")
+
+        header = struct.unpack("<LLLLL", blocks[2][1][:20])
+        self.assertEqual(header[3:], (604, 604))
+        self.assertEqual(blocks[2][1][64:624], frame)
+
+
+if __name__ == "__main__":
+    unittest.main()
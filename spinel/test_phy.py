@@ -0,0 +1,46 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.phy module. """
+
+import unittest
+
+from spinel.phy import channel_frequency
+from spinel.phy import channel_page
+from spinel.phy import channel_str
+
+
+class TestPhy(unittest.TestCase):
+    """ Unit TestCase class for the spinel.phy channel plan. """
+
+    def test_channel_plan(self):
+        """ Unit test of channel pages and center frequencies. """
+        self.assertEqual([channel_page(channel) for channel in (0, 10, 11)],
+                         [2, 2, 0])
+        self.assertEqual(
+            [channel_frequency(channel) for channel in (0, 1, 10, 11, 26)],
+            [868300, 906000, 924000, 2405000, 2480000])
+        self.assertIsNone(channel_frequency(27))
+
+    def test_channel_str(self):
+        """ Unit test of channels displayed with their frequency. """
+        self.assertEqual(channel_str(0), "0 (868.3 MHz)")
+        self.assertEqual(channel_str(15), "15 (2425 MHz)")
+        self.assertEqual(channel_str(27), "27")
+
+
+if __name__ == "__main__":
+    unittest.main()
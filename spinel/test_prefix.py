@@ -0,0 +1,76 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.prefix module. """
+
+import ipaddress
+import threading
+import unittest
+
+from struct import pack
+
+from spinel.const import kThread
+from spinel.prefix import PrefixTracker
+from spinel.timer import TimerService
+
+
+def on_mesh_net(prefix, flags):
+    net6 = ipaddress.IPv6Network(prefix)
+    return pack('<H', 20) + net6.network_address.packed + pack(
+        'BBBB', net6.prefixlen, 1, flags, 0)
+
+
+SLAAC = kThread.PrefixSlaacFlag | kThread.PrefixPreferredFlag
+
+
+class TestPrefix(unittest.TestCase):
+    """ Unit TestCase class for spinel.prefix.PrefixTracker class. """
+
+    def test_debounce_diff(self):
+        """ Unit test of update coalescing and prefix set diffing. """
+        timers = TimerService()
+        tracker = PrefixTracker(timers, debounce=0.02)
+        changes = []
+        changed = threading.Event()
+
+        def on_change(added, removed):
+            changes.append((sorted(added), sorted(removed)))
+            changed.set()
+
+        tracker.callback_register(on_change)
+
+        payload = (on_mesh_net("fd00:1::/64", SLAAC) +
+                   on_mesh_net("fd00:2::/64", kThread.PrefixDhcpFlag))
+        for _ in range(5):
+            tracker.update(payload)
+        self.assertTrue(changed.wait(1))
+        self.assertEqual(tracker.updates, 5)
+        self.assertEqual(tracker.processed, 1)
+        self.assertEqual(changes,
+                         [([ipaddress.IPv6Network("fd00:1::/64")], [])])
+
+        # Only the latest payload of a burst is diffed.
+        changed.clear()
+        tracker.update(payload + on_mesh_net("fd00:3::/64", 0))
+        tracker.update(on_mesh_net("fd00:4::/64", SLAAC))
+        self.assertTrue(changed.wait(1))
+        self.assertEqual(tracker.processed, 2)
+        self.assertEqual(changes[-1],
+                         ([ipaddress.IPv6Network("fd00:4::/64")],
+                          [ipaddress.IPv6Network("fd00:1::/64")]))
+        self.assertEqual(tracker.prefixes(),
+                         {ipaddress.IPv6Network("fd00:4::/64")})
+        timers.close()
@@ -0,0 +1,113 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.rawframe module. """
+
+import io
+import struct
+import unittest
+
+from spinel.codec import SpinelCodec
+from spinel.pcap import PcapCodec
+from spinel.pcap import PcapWriter
+from spinel.pcap import DLT_IEEE802_15_4_TAP
+from spinel.pcap import DLT_IEEE802_15_4_WITHFCS
+from spinel.rawframe import RawFrame
+
+FRAME = bytes.fromhex('6188' '05' 'cefa' 'ffff' '0100') + b'payload' + b'\0\0'
+
+# RSSI -42, noise -98, flags 0, channel 15, LQI 200, receive error 0.
+METADATA_17 = struct.pack('<bbHHBBLHHB', -42, -98, 0, 8, 15, 200, 123456,
+                          789, 1, 0)
+METADATA_19 = struct.pack('<bbHHBBQHB', -42, -98, 0, 10, 15, 200,
+                          0x123456789a, 1, 0)
+METADATA_26 = METADATA_19 + struct.pack('<HBL', 5, 2, 0xdeadbeef)
+
+FORMATS = {
+    METADATA_17: "ccSt(CCLS)t(i)",
+    METADATA_19: "ccSt(CCX)t(i)",
+    METADATA_26: "ccSt(CCX)t(i)t(CL)",
+}
+
+
+def stream_raw(frame, metadata=b''):
+    return struct.pack('<H', len(frame)) + frame + metadata
+
+
+class TestRawFrame(unittest.TestCase):
+    """ Unit TestCase class for spinel.rawframe.RawFrame class. """
+
+    def test_decode(self):
+        """ Unit test of the metadata variants against parse_fields(). """
+        for (metadata, spinel_format) in FORMATS.items():
+            raw = RawFrame.decode(stream_raw(FRAME, metadata))
+            self.assertEqual(raw.frame, FRAME)
+            self.assertEqual(raw.metadata_size, len(metadata))
+            self.assertEqual(raw.metadata,
+                             SpinelCodec.parse_fields(metadata, spinel_format))
+            self.assertEqual((raw.rssi, raw.channel, raw.lqi), (-42, 15, 200))
+
+        raw = RawFrame.decode(stream_raw(FRAME, METADATA_17))
+        self.assertEqual(raw.timestamp, 123456789)
+        raw = RawFrame.decode(stream_raw(FRAME, METADATA_26))
+        self.assertEqual((raw.ack_key_id, raw.ack_counter), (2, 0xdeadbeef))
+
+    def test_no_metadata(self):
+        """ Unit test of values from NCPs without metadata. """
+        for value in (stream_raw(FRAME), stream_raw(FRAME, b'\0' * 5)):
+            raw = RawFrame.decode(value)
+            self.assertEqual(raw.frame, FRAME)
+            self.assertEqual(raw.metadata_size, 0)
+            self.assertIsNone(raw.metadata)
+            self.assertIsNone(raw.timestamp)
+
+    def test_pack_raw(self):
+        """ Unit test of packed records against encode_frame(). """
+        raw = RawFrame.decode(stream_raw(FRAME, METADATA_19))
+        for dlt in (DLT_IEEE802_15_4_TAP, DLT_IEEE802_15_4_WITHFCS):
+            PcapCodec.encode_header(dlt)
+            for rssi in (False, True):
+                size = PcapCodec.raw_size(raw, rssi)
+                buffer = bytearray(size + 3)
+                PcapCodec.pack_raw(buffer, 3, raw, 12, 34, rssi)
+                self.assertEqual(
+                    bytes(buffer[3:]),
+                    PcapCodec.encode_frame(FRAME, 12, 34, rssi, False,
+                                           raw.metadata))
+
+    def test_write_packed(self):
+        """ Unit test of packed records interleaved with other writes. """
+        PcapCodec.encode_header(DLT_IEEE802_15_4_TAP)
+        raw = RawFrame.decode(stream_raw(FRAME, METADATA_19))
+        record = PcapCodec.encode_frame(FRAME, 1, 2, True, False,
+                                        raw.metadata)
+        output = io.BytesIO()
+        writer = PcapWriter(output,
+                            flush_frames=4,
+                            flush_interval=None,
+                            buffer_size=len(record) * 3)
+        for _ in range(2):
+            writer.write(b'header')
+            for _ in range(4):
+                writer.write_packed(len(record), PcapCodec.pack_raw, raw, 1,
+                                    2, True)
+        writer.flush()
+        self.assertEqual(output.getvalue(), (b'header' + record * 4) * 2)
+        self.assertEqual(writer.frames, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
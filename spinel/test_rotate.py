@@ -0,0 +1,115 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.rotate module. """
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from spinel.rotate import CaptureRotator
+
+
+class TestRotate(unittest.TestCase):
+    """ Unit TestCase class for spinel.rotate.CaptureRotator class. """
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'capture.pcap')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self, path):
+        with open(path, 'rb') as capture:
+            return capture.read()
+
+    def test_rotate_size(self):
+        """ Unit test of rotating once a file reaches max_bytes. """
+        rotator = CaptureRotator(self.path,
+                                 'ch11',
+                                 lambda: b'HDR',
+                                 max_bytes=10,
+                                 flush_interval=None)
+        rotator.write(b'abcd')
+        self.assertEqual(rotator.rotations, 0)
+        rotator.write(b'efgh')
+        self.assertEqual(rotator.rotations, 1)
+        rotator.write(b'ijkl')
+        rotator.close()
+
+        self.assertEqual(len(rotator.files), 2)
+        self.assertEqual(self.read(rotator.files[0]), b'HDRabcdefgh')
+        self.assertEqual(self.read(rotator.files[1]), b'HDRijkl')
+        for path in rotator.files:
+            name = os.path.basename(path)
+            self.assertRegex(
+                name, r'^capture_\d{8}T\d{6}\.\d{3}Z_ch11(-\d+)?\.pcap$')
+
+    def test_keep(self):
+        """ Unit test of removing the files beyond keep. """
+        rotator = CaptureRotator(self.path,
+                                 'ch11',
+                                 lambda: b'',
+                                 keep=2,
+                                 flush_interval=None)
+        first = rotator.files[0]
+        for _ in range(3):
+            rotator.write(b'frame')
+            rotator.rotate()
+        rotator.close()
+
+        self.assertEqual(rotator.rotations, 3)
+        self.assertEqual(len(rotator.files), 2)
+        self.assertFalse(os.path.exists(first))
+        self.assertEqual(sorted(os.listdir(self.dir)),
+                         sorted(os.path.basename(p) for p in rotator.files))
+
+    def test_rotate_seconds(self):
+        """ Unit test of rotating once a file is max_seconds old. """
+        rotator = CaptureRotator(self.path,
+                                 'ch11',
+                                 lambda: b'',
+                                 max_seconds=60,
+                                 flush_interval=None)
+        rotator.write(b'frame')
+        self.assertEqual(rotator.rotations, 0)
+        rotator.start -= 60
+        rotator.write(b'frame')
+        rotator.close()
+        self.assertEqual(rotator.rotations, 1)
+
+    def test_header_per_file(self):
+        """ Unit test of starting every file with a fresh header. """
+        headers = iter([b'A', b'B'])
+        rotator = CaptureRotator(self.path,
+                                 'ch11',
+                                 lambda: next(headers),
+                                 flush_interval=None)
+        rotator.rotate()
+        rotator.close()
+        self.assertEqual([self.read(p) for p in rotator.files], [b'A', b'B'])
+
+    def test_compressed_name(self):
+        """ Unit test of keeping compressed extensions after the label. """
+        rotator = CaptureRotator(self.path + '.gz',
+                                 'ch11',
+                                 lambda: b'',
+                                 flush_interval=None)
+        rotator.close()
+        self.assertRegex(os.path.basename(rotator.files[0]),
+                         r'^capture_.*Z_ch11\.pcap\.gz$')
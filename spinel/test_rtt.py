@@ -0,0 +1,186 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.rtt module. """
+
+import binascii
+import threading
+import time
+import unittest
+
+from spinel.const import SPINEL
+from spinel.codec import WpanApi
+from spinel.hub import WpanHub
+from spinel.rtt import RttEstimator
+from spinel.rtt import RETRIES_DEFAULT
+from spinel.rtt import RTO_MIN
+from spinel.test_hub import SocketPairStream
+
+
+class LossyStream(SocketPairStream):
+    """
+    SocketPairStream answering on the tid of each request, dropping the
+    first few requests and delaying the replies to the others.
+    """
+
+    def __init__(self, vector, drop, delay=0):
+        SocketPairStream.__init__(self, vector)
+        self.drop = drop
+        self.delay = delay
+
+    def write(self, data):
+        for pkt in self.hdlc.feed(data):
+            request = binascii.hexlify(pkt).decode()
+            self.requests.append(request)
+            if self.drop > 0:
+                self.drop -= 1
+                continue
+            response = request[:2] + self.vector[request[2:]]
+            if self.delay:
+                reply = threading.Timer(self.delay, self.write_child_hex,
+                                        (response,))
+                reply.daemon = True
+                reply.start()
+            else:
+                self.write_child_hex(response)
+
+
+class TestRtt(unittest.TestCase):
+    """ Unit TestCase class for spinel.rtt.RttEstimator class. """
+
+    def test_estimator(self):
+        """ Unit test of RFC 6298 smoothing, backoff and bounds. """
+        rtt = RttEstimator(2.0)
+        self.assertEqual(rtt.rto(), 2.0)
+
+        rtt.sample(0.2)
+        self.assertAlmostEqual(rtt.srtt, 0.2)
+        self.assertAlmostEqual(rtt.rto(), 0.2 + 4 * 0.1)
+
+        rtt.sample(0.4)
+        self.assertAlmostEqual(rtt.rttvar, 0.75 * 0.1 + 0.25 * 0.2)
+        self.assertAlmostEqual(rtt.srtt, 0.2 + (0.4 - 0.2) / 8)
+
+        rto = rtt.rto()
+        rtt.timed_out()
+        self.assertAlmostEqual(rtt.rto(), 2 * rto)
+        for _ in range(10):
+            rtt.timed_out()
+        self.assertEqual(rtt.rto(), 2.0)
+
+        for _ in range(50):
+            rtt.sample(0.0001)
+        self.assertEqual(rtt.rto(), RTO_MIN)
+
+    def test_retry(self):
+        """ Unit test of a lost request retried after the RTO. """
+        stream = LossyStream({
+            "0236": "0636ffff",  # get panid = 65535
+        }, drop=0)
+        self.assertEqual(
+            WpanApi(stream, 1, threaded=False).retries, RETRIES_DEFAULT)
+        wpan_api = WpanApi(stream, 1, threaded=False, timeout=1, retries=2)
+
+        self.assertEqual(wpan_api.prop_get_value(SPINEL.PROP_MAC_15_4_PANID),
+                         0xffff)
+        self.assertEqual(wpan_api.rtt.samples, 1)
+        self.assertLess(wpan_api.rtt.rto(), 1)
+
+        stream.drop = 1
+        self.assertEqual(wpan_api.prop_get_value(SPINEL.PROP_MAC_15_4_PANID),
+                         0xffff)
+        self.assertEqual(wpan_api.rtt.timeouts, 1)
+        self.assertEqual(wpan_api.rtt.samples, 1)
+
+        # Explicit overrides: a single attempt with its own timeout.
+        stream.drop = 1
+        self.assertIsNone(
+            wpan_api.prop_get_value(SPINEL.PROP_MAC_15_4_PANID,
+                                    timeout=0.05,
+                                    retries=0))
+        stream.close()
+
+    def test_rto_timeout(self):
+        """ Unit test of default request timeouts derived from the RTT. """
+        stream = LossyStream({
+            "0236": "0636ffff",  # get panid = 65535
+        }, drop=0)
+        wpan_api = WpanApi(stream, 1, threaded=False)
+        for _ in range(20):
+            wpan_api.rtt.sample(0.001)
+
+        # A lost request is sent again after the RTO, not the 2 s timeout.
+        stream.drop = 1
+        start = time.monotonic()
+        self.assertEqual(wpan_api.prop_get_value(SPINEL.PROP_MAC_15_4_PANID),
+                         0xffff)
+        self.assertLess(time.monotonic() - start, 1)
+
+        # A silent device is given up on once each attempt waited its RTO.
+        wpan_api.rtt.sample(0.001)
+        stream.drop = 2
+        start = time.monotonic()
+        self.assertIsNone(
+            wpan_api.prop_get_value(SPINEL.PROP_MAC_15_4_PANID))
+        elapsed = time.monotonic() - start
+        self.assertGreaterEqual(elapsed, RTO_MIN * 3)
+        self.assertLess(elapsed, 1.9)
+        stream.close()
+
+    def test_late_reply(self):
+        """ Unit test of replies to a retransmitted request arriving late. """
+        stream = LossyStream(
+            {
+                "0243": "064302",  # get role = 2
+                "03430a": "06430a",  # set role = 10
+            },
+            drop=0,
+            delay=0.6)
+        with WpanHub() as hub:
+            wpan_api = WpanApi(stream, 1, timeout=1, hub=hub, retries=2)
+            for _ in range(20):
+                wpan_api.rtt.sample(0.001)
+
+            # Retransmitted after the RTO, completed by the first reply.
+            self.assertEqual(wpan_api.prop_get_value(SPINEL.PROP_NET_ROLE), 2)
+            self.assertEqual(len(stream.requests), 2)
+
+            # The reply to the retransmission is not taken for another's.
+            stream.delay = 0
+            for retries in (0, 2):
+                self.assertEqual(
+                    wpan_api.prop_set_value(SPINEL.PROP_NET_ROLE,
+                                            10,
+                                            retries=retries), 10)
+            time.sleep(0.7)
+            self.assertEqual(wpan_api.metrics()['late'], 1)
+
+            # Without retries, the lost reply of an abandoned GET does not
+            # cost the next ones theirs.
+            stream.drop = 1
+            self.assertIsNone(
+                wpan_api.prop_get_value(SPINEL.PROP_NET_ROLE,
+                                        timeout=0.1,
+                                        retries=0))
+            start = time.monotonic()
+            for _ in range(3):
+                self.assertEqual(
+                    wpan_api.prop_get_value(SPINEL.PROP_NET_ROLE, retries=0),
+                    2)
+            self.assertLess(time.monotonic() - start, 0.5)
+            self.assertEqual(wpan_api.metrics()['late'], 1)
+            wpan_api.__exit__(None, None, None)
+        stream.close()
@@ -16,11 +16,17 @@
 #
 """ Unittest for spinel.codec module. """
 
+import struct
 import unittest
 
 import spinel.util as util
 from spinel.const import SPINEL
 from spinel.codec import WpanApi
+from spinel.filter import CaptureFilter
+from spinel.hub import WpanHub
+from spinel.sniffer import SnifferSession
+from spinel.sniffer import clocks_create
+from spinel.test_hub import SocketPairStream
 from spinel.test_stream import MockStream
 
 
@@ -53,3 +59,95 @@ class TestSniffer(unittest.TestCase):
             result = wpan_api.queue_wait_for_prop(prop_id, tid)
             packet = util.hexify_str(result.value, "")
             self.failUnless(packet == truth)
+
+
+class TestSnifferSession(unittest.TestCase):
+    """ Unit TestCase class for spinel.sniffer.SnifferSession class. """
+
+    FRAME = bytes.fromhex('6188' '05' 'cefa' 'ffff' '0100') + b'\0\0'
+
+    PROPS = (
+        (SPINEL.PROP_PHY_ENABLED, 1),
+        (SPINEL.PROP_MAC_FILTER_MODE, SPINEL.MAC_FILTER_MODE_MONITOR),
+        (SPINEL.PROP_PHY_CHAN, 15),
+        (SPINEL.PROP_PHY_CHAN, 20),
+        (SPINEL.PROP_MAC_RAW_STREAM_ENABLED, 1),
+    )
+
+    def setUp(self):
+        # Property sets are answered with the value set.
+        vector = {}
+        for (prop, value) in self.PROPS:
+            vector["8103%02x%02x" % (prop, value)] = "8106%02x%02x" % (prop,
+                                                                     value)
+        self.stream = SocketPairStream(vector)
+        self.hub = WpanHub()
+        self.session = SnifferSession(self.stream,
+                                      15,
+                                      1,
+                                      reset=False,
+                                      hub=self.hub)
+        self.assertTrue(self.session.start())
+
+    def tearDown(self):
+        self.session.close()
+        self.hub.close()
+
+    def stream_raw(self, rssi, timestamp):
+        """ Send a PROP_STREAM_RAW update from the mock NCP. """
+        value = (struct.pack('<H', len(self.FRAME)) + self.FRAME +
+                 struct.pack('<bbHHBBQHB', rssi, -100, 0, 10, 15, 255,
+                             timestamp, 1, 0))
+        self.stream.write_child_hex("8006%02x" % SPINEL.PROP_STREAM_RAW +
+                                    value.hex())
+
+    def test_frames(self):
+        """ Unit test of the frames yielded up to a limit. """
+        for (rssi, timestamp) in ((-40, 1000001), (-60, 2500000), (-80, 3)):
+            self.stream_raw(rssi, timestamp)
+
+        frames = list(self.session.frames(stop_frames=2))
+        self.assertEqual([raw.frame for raw in frames], [self.FRAME] * 2)
+        self.assertEqual([(raw.sec, raw.usec, raw.rssi) for raw in frames],
+                         [(1, 1, -40), (2, 500000, -60)])
+        self.assertEqual(self.session.stats()['frames'], 2)
+
+    def test_set_channel(self):
+        """ Unit test of switching channels during a capture. """
+        self.assertTrue(self.session.set_channel(20))
+        self.assertEqual(self.session.stats()['channel'], 20)
+        # Restored on an NCP reset.
+        self.assertEqual(
+            self.session.wpan_api.journal[SPINEL.PROP_PHY_CHAN][0], 20)
+
+    def test_filter(self):
+        """ Unit test of frames dropped by the capture filter. """
+        self.session.capture_filter = CaptureFilter('rssi > -50')
+        for rssi in (-60, -40, -70):
+            self.stream_raw(rssi, 0)
+
+        frames = list(self.session.frames(stop_seconds=0.2))
+        self.assertEqual([raw.rssi for raw in frames], [-40])
+        self.assertEqual(self.session.stats()['filter'], {
+            'passed': 1,
+            'dropped': 2
+        })
+
+    def test_clock(self):
+        """ Unit test of NCP timestamps mapped to the host clock. """
+        (clock,) = clocks_create()
+        self.session.clock = clock
+        self.stream_raw(-40, 5000000)
+
+        (raw,) = self.session.frames(stop_frames=1)
+        self.assertEqual(raw.sec * 1000000 + raw.usec,
+                         round(clock.to_wall(5000000)))
+        self.assertEqual(self.session.stats()['clock']['samples'], 1)
+
+    def test_close(self):
+        """ Unit test of frames() ending once the session is closed. """
+        frames = self.session.frames()
+        self.stream_raw(-40, 0)
+        next(frames)
+        self.session.close()
+        self.assertEqual(list(frames), [])
@@ -0,0 +1,140 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.survey module. """
+
+import threading
+import unittest
+
+from spinel.const import SPINEL
+from spinel.survey import ChannelSurvey
+from spinel.survey import SURVEY_TID
+from spinel.survey import channels_parse
+from spinel.survey import survey_lines
+
+# Data, PAN ID 0xface, short 0x0001 to broadcast.
+DATA = bytes.fromhex('6188' '05' 'cefa' 'ffff' '0100') + b'payload' + b'\0\0'
+
+# Beacon from short 0x0002 in PAN ID 0xbeef, no destination.
+BEACON = bytes.fromhex('0080' '05' 'efbe' '0200') + b'\0\0'
+
+
+def metadata(channel, rssi):
+    return (rssi, -100, 0, (channel, 255, 1000), ((0, 1),))
+
+
+class FakeTimer(object):
+
+    def __init__(self):
+        self.scheduled = []
+
+    def schedule(self, delay, callback, *args, interval=None):
+        self.scheduled.append((delay, callback, interval))
+        return self
+
+    def cancel(self):
+        self.scheduled = []
+
+
+class FakeWpanApi(object):
+    """ Records the channel switches a survey sends. """
+
+    def __init__(self):
+        self.timer = FakeTimer()
+        self.callbacks = {}
+        self.journal = {}
+        self.sent = []
+        self.threads = []
+        self.switched = threading.Event()
+
+    def callback_register(self, prop, cb):
+        self.callbacks[prop] = cb
+
+    def journal_record(self, prop_id, value):
+        self.journal[prop_id] = value
+
+    def prop_change_async(self, cmd, prop_id, value, tid):
+        self.sent.append((cmd, prop_id, value, tid))
+        self.threads.append(threading.current_thread().name)
+        self.switched.set()
+
+    def respond(self, prop, value):
+        return self.callbacks[prop](prop, value, SURVEY_TID)
+
+
+class TestSurvey(unittest.TestCase):
+    """ Unit TestCase class for spinel.survey.ChannelSurvey class. """
+
+    def test_channels_parse(self):
+        """ Unit test of channel lists. """
+        self.assertEqual(channels_parse('11-13,20'), [11, 12, 13, 20])
+        self.assertEqual(channels_parse('0-2'), [0, 1, 2])
+        for text in ('', '13-11', 'eleven', '11-'):
+            with self.assertRaises(ValueError, msg=text):
+                channels_parse(text)
+
+    def test_survey(self):
+        """ Unit test of pipelined switches and per channel activity. """
+        wpan_api = FakeWpanApi()
+        survey = ChannelSurvey(wpan_api, [11, 12], dwell=0.1)
+        survey.start()
+        self.assertEqual(wpan_api.timer.scheduled[0][0::2], (0.1, 0.1))
+        self.assertEqual(wpan_api.sent[-1][1:],
+                         (SPINEL.PROP_PHY_CHAN, 11, SURVEY_TID))
+        self.assertEqual(wpan_api.journal[SPINEL.PROP_PHY_CHAN], 11)
+
+        # A switch due before the previous one completed waits.
+        survey._switch()
+        self.assertEqual((len(wpan_api.sent), survey.overruns), (1, 1))
+
+        self.assertTrue(wpan_api.respond(SPINEL.PROP_PHY_CHAN, 11))
+        self.assertFalse(wpan_api.callbacks[SPINEL.PROP_PHY_CHAN](
+            SPINEL.PROP_PHY_CHAN, 11, SPINEL.HEADER_DEFAULT))
+        survey.record(DATA, metadata(11, -60))
+        survey._switch()
+        # Still received on channel 11 while the NCP retunes.
+        survey.record(DATA, metadata(11, -70))
+        wpan_api.respond(SPINEL.PROP_PHY_CHAN, 12)
+        survey.record(BEACON, metadata(12, -80))
+        survey._switch()
+        wpan_api.respond(SPINEL.PROP_LAST_STATUS, SPINEL.STATUS_BUSY)
+        survey.stop()
+
+        summary = survey.summary()
+        (ch11, ch12) = summary['channels']
+        self.assertEqual((ch11['frames'], ch11['rssi_mean'], ch11['rssi_max']),
+                         (2, -65, -60))
+        self.assertEqual(ch11['pans'], [(0xface, 2)])
+        self.assertEqual(ch12['pans'], [(0xbeef, 1)])
+        self.assertEqual((ch11['visits'], ch12['visits']), (1, 1))
+        self.assertGreater(ch11['dwell'], 0)
+        self.assertEqual(summary['switch']['count'], 3)
+        self.assertEqual(summary['switch']['failures'], 1)
+        self.assertEqual(len(survey_lines(summary)), 4)
+
+    def test_switch_thread(self):
+        """ Unit test of switches sent by the survey thread. """
+        wpan_api = FakeWpanApi()
+        survey = ChannelSurvey(wpan_api, [11, 12], dwell=0.1)
+        survey.start()
+        wpan_api.respond(SPINEL.PROP_PHY_CHAN, 11)
+        wpan_api.switched.clear()
+        # The timer callback only signals the survey thread.
+        wpan_api.timer.scheduled[0][1]()
+        self.assertTrue(wpan_api.switched.wait(2))
+        survey.stop()
+        self.assertEqual(wpan_api.sent[-1][2], 12)
+        self.assertEqual(wpan_api.threads[-1], "ChannelSurvey")
@@ -0,0 +1,95 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.timer module. """
+
+import binascii
+import threading
+import time
+import unittest
+
+from spinel.const import SPINEL
+from spinel.codec import WpanApi
+from spinel.timer import TimerService
+from spinel.test_stream import MockStream
+
+
+class TestTimer(unittest.TestCase):
+    """ Unit TestCase class for spinel.timer.TimerService class. """
+
+    def test_schedule(self):
+        """ Unit test of timer ordering, cancellation and intervals. """
+        timers = TimerService()
+        fired = []
+        done = threading.Event()
+
+        timers.schedule(0.03, fired.append, 3)
+        timers.schedule(0.01, fired.append, 1)
+        timers.schedule(0.02, fired.append, 2).cancel()
+        ticks = timers.schedule(0.005, fired.append, 'tick', interval=0.01)
+        timers.schedule(0.04, done.set)
+
+        self.assertTrue(done.wait(1))
+        ticks.cancel()
+        timers.close()
+
+        self.assertEqual([value for value in fired if value != 'tick'], [1, 3])
+        self.assertGreaterEqual(fired.count('tick'), 2)
+
+    def test_request_deadline(self):
+        """ Unit test of a WpanApi request expired by its own deadline. """
+        timers = TimerService()
+        wpan_api = WpanApi(MockStream({}),
+                           1,
+                           use_hdlc=False,
+                           timeout=0.05,
+                           timer=timers)
+        wpan_api.queue_register(SPINEL.HEADER_ASYNC)
+
+        start = time.monotonic()
+        result = wpan_api.queue_wait_for_prop(SPINEL.PROP_LAST_STATUS,
+                                              SPINEL.HEADER_ASYNC)
+        self.assertIsNone(result)
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        # Waiting costs no timer.
+        self.assertEqual(len(timers), 0)
+        timers.close()
+
+        # PROP_VALUE_IS(LAST_STATUS) = STATUS_RESET_SOFTWARE
+        wpan_api.parse_rx(binascii.unhexlify("80060072"))
+        result = wpan_api.queue_wait_for_prop(SPINEL.PROP_LAST_STATUS,
+                                              SPINEL.HEADER_ASYNC)
+        self.assertEqual(result.value, SPINEL.STATUS_RESET_SOFTWARE)
+
+    def test_stalled_timer(self):
+        """ Unit test of a request deadline met while the timer blocks. """
+        timers = TimerService()
+        release = threading.Event()
+        timers.schedule(0, release.wait, 1)
+        wpan_api = WpanApi(MockStream({}),
+                           1,
+                           use_hdlc=False,
+                           timeout=0.05,
+                           timer=timers)
+        wpan_api.queue_register(SPINEL.HEADER_ASYNC)
+
+        start = time.monotonic()
+        self.assertIsNone(
+            wpan_api.queue_wait_for_prop(SPINEL.PROP_LAST_STATUS,
+                                         SPINEL.HEADER_ASYNC))
+        self.assertLess(time.monotonic() - start, 0.5)
+        release.set()
+        timers.close()
@@ -0,0 +1,70 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+""" Unittest for spinel.rtt module. """
+""" Unittest for spinel.txsched module. """
+
+import unittest
+
+from spinel.txsched import TxScheduler
+from spinel.txsched import TX_CONTROL
+from spinel.txsched import TX_BULK
+
+
+class TestTxScheduler(unittest.TestCase):
+    """ Unit TestCase class for spinel.txsched.TxScheduler class. """
+
+    def test_priority(self):
+        """ Unit test of control priority and round robin between flows. """
+        written = []
+
+        def write(pkt):
+            written.append(pkt)
+            if len(written) == 1:
+                # Frames submitted while the stream is busy get queued.
+                sched.submit(b'A1', TX_BULK, 'a')
+                sched.submit(b'A2', TX_BULK, 'a')
+                sched.submit(b'B1', TX_BULK, 'b')
+                sched.submit(b'C', TX_CONTROL)
+
+        sched = TxScheduler(write, quantum=2)
+        sched.submit(b'C0', TX_CONTROL)
+        self.assertEqual(written, [b'C0', b'C', b'A1', b'B1', b'A2'])
+
+        stats = sched.stats()
+        self.assertEqual(stats['control']['frames'], 2)
+        self.assertEqual(stats['control']['count'], 2)
+        self.assertEqual(stats['bulk']['frames'], 3)
+        self.assertEqual(stats['bulk']['bytes'], 6)
+        self.assertEqual(stats['bulk_queued'], 0)
+
+    def test_write_error(self):
+        """ Unit test that a failed write does not wedge the scheduler. """
+        written = []
+
+        def write(pkt):
+            if pkt == b'bad':
+                raise IOError()
+            written.append(pkt)
+
+        sched = TxScheduler(write)
+        self.assertRaises(IOError, sched.submit, b'bad')
+        sched.submit(b'ok', TX_BULK)
+        self.assertEqual(written, [b'ok'])
+
+
+if __name__ == "__main__":
+    unittest.main()
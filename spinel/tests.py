@@ -19,3 +19,25 @@
 from spinel.test_hdlc import TestHdlc
 from spinel.test_codec import TestCodec
 from spinel.test_sniffer import TestSniffer
+from spinel.test_sniffer import TestSnifferSession
+from spinel.test_cache import TestCache
+from spinel.test_boundedqueue import TestBoundedQueue
+from spinel.test_metrics import TestMetrics
+from spinel.test_hub import TestHub
+from spinel.test_timer import TestTimer
+from spinel.test_journal import TestJournal
+from spinel.test_prefix import TestPrefix
+from spinel.test_rtt import TestRtt
+from spinel.test_txsched import TestTxScheduler
+from spinel.test_pacing import TestPacing
+from spinel.test_pcap import TestPcap
+from spinel.test_pcapng import TestPcapng
+from spinel.test_merge import TestMerge
+from spinel.test_filter import TestFilter
+from spinel.test_compress import TestCompress
+from spinel.test_capstats import TestCapStats
+from spinel.test_survey import TestSurvey
+from spinel.test_clock import TestClock
+from spinel.test_rotate import TestRotate
+from spinel.test_rawframe import TestRawFrame
+from spinel.test_phy import TestPhy
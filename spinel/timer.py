@@ -0,0 +1,142 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing a timer service shared by all WpanApi instances.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import traceback
+
+import spinel.config as CONFIG
+
+
+class Timer(object):
+    """ Handle of a scheduled callback, see TimerService.schedule(). """
+
+    __slots__ = ('when', 'interval', 'callback', 'args', 'cancelled')
+
+    def __init__(self, when, interval, callback, args):
+        self.when = when
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """ Prevent the callback from running (again). """
+        self.cancelled = True
+
+    def remaining(self):
+        """ Seconds left before the timer is due, 0 once it is. """
+        return max(self.when - time.monotonic(), 0)
+
+
+class Deadline(object):
+    """
+    Expiry of a request on the monotonic clock. Waiters wait for at most
+    remaining(), so no timer is involved in waking them up.
+    """
+
+    __slots__ = ('when',)
+
+    def __init__(self, timeout):
+        self.when = time.monotonic() + timeout
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.when
+
+    def remaining(self):
+        return max(self.when - time.monotonic(), 0)
+
+
+class TimerService(object):
+    """ Heap based timer service running callbacks on a single thread. """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()  # Keeps equal deadlines in FIFO order.
+        self._cond = threading.Condition()
+        self._thread = None
+        self._alive = True
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, delay, callback, *args, interval=None):
+        """
+        Run callback(*args) on the timer thread after delay seconds, then
+        every interval seconds if given, until the returned Timer is
+        cancelled. Callbacks must not block.
+        """
+        timer = Timer(time.monotonic() + delay, interval, callback, args)
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run,
+                                                name="TimerService")
+                self._thread.daemon = True
+                self._thread.start()
+            heapq.heappush(self._heap, (timer.when, next(self._seq), timer))
+            # Only wake up the thread if the earliest deadline changed.
+            if self._heap[0][2] is timer:
+                self._cond.notify()
+        return timer
+
+    def close(self):
+        with self._cond:
+            self._alive = False
+            self._cond.notify()
+
+    def _pop_due(self):
+        """ Wait for and return the next due timer, or None on close. """
+        with self._cond:
+            while self._alive:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                (when, _, timer) = self._heap[0]
+                if timer.cancelled:
+                    heapq.heappop(self._heap)
+                    continue
+                delay = when - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                if timer.interval is not None:
+                    timer.when = when + timer.interval
+                    heapq.heappush(self._heap,
+                                   (timer.when, next(self._seq), timer))
+                return timer
+        return None
+
+    def run(self):
+        """ Timer thread. """
+        while True:
+            timer = self._pop_due()
+            if timer is None:
+                return
+            try:
+                timer.callback(*timer.args)
+            except Exception:
+                CONFIG.LOGGER.error(traceback.format_exc())
+
+
+TIMER_SERVICE = TimerService()
@@ -0,0 +1,150 @@
+#
+#  Copyright (c) 2016-2017, The OpenThread Authors.
+#  All rights reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Module providing priority scheduling of the frames WpanApi writes.
+"""
+
+import threading
+import time
+
+from collections import deque
+from collections import OrderedDict
+
+from spinel.metrics import LatencyHistogram
+
+TX_CONTROL = 0  # Property commands and resets, always written first.
+TX_BULK = 1  # STREAM_NET frames, deficit round robin between flows.
+
+TX_NAMES = {TX_CONTROL: 'control', TX_BULK: 'bulk'}
+
+# Bulk frames queued before ip_send() blocks its caller.
+TX_BULK_DEPTH = 64
+
+# Bytes a bulk flow may send per round robin turn.
+TX_QUANTUM = 1280
+
+
+class TxScheduler(object):
+    """ Priority and fair queuing of frames in front of a write function. """
+
+    def __init__(self, write, bulk_depth=TX_BULK_DEPTH, quantum=TX_QUANTUM):
+        self._write = write
+        self.bulk_depth = bulk_depth
+        self.quantum = quantum
+
+        self._cond = threading.Condition()
+        self._writing = False
+        self._control = deque()  # (pkt, enqueue time, done)
+        self._flows = OrderedDict()  # Map flow to deque of (pkt, time, done).
+        self._deficit = {}  # Map flow to bytes it may still send.
+        self._bulk_len = 0
+
+        self.hol = {}  # Map class to head-of-line latency histogram.
+        self.frames = {}
+        self.bytes = {}
+        for priority in TX_NAMES:
+            self.hol[priority] = LatencyHistogram()
+            self.frames[priority] = 0
+            self.bytes[priority] = 0
+
+    def submit(self, pkt, priority=TX_CONTROL, flow=None, done=None):
+        """
+        Queue pkt for writing, and write queued frames if the stream is
+        idle. Bulk callers block while TX_BULK_DEPTH frames are queued.
+
+        done(pkt) is called once pkt was written, or failed to, so that
+        the caller can reuse its buffer.
+        """
+        with self._cond:
+            if priority == TX_BULK:
+                while self._writing and self._bulk_len >= self.bulk_depth:
+                    self._cond.wait()
+                if flow not in self._flows:
+                    self._flows[flow] = deque()
+                    self._deficit[flow] = 0
+                self._flows[flow].append((pkt, time.perf_counter(), done))
+                self._bulk_len += 1
+            else:
+                self._control.append((pkt, time.perf_counter(), done))
+
+            if self._writing:
+                return
+            self._writing = True
+
+        self._drain()
+
+    def _next_bulk(self):
+        """ Pop the next bulk frame by deficit round robin between flows. """
+        while True:
+            (flow, flow_queue) = next(iter(self._flows.items()))
+            pkt = flow_queue[0][0]
+            if self._deficit[flow] < len(pkt):
+                self._deficit[flow] += self.quantum
+                self._flows.move_to_end(flow)
+                continue
+
+            self._deficit[flow] -= len(pkt)
+            entry = flow_queue.popleft()
+            if not flow_queue:
+                del self._flows[flow]
+                del self._deficit[flow]
+            self._bulk_len -= 1
+            self._cond.notify_all()
+            return entry
+
+    def _drain(self):
+        while True:
+            with self._cond:
+                if self._control:
+                    priority = TX_CONTROL
+                    (pkt, enqueued, done) = self._control.popleft()
+                elif self._flows:
+                    priority = TX_BULK
+                    (pkt, enqueued, done) = self._next_bulk()
+                else:
+                    self._writing = False
+                    self._cond.notify_all()
+                    return
+
+                self.hol[priority].record(
+                    (time.perf_counter() - enqueued) * 1000000)
+                self.frames[priority] += 1
+                self.bytes[priority] += len(pkt)
+
+            try:
+                self._write(pkt)
+            except BaseException:
+                # Leave the rest queued for the next caller.
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+                raise
+            finally:
+                if done is not None:
+                    done(pkt)
+
+    def stats(self):
+        """ Return frame counters and head-of-line latency per class. """
+        with self._cond:
+            result = {}
+            for (priority, name) in TX_NAMES.items():
+                stats = self.hol[priority].snapshot()
+                stats['frames'] = self.frames[priority]
+                stats['bytes'] = self.bytes[priority]
+                result[name] = stats
+            result['bulk_queued'] = self._bulk_len
+            return result